@@ -51,6 +51,42 @@ SCANCODE_DEFAULT_OPTIONS = env.list("SCANCODE_DEFAULT_OPTIONS", default=[])
 # If the SCANCODE_PROCESSES argument is not set, defaults to the number of CPUs minus 1.
 SCANCODEIO_PROCESSES = env.int("SCANCODEIO_PROCESSES", default=None)
 
+# Set the number of scan tasks kept in flight for each of the SCANCODEIO_PROCESSES.
+SCANCODEIO_SCAN_QUEUE_SIZE_PER_PROCESS = env.int(
+    "SCANCODEIO_SCAN_QUEUE_SIZE_PER_PROCESS", default=4
+)
+
+# Scan results are written to the database in batches of SCANCODEIO_SCAN_BATCH_SIZE
+# resources, or every SCANCODEIO_SCAN_FLUSH_INTERVAL seconds.
+SCANCODEIO_SCAN_BATCH_SIZE = env.int("SCANCODEIO_SCAN_BATCH_SIZE", default=1000)
+SCANCODEIO_SCAN_FLUSH_INTERVAL = env.int("SCANCODEIO_SCAN_FLUSH_INTERVAL", default=10)
+
+# Scan results cache shared across projects, disabled when no location is provided.
+SCANCODEIO_SCAN_CACHE_LOCATION = env.str("SCANCODEIO_SCAN_CACHE_LOCATION", default="")
+SCANCODEIO_SCAN_CACHE_MAX_SIZE = env.int("SCANCODEIO_SCAN_CACHE_MAX_SIZE", default=1024)
+
+# Run the package and file scans in a single pass in the root filesystem pipelines
+SCANCODEIO_SCAN_FUSED = env.bool("SCANCODEIO_SCAN_FUSED", default=False)
+
+# Select the file scanners to run based on the file type
+SCANCODEIO_SCAN_PREFILTER = env.bool("SCANCODEIO_SCAN_PREFILTER", default=False)
+SCANCODEIO_SCAN_PREFILTER_MAX_SIZE = env.int(
+    "SCANCODEIO_SCAN_PREFILTER_MAX_SIZE", default=10
+)
+
+# Distribute the scans in shards across the Celery workers
+SCANCODEIO_SCAN_SHARDS = env.int("SCANCODEIO_SCAN_SHARDS", default=0)
+
+# Supervision of the scan pool workers: per-file timeout in seconds and recycling of
+# the workers after a number of tasks or above a resident memory threshold in MB.
+SCANCODEIO_SCAN_FILE_TIMEOUT = env.int("SCANCODEIO_SCAN_FILE_TIMEOUT", default=600)
+SCANCODEIO_SCAN_MAX_TASKS_PER_WORKER = env.int(
+    "SCANCODEIO_SCAN_MAX_TASKS_PER_WORKER", default=10000
+)
+SCANCODEIO_SCAN_MAX_WORKER_MEMORY = env.int(
+    "SCANCODEIO_SCAN_MAX_WORKER_MEMORY", default=4096
+)
+
 SCANCODEIO_POLICIES_FILE = env.str("SCANCODEIO_POLICIES_FILE", default="policies.yml")
 
 # This setting defines the additional locations ScanCode.io will search for pipelines.
@@ -30,7 +30,7 @@ from scanpipe.models import DiscoveredPackage
 from scanpipe.models import Project
 from scanpipe.models import ProjectError
 from scanpipe.models import Run
-from scanpipe.pipes import count_group_by
+from scanpipe.models import RunLogEntry
 from scanpipe.pipes.fetch import fetch_urls
 
 scanpipe_app = apps.get_app_config("scanpipe")
@@ -89,6 +89,12 @@ class RunSerializer(SerializerExcludeFieldsMixin, serializers.ModelSerializer):
         ]
 
 
+class RunLogEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RunLogEntry
+        fields = ["id", "created_date", "level", "step", "message"]
+
+
 class ProjectSerializer(
     ExcludeFromListViewMixin, PipelineChoicesMixin, serializers.ModelSerializer
 ):
@@ -108,7 +114,8 @@ class ProjectSerializer(
         style={"base_template": "textarea.html"},
     )
     next_run = serializers.CharField(source="get_next_run", read_only=True)
-    runs = RunSerializer(many=True, read_only=True)
+    # The run log is only available from the run detail and log_entries action.
+    runs = RunSerializer(many=True, read_only=True, exclude_fields=["log"])
     input_sources = serializers.SerializerMethodField()
     codebase_resources_summary = serializers.SerializerMethodField()
     discovered_package_summary = serializers.SerializerMethodField()
@@ -156,16 +163,10 @@ class ProjectSerializer(
         ]
 
     def get_codebase_resources_summary(self, project):
-        queryset = project.codebaseresources.all()
-        return count_group_by(queryset, "status")
+        return project.get_stats().codebase_resources_summary
 
     def get_discovered_package_summary(self, project):
-        base_qs = project.discoveredpackages
-        return {
-            "total": base_qs.count(),
-            "with_missing_resources": base_qs.exclude(missing_resources=[]).count(),
-            "with_modified_resources": base_qs.exclude(modified_resources=[]).count(),
-        }
+        return project.get_stats().discovered_package_summary
 
     def create(self, validated_data):
         """
@@ -201,7 +202,18 @@ class CodebaseResourceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CodebaseResource
-        exclude = ["id", "project", "rootfs_path", "sha256", "sha512"]
+        exclude = [
+            "id",
+            "project",
+            "rootfs_path",
+            "layer_id",
+            "parent_path",
+            "sha256",
+            "sha512",
+            "license_keys",
+            "license_categories",
+            "has_unknown_license",
+        ]
 
 
 class DiscoveredPackageSerializer(serializers.ModelSerializer):
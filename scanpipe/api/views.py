@@ -38,9 +38,11 @@ from scanpipe.api.serializers import DiscoveredPackageSerializer
 from scanpipe.api.serializers import PipelineSerializer
 from scanpipe.api.serializers import ProjectErrorSerializer
 from scanpipe.api.serializers import ProjectSerializer
+from scanpipe.api.serializers import RunLogEntrySerializer
 from scanpipe.api.serializers import RunSerializer
 from scanpipe.models import Project
 from scanpipe.models import Run
+from scanpipe.views import LOG_ENTRIES_LIMIT
 from scanpipe.views import project_results_json_response
 
 scanpipe_app = apps.get_app_config("scanpipe")
@@ -65,7 +67,7 @@ class ProjectViewSet(
     Multiple actions are available to manage project instances.
     """
 
-    queryset = Project.objects.all()
+    queryset = Project.objects.select_related("stats")
     serializer_class = ProjectSerializer
 
     @action(detail=True, renderer_classes=[renderers.JSONRenderer])
@@ -205,3 +207,30 @@ class RunViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
         transaction.on_commit(run.execute_task_async)
 
         return Response({"status": f"Pipeline {run.pipeline_name} started."})
+
+    @action(detail=True, methods=["get"])
+    def log_entries(self, request, *args, **kwargs):
+        """
+        Returns the log entries of the run created after the `offset` entry id.
+        The returned `offset` is the value to provide on the next call to only get
+        the new entries, allowing to poll the log of a running pipeline.
+        """
+        run = self.get_object()
+
+        try:
+            offset = int(request.query_params.get("offset", 0))
+        except ValueError:
+            message = {"offset": "A valid integer is required."}
+            return Response(message, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = list(run.get_log_entries(offset, limit=LOG_ENTRIES_LIMIT))
+        if entries:
+            offset = entries[-1].id
+
+        return Response(
+            {
+                "offset": offset,
+                "status": run.status,
+                "entries": RunLogEntrySerializer(entries, many=True).data,
+            }
+        )
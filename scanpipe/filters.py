@@ -127,6 +127,12 @@ class InPackageFilter(django_filters.ChoiceFilter):
 class ResourceFilterSet(FilterSetUtilsMixin, django_filters.FilterSet):
     search = django_filters.CharFilter(field_name="path", lookup_expr="icontains")
     in_package = InPackageFilter(label="In a Package")
+    license_key = django_filters.CharFilter(
+        field_name="license_keys", lookup_expr="has_key"
+    )
+    license_category = django_filters.CharFilter(
+        field_name="license_categories", lookup_expr="has_key"
+    )
 
     class Meta:
         model = CodebaseResource
@@ -155,6 +161,8 @@ class ResourceFilterSet(FilterSetUtilsMixin, django_filters.FilterSet):
             "emails",
             "urls",
             "in_package",
+            "license_key",
+            "license_category",
         ]
 
     @classmethod
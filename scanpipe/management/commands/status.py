@@ -63,9 +63,12 @@ class Command(ProjectCommand, RunStatusCommandMixin):
                 if execution_time:
                     msg += f" (executed in {execution_time} seconds)"
                 message.append(msg)
-                if display_runs_log and run.log:
-                    for line in run.log.split("\n"):
+                if display_runs_log:
+                    # The log entries are streamed rather than loaded as a whole.
+                    for line in run.legacy_log.splitlines():
                         message.append(3 * " " + line)
+                    for entry in run.get_log_entries().iterator():
+                        message.append(3 * " " + entry.message)
 
         for line in message:
             self.stdout.write(line)
@@ -0,0 +1,59 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from scanpipe.models import Project
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored resource, package, and error counts of projects."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project",
+            action="append",
+            dest="projects",
+            default=list(),
+            help="Project name. All the projects are updated when not provided.",
+        )
+
+    def handle(self, *args, **options):
+        projects = Project.objects.all()
+
+        project_names = options["projects"]
+        if project_names:
+            projects = projects.filter(name__in=project_names)
+            missing = set(project_names) - set(projects.values_list("name", flat=True))
+            if missing:
+                raise CommandError(
+                    f"Project {', '.join(sorted(missing))} does not exist"
+                )
+
+        updated_count = 0
+        for project in projects.iterator():
+            project.update_stats()
+            updated_count += 1
+
+        msg = f"Stats updated for {updated_count} project(s)."
+        self.stdout.write(self.style.SUCCESS(msg))
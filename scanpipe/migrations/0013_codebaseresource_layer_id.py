@@ -0,0 +1,18 @@
+# Generated by Django 3.2.6 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0012_run_scancodeio_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codebaseresource',
+            name='layer_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Identifier of the image layer containing this resource. Only available for resources collected from Docker images.', max_length=100),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.6 on 2026-10-18 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0013_codebaseresource_layer_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=models.Index(fields=['project', 'status', 'md5', 'size'], name='scanpipe_resource_md5_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.6 on 2026-10-18 03:34
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0014_codebaseresource_md5_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=models.Index(fields=['project', 'rootfs_path'], name='scanpipe_resource_rootfs_idx', opclasses=['uuid_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=models.Index(fields=['project', 'name'], name='scanpipe_resource_name_idx', opclasses=['uuid_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=models.Index(fields=['project', 'type'], name='scanpipe_resource_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=models.Index(condition=models.Q(('status', '')), fields=['project', 'rootfs_path'], name='scanpipe_resource_nostatus_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=models.Index(condition=models.Q(('licenses', [])), fields=['project'], name='scanpipe_resource_nolic_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=django.contrib.postgres.indexes.HashIndex(fields=['path'], name='scanpipe_resource_path_hash'),
+        ),
+    ]
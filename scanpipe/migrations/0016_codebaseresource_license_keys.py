@@ -0,0 +1,76 @@
+# Generated by Django 3.2.6 on 2026-10-18 03:40
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+from django.db.models import Q
+
+from license_expression import ExpressionError
+from license_expression import Licensing
+
+
+def set_license_fields(apps, schema_editor):
+    """
+    Sets the `license_keys` and `license_categories` of the existing resources.
+    """
+    licensing = Licensing()
+    CodebaseResource = apps.get_model("scanpipe", "CodebaseResource")
+    resources = CodebaseResource.objects.filter(
+        ~Q(licenses=[]) | ~Q(license_expressions=[])
+    ).only("licenses", "license_expressions")
+
+    batch = []
+    for resource in resources.iterator(chunk_size=2000):
+        license_keys = []
+        for license_expression in resource.license_expressions:
+            try:
+                license_keys.extend(licensing.license_keys(license_expression))
+            except ExpressionError:
+                continue
+        license_categories = [
+            license_data.get("category") for license_data in resource.licenses
+        ]
+        resource.license_keys = list(dict.fromkeys(license_keys))
+        resource.license_categories = list(
+            dict.fromkeys(filter(None, license_categories))
+        )
+        batch.append(resource)
+
+        if len(batch) >= 2000:
+            CodebaseResource.objects.bulk_update(
+                batch, fields=["license_keys", "license_categories"]
+            )
+            batch = []
+
+    if batch:
+        CodebaseResource.objects.bulk_update(
+            batch, fields=["license_keys", "license_categories"]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0015_codebaseresource_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codebaseresource',
+            name='license_categories',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='List of the unique categories of the license detections.'),
+        ),
+        migrations.AddField(
+            model_name='codebaseresource',
+            name='license_keys',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='List of the unique license keys of the detected license expressions.'),
+        ),
+        migrations.RunPython(set_license_fields, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['license_keys'], name='scanpipe_resource_lickeys_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['license_categories'], name='scanpipe_resource_liccats_gin'),
+        ),
+    ]
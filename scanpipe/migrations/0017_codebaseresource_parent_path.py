@@ -0,0 +1,31 @@
+# Generated by Django 3.2.6 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0016_codebaseresource_license_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codebaseresource',
+            name='parent_path',
+            field=models.CharField(blank=True, editable=False, help_text='Path of the parent directory of this resource. Empty for the codebase root.', max_length=2000),
+        ),
+        # Strip the last path segment, the root resources without "/" are left empty.
+        migrations.RunSQL(
+            sql=(
+                "UPDATE scanpipe_codebaseresource "
+                "SET parent_path = regexp_replace(path, '/[^/]*$', '') "
+                "WHERE path LIKE '%/%'"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='codebaseresource',
+            index=models.Index(fields=['project', 'parent_path'], name='scanpipe_resource_parent_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.6 on 2026-10-18 03:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0017_codebaseresource_parent_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(editable=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='scanpipe.project')),
+                ('resource_count', models.PositiveIntegerField(default=0)),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('file_in_package_count', models.PositiveIntegerField(default=0)),
+                ('file_not_in_package_count', models.PositiveIntegerField(default=0)),
+                ('package_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('codebase_resources_summary', models.JSONField(blank=True, default=dict, help_text='Number of resources for each status.')),
+                ('discovered_package_summary', models.JSONField(blank=True, default=dict, help_text='Number of packages with missing and modified resources.')),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'project stats',
+            },
+        ),
+    ]
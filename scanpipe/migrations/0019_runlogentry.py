@@ -0,0 +1,43 @@
+# Generated by Django 3.2.6 on 2026-10-18 03:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0018_projectstats'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='run',
+            old_name='log',
+            new_name='legacy_log',
+        ),
+        migrations.AlterField(
+            model_name='run',
+            name='legacy_log',
+            field=models.TextField(blank=True, editable=False, help_text='Log stored as text, prior to the RunLogEntry records. Use the `log` property to get the complete log.'),
+        ),
+        migrations.CreateModel(
+            name='RunLogEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('level', models.CharField(default='INFO', help_text='Logging level name of the entry.', max_length=10)),
+                ('step', models.CharField(blank=True, help_text='Name of the pipeline step running when the entry was logged.', max_length=256)),
+                ('message', models.TextField()),
+                ('run', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='log_entries', to='scanpipe.run')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='runlogentry',
+            index=models.Index(fields=['run', 'id'], name='scanpipe_runlog_tail_idx'),
+        ),
+    ]
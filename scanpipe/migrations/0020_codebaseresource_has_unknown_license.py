@@ -0,0 +1,28 @@
+# Generated by Django 3.2.6 on 2026-10-18 04:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0019_runlogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='codebaseresource',
+            name='has_unknown_license',
+            field=models.BooleanField(default=False, editable=False, help_text="True if one of the license keys contains 'unknown'."),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "UPDATE scanpipe_codebaseresource "
+                "SET has_unknown_license = true "
+                "WHERE EXISTS ("
+                "SELECT 1 FROM jsonb_array_elements_text(license_keys) AS key "
+                "WHERE key LIKE '%unknown%')"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
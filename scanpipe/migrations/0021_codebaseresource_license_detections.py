@@ -0,0 +1,48 @@
+# Generated by Django 3.2.6 on 2026-10-18 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scanpipe', '0020_codebaseresource_has_unknown_license'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='codebaseresource',
+            name='has_unknown_license',
+            field=models.BooleanField(default=False, editable=False, help_text="True if one of the license expressions contains 'unknown'."),
+        ),
+        migrations.AlterField(
+            model_name='codebaseresource',
+            name='license_categories',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='List of the license categories, one for each license detection.'),
+        ),
+        migrations.AlterField(
+            model_name='codebaseresource',
+            name='license_keys',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='List of the license keys, one for each license detection.'),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "UPDATE scanpipe_codebaseresource SET "
+                "license_keys = COALESCE(("
+                "SELECT jsonb_agg(detection.value -> 'key' ORDER BY detection.index) "
+                "FROM jsonb_array_elements(licenses) "
+                "WITH ORDINALITY AS detection(value, index) "
+                "WHERE detection.value ->> 'key' <> ''), '[]'::jsonb), "
+                "license_categories = COALESCE(("
+                "SELECT jsonb_agg(detection.value -> 'category' ORDER BY detection.index) "
+                "FROM jsonb_array_elements(licenses) "
+                "WITH ORDINALITY AS detection(value, index) "
+                "WHERE detection.value ->> 'category' <> ''), '[]'::jsonb), "
+                "has_unknown_license = license_expressions::text LIKE '%unknown%' "
+                "WHERE licenses <> '[]'::jsonb "
+                "OR license_expressions <> '[]'::jsonb "
+                "OR license_keys <> '[]'::jsonb"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
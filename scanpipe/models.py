@@ -23,6 +23,7 @@
 import re
 import shutil
 import uuid
+from collections import defaultdict
 from contextlib import suppress
 from itertools import groupby
 from operator import itemgetter
@@ -30,10 +31,16 @@ from pathlib import Path
 from traceback import format_tb
 
 from django.apps import apps
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.indexes import HashIndex
 from django.core import checks
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.db import transaction
+from django.db.models import CharField
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Func
 from django.db.models import Q
 from django.db.models import TextField
 from django.db.models.functions import Cast
@@ -298,6 +305,7 @@ class Project(UUIDPKModel, ExtraDataFieldMixin, models.Model):
 
         self.extra_data = {}
         self.save()
+        self.update_stats()
 
         for path in work_directories:
             shutil.rmtree(path, ignore_errors=True)
@@ -559,7 +567,7 @@ class Project(UUIDPKModel, ExtraDataFieldMixin, models.Model):
         if hasattr(error, "__traceback__"):
             traceback = "".join(format_tb(error.__traceback__))
 
-        return ProjectError.objects.create(
+        project_error = ProjectError.objects.create(
             project=self,
             model=model,
             details=details or {},
@@ -567,55 +575,161 @@ class Project(UUIDPKModel, ExtraDataFieldMixin, models.Model):
             traceback=traceback,
         )
 
+        # Keep the stored error count current between the pipeline steps.
+        ProjectStats.objects.filter(project=self).update(
+            error_count=F("error_count") + 1
+        )
+
+        return project_error
+
     def get_absolute_url(self):
         """
         Returns this project's details URL.
         """
         return reverse("project_detail", args=[self.uuid])
 
-    @cached_property
+    def get_stats(self):
+        """
+        Returns the ProjectStats of this project.
+        The stored stats are refreshed at the end of each pipeline step, see
+        `update_stats`. The resources and packages created since are not counted.
+        When not stored yet, the stats are computed from live counts, without being
+        saved.
+        """
+        with suppress(ObjectDoesNotExist):
+            return self.stats
+        # Sets the `self.stats` reverse relation cache as well.
+        return ProjectStats(project=self, **ProjectStats.compute(self))
+
+    def update_stats(self):
+        """
+        Computes, stores, and returns the ProjectStats of this project.
+        """
+        stats, _ = ProjectStats.objects.update_or_create(
+            project=self,
+            defaults=ProjectStats.compute(self),
+        )
+        # Sets the `self.stats` reverse relation cache as well.
+        stats.project = self
+        return stats
+
+    @property
     def resource_count(self):
         """
         Returns the number of resources related to this project.
         """
-        return self.codebaseresources.count()
+        return self.get_stats().resource_count
 
-    @cached_property
+    @property
     def file_count(self):
         """
         Returns the number of **file** resources related to this project.
         """
-        return self.codebaseresources.files().count()
+        return self.get_stats().file_count
 
-    @cached_property
+    @property
     def file_in_package_count(self):
         """
         Returns the number of **file** resources **in a package** related to this
         project.
         """
-        return self.codebaseresources.files().in_package().count()
+        return self.get_stats().file_in_package_count
 
-    @cached_property
+    @property
     def file_not_in_package_count(self):
         """
         Returns the number of **file** resources **not in a package** related to this
         project.
         """
-        return self.codebaseresources.files().not_in_package().count()
+        return self.get_stats().file_not_in_package_count
 
-    @cached_property
+    @property
     def package_count(self):
         """
         Returns the number of packages related to this project.
         """
-        return self.discoveredpackages.count()
+        return self.get_stats().package_count
 
-    @cached_property
+    @property
     def error_count(self):
         """
         Returns the number of errors related to this project.
         """
-        return self.projecterrors.count()
+        return self.get_stats().error_count
+
+
+class ProjectStats(models.Model):
+    """
+    Stores the resource, package, and error counts of a project.
+    Those are computed in bulk, at the end of each pipeline step, and read by the
+    views and the API instead of running the count queries on each request.
+    The `error_count` is also incremented by `Project.add_error`. The resources
+    and packages created outside of a pipeline are counted on the next
+    `Project.update_stats` call, see the "update-stats" management command.
+    """
+
+    project = models.OneToOneField(
+        Project,
+        primary_key=True,
+        related_name="stats",
+        on_delete=models.CASCADE,
+        editable=False,
+    )
+    resource_count = models.PositiveIntegerField(default=0)
+    file_count = models.PositiveIntegerField(default=0)
+    file_in_package_count = models.PositiveIntegerField(default=0)
+    file_not_in_package_count = models.PositiveIntegerField(default=0)
+    package_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    codebase_resources_summary = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=_("Number of resources for each status."),
+    )
+    discovered_package_summary = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text=_("Number of packages with missing and modified resources."),
+    )
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "project stats"
+
+    def __str__(self):
+        return str(self.project)
+
+    @staticmethod
+    def compute(project):
+        """
+        Returns a mapping of the ProjectStats field values of the `project`.
+        """
+        resources = project.codebaseresources.order_by()
+        files = resources.files()
+        resource_counts = resources.aggregate(
+            resource_count=Count("pk"),
+            file_count=Count("pk", filter=Q(type=CodebaseResource.Type.FILE)),
+        )
+        status_counts = resources.values("status").annotate(count=Count("pk"))
+
+        package_counts = project.discoveredpackages.order_by().aggregate(
+            total=Count("pk"),
+            with_missing_resources=Count("pk", filter=~Q(missing_resources=[])),
+            with_modified_resources=Count("pk", filter=~Q(modified_resources=[])),
+        )
+
+        return {
+            **resource_counts,
+            "file_in_package_count": files.in_package().count(),
+            "file_not_in_package_count": files.not_in_package().count(),
+            "package_count": package_counts["total"],
+            "error_count": project.projecterrors.count(),
+            "codebase_resources_summary": {
+                entry["status"]: entry["count"]
+                for entry in status_counts.order_by("status")
+            },
+            "discovered_package_summary": package_counts,
+        }
 
 
 class ProjectRelatedQuerySet(models.QuerySet):
@@ -752,7 +866,14 @@ class Run(UUIDPKModel, ProjectRelatedModel, AbstractTaskFieldsModel):
     created_date = models.DateTimeField(auto_now_add=True, db_index=True)
     scancodeio_version = models.CharField(max_length=30, blank=True)
     description = models.TextField(blank=True)
-    log = models.TextField(blank=True, editable=False)
+    legacy_log = models.TextField(
+        blank=True,
+        editable=False,
+        help_text=_(
+            "Log stored as text, prior to the RunLogEntry records. "
+            "Use the `log` property to get the complete log."
+        ),
+    )
 
     objects = RunQuerySet.as_manager()
 
@@ -839,17 +960,65 @@ class Run(UUIDPKModel, ProjectRelatedModel, AbstractTaskFieldsModel):
             return status.QUEUED
         return status.NOT_STARTED
 
-    def append_to_log(self, message, save=False):
+    @property
+    def log(self):
+        """
+        Returns the log of this Run as a string, one line per entry.
+        The log is rebuilt from the `legacy_log` text followed by the RunLogEntry
+        records, including the entries not saved yet.
+        """
+        entries = [*self.log_entries.all(), *self.pending_log_entries]
+        return self.legacy_log + "".join(f"{entry.message}\n" for entry in entries)
+
+    @log.setter
+    def log(self, value):
+        """
+        Stores the `value` string as the `legacy_log` text.
+        """
+        self.legacy_log = value
+
+    @cached_property
+    def pending_log_entries(self):
+        """
+        Returns the list of RunLogEntry appended to this Run but not saved yet.
         """
-        Appends the `message` string to the `log` field of this Run instance.
+        return []
+
+    def append_to_log(self, message, save=False, level="INFO", step=""):
+        """
+        Appends the `message` string as a new RunLogEntry of this Run instance.
+
+        The entry, along the previously appended ones, is inserted in the database
+        when `save` is True. The Run row itself is never rewritten.
         """
         message = message.strip()
         if any(lf in message for lf in ("\n", "\r")):
             raise ValueError("message cannot contain line returns (either CR or LF).")
 
-        self.log = self.log + message + "\n"
+        entry = RunLogEntry(run=self, level=level, step=step, message=message)
+        self.pending_log_entries.append(entry)
         if save:
-            self.save()
+            self.save_log_entries()
+
+    def save_log_entries(self):
+        """
+        Inserts the pending RunLogEntry of this Run instance in the database.
+        """
+        if self.pending_log_entries:
+            RunLogEntry.objects.bulk_create(self.pending_log_entries)
+            self.pending_log_entries.clear()
+
+    def get_log_entries(self, offset=0, limit=None):
+        """
+        Returns the RunLogEntry of this Run created after the entry `offset` id,
+        in their creation order.
+        This is used to tail the log of a running pipeline: the `id` of the last
+        returned entry is the `offset` for the next call.
+        """
+        entries = self.log_entries.filter(id__gt=offset).order_by("id")
+        if limit:
+            entries = entries[:limit]
+        return entries
 
     def profile(self, print_results=False):
         """
@@ -883,6 +1052,39 @@ class Run(UUIDPKModel, ProjectRelatedModel, AbstractTaskFieldsModel):
                 print(output_str)
 
 
+class RunLogEntry(models.Model):
+    """
+    An entry of a Run log.
+    The entries are stored in an append-only table, instead of rewriting the
+    complete log of the Run on each new message.
+    """
+
+    run = models.ForeignKey(
+        Run, related_name="log_entries", on_delete=models.CASCADE, editable=False
+    )
+    created_date = models.DateTimeField(default=timezone.now, editable=False)
+    level = models.CharField(
+        max_length=10,
+        default="INFO",
+        help_text=_("Logging level name of the entry."),
+    )
+    step = models.CharField(
+        max_length=256,
+        blank=True,
+        help_text=_("Name of the pipeline step running when the entry was logged."),
+    )
+    message = models.TextField()
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["run", "id"], name="scanpipe_runlog_tail_idx"),
+        ]
+
+    def __str__(self):
+        return self.message
+
+
 class CodebaseResourceQuerySet(ProjectRelatedQuerySet):
     def status(self, status=None):
         if status:
@@ -920,14 +1122,39 @@ class CodebaseResourceQuerySet(ProjectRelatedQuerySet):
         return self.filter(licenses=[])
 
     def licenses_categories(self, categories):
-        return self.json_list_contains(
-            field_name="licenses",
-            key="category",
-            values=categories,
-        )
+        return self.filter(license_categories__has_any_keys=list(categories))
+
+    def license_keys(self, keys):
+        return self.filter(license_keys__has_any_keys=list(keys))
 
     def unknown_license(self):
-        return self.json_field_contains("license_expressions", "unknown")
+        """
+        Filters the QuerySet looking for the resources with a license key containing
+        "unknown" in their `license_expressions`, see `has_unknown_license`.
+        """
+        return self.filter(has_unknown_license=True)
+
+    def json_list_values_count(self, field_name):
+        """
+        Returns a {value: count} mapping of the values of the JSONField `field_name`
+        that stores a list of strings, computed in the database.
+
+        json_list_values_count("license_keys")
+        {"mit": 3, "apache-2.0": 1}
+        """
+        value = Func(
+            F(field_name),
+            function="jsonb_array_elements_text",
+            output_field=CharField(),
+        )
+        counts = (
+            self.order_by()
+            .annotate(value=value)
+            .values("value")
+            .annotate(count=Count("pk"))
+            .order_by("-count", "value")
+        )
+        return {entry["value"]: entry["count"] for entry in counts}
 
     def json_field_contains(self, field_name, value):
         """
@@ -1033,6 +1260,14 @@ class ScanFieldsModelMixin(models.Model):
             self.save()
 
 
+def get_parent_path(path):
+    """
+    Returns the path of the parent directory of the `path` string, or an empty
+    string for a root path.
+    """
+    return path.rpartition("/")[0]
+
+
 class CodebaseResource(
     ProjectRelatedModel,
     ScanFieldsModelMixin,
@@ -1054,6 +1289,24 @@ class CodebaseResource(
             'Eg.: "/usr/bin/bash" for a path of "tarball-extract/rootfs/usr/bin/bash"'
         ),
     )
+    layer_id = models.CharField(
+        max_length=100,
+        blank=True,
+        db_index=True,
+        help_text=_(
+            "Identifier of the image layer containing this resource. "
+            "Only available for resources collected from Docker images."
+        ),
+    )
+    parent_path = models.CharField(
+        max_length=2000,
+        blank=True,
+        editable=False,
+        help_text=_(
+            "Path of the parent directory of this resource. "
+            "Empty for the codebase root."
+        ),
+    )
     status = models.CharField(
         blank=True,
         max_length=30,
@@ -1132,11 +1385,71 @@ class CodebaseResource(
             "provided policies."
         ),
     )
+    license_keys = models.JSONField(
+        blank=True,
+        default=list,
+        editable=False,
+        help_text=_("List of the license keys, one for each license detection."),
+    )
+    license_categories = models.JSONField(
+        blank=True,
+        default=list,
+        editable=False,
+        help_text=_("List of the license categories, one for each license detection."),
+    )
+    has_unknown_license = models.BooleanField(
+        default=False,
+        editable=False,
+        help_text=_("True if one of the license expressions contains 'unknown'."),
+    )
 
     objects = CodebaseResourceQuerySet.as_manager()
 
     class Meta:
         unique_together = (("project", "path"),)
+        indexes = [
+            # Also used for the (project, status) lookups.
+            models.Index(
+                fields=["project", "status", "md5", "size"],
+                name="scanpipe_resource_md5_idx",
+            ),
+            # The pattern operator class supports the `startswith` lookups.
+            models.Index(
+                fields=["project", "rootfs_path"],
+                name="scanpipe_resource_rootfs_idx",
+                opclasses=["uuid_ops", "varchar_pattern_ops"],
+            ),
+            models.Index(
+                fields=["project", "name"],
+                name="scanpipe_resource_name_idx",
+                opclasses=["uuid_ops", "varchar_pattern_ops"],
+            ),
+            models.Index(
+                fields=["project", "type"],
+                name="scanpipe_resource_type_idx",
+            ),
+            models.Index(
+                fields=["project", "rootfs_path"],
+                name="scanpipe_resource_nostatus_idx",
+                condition=Q(status=""),
+            ),
+            models.Index(
+                fields=["project"],
+                name="scanpipe_resource_nolic_idx",
+                condition=Q(licenses=[]),
+            ),
+            models.Index(
+                fields=["project", "parent_path"],
+                name="scanpipe_resource_parent_idx",
+            ),
+            # Constant time lookups of the, possibly long, paths.
+            HashIndex(fields=["path"], name="scanpipe_resource_path_hash"),
+            # Support the `has_key` and `has_any_keys` lookups on the license lists.
+            GinIndex(fields=["license_keys"], name="scanpipe_resource_lickeys_gin"),
+            GinIndex(
+                fields=["license_categories"], name="scanpipe_resource_liccats_gin"
+            ),
+        ]
         ordering = ("project", "path")
 
     def __str__(self):
@@ -1160,6 +1473,8 @@ class CodebaseResource(
         Saves the current resource instance.
         Injects policies—if the feature is enabled—when the `licenses` field value is
         changed.
+        The `parent_path`, `license_keys`, and `license_categories` are always kept
+        in sync with the path and license fields.
         """
         if scanpipe_app.policies_enabled:
             loaded_licenses = getattr(self, "loaded_licenses", [])
@@ -1167,8 +1482,31 @@ class CodebaseResource(
                 self.inject_licenses_policy(scanpipe_app.license_policies_index)
                 self.compliance_alert = self.compute_compliance_alert()
 
+        self.parent_path = get_parent_path(self.path)
+        self.set_license_fields()
         super().save(*args, **kwargs)
 
+    def set_license_fields(self):
+        """
+        Sets the `license_keys`, `license_categories`, and `has_unknown_license`
+        values from the `licenses` and `license_expressions` fields.
+        The keys and categories are listed for each license detection, repeated
+        values included, so they can be counted per detection.
+        Those are stored for indexed queries and must be set before bulk
+        creates and updates, as `save()` is not called in that case.
+        """
+        license_keys = [license_data.get("key") for license_data in self.licenses]
+        license_categories = [
+            license_data.get("category") for license_data in self.licenses
+        ]
+
+        self.license_keys = list(filter(None, license_keys))
+        self.license_categories = list(filter(None, license_categories))
+        self.has_unknown_license = any(
+            "unknown" in license_expression
+            for license_expression in self.license_expressions
+        )
+
     def inject_licenses_policy(self, policies_index):
         """
         Injects license policies from the `policies_index` into the `licenses` field.
@@ -1260,7 +1598,8 @@ class CodebaseResource(
     def children(self, codebase=None):
         """
         Returns a QuerySet of direct children CodebaseResource objects using a
-        database query on the current CodebaseResource `path`.
+        database query on the current CodebaseResource `path` in the indexed
+        `parent_path` field.
 
         Paths are returned in lower-cased sorted path order to reflect the
         behavior of the `commoncode.resource.Resource.children()`
@@ -1269,12 +1608,8 @@ class CodebaseResource(
         `codebase` is not used in this context but required for compatibility
         with the commoncode.resource.VirtualCodebase class API.
         """
-        exactly_one_sub_directory = "[^/]+$"
-        children_regex = rf"^{self.path}/{exactly_one_sub_directory}"
-        return (
-            self.descendants()
-            .filter(path__regex=children_regex)
-            .order_by(Lower("path"))
+        return self.project.codebaseresources.filter(parent_path=self.path).order_by(
+            Lower("path")
         )
 
     def walk(self, topdown=True):
@@ -1283,14 +1618,23 @@ class CodebaseResource(
 
         Traverses the tree top-down, depth-first if `topdown` is True; otherwise
         traverses the tree bottom-up.
+
+        The descendants are fetched in a single database query and grouped by their
+        parent path, instead of running one `children()` query per directory.
         """
-        for child in self.children().iterator():
-            if topdown:
-                yield child
-            for subchild in child.walk(topdown=topdown):
-                yield subchild
-            if not topdown:
-                yield child
+        children_by_parent = defaultdict(list)
+        for resource in self.descendants().order_by(Lower("path")).iterator():
+            children_by_parent[get_parent_path(resource.path)].append(resource)
+
+        def walk_children(parent_path):
+            for child in children_by_parent.get(parent_path, []):
+                if topdown:
+                    yield child
+                yield from walk_children(child.path)
+                if not topdown:
+                    yield child
+
+        yield from walk_children(self.path)
 
     def get_absolute_url(self):
         return reverse("resource_detail", args=[self.project_id, self.pk])
@@ -1407,6 +1751,22 @@ class DiscoveredPackage(
         If one of the values of the required fields is not available, a "ProjectError"
         is created instead of a new DiscoveredPackage instance.
         """
+        discovered_package = cls.build_from_data(project, package_data)
+        if not discovered_package:
+            return
+
+        discovered_package.save()
+        if discovered_package.pk:
+            return discovered_package
+
+    @classmethod
+    def build_from_data(cls, project, package_data):
+        """
+        Returns a new DiscoveredPackage instance for a `project` from the
+        `package_data`, without saving it in the database.
+        If one of the values of the required fields is not available, a "ProjectError"
+        is created and None is returned.
+        """
         required_fields = ["type", "name", "version"]
         required_values = [package_data.get(field) for field in required_fields]
 
@@ -1428,6 +1788,4 @@ class DiscoveredPackage(
             if field_name in DiscoveredPackage.model_fields() and value
         }
 
-        discovered_package = cls.objects.create(project=project, **cleaned_package_data)
-        if discovered_package.pk:
-            return discovered_package
+        return cls(project=project, **cleaned_package_data)
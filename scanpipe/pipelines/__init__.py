@@ -36,6 +36,31 @@ from pyinstrument import Profiler
 logger = logging.getLogger(__name__)
 
 
+class PipelineSuspended(Exception):
+    """
+    Raised by a pipeline step to suspend the pipeline execution while the `canvas`
+    Celery tasks are executed by the workers.
+    The pipeline task does not wait for those tasks: the remaining steps are resumed
+    by a new task once the `canvas` is completed, see `resume_pipeline_task`.
+    """
+
+    def __init__(self, canvas):
+        super().__init__("Pipeline suspended")
+        self.canvas = canvas
+
+    def dispatch(self, run, step_name):
+        """
+        Executes the `canvas` followed by the resume of the `run` pipeline after the
+        `step_name` step.
+        The `run` is ended as failed if one of the `canvas` tasks fails.
+        """
+        from scanpipe import tasks
+
+        workflow = self.canvas | tasks.resume_pipeline_task.si(run.pk, step_name)
+        workflow.on_error(tasks.fail_pipeline_task.si(run.pk))
+        workflow.apply_async()
+
+
 class Pipeline:
     """
     Base class for all pipelines.
@@ -48,6 +73,7 @@ class Pipeline:
         self.run = run
         self.project = run.project
         self.pipeline_name = run.pipeline_name
+        self.current_step = ""
 
     @classmethod
     def steps(cls):
@@ -94,33 +120,64 @@ class Pipeline:
             "steps": cls.get_graph(),
         }
 
-    def log(self, message):
+    def log(self, message, level=logging.INFO):
         """
         Logs the given `message` to the current module logger and Run instance.
+        The message is stored as a new log entry of the Run, along its `level` and
+        the current step name.
         """
         now_as_localtime = timezone.localtime(timezone.now())
         timestamp = now_as_localtime.strftime("%Y-%m-%d %H:%M:%S.%f")[:-4]
         message = f"{timestamp} {message}"
-        logger.info(message)
-        self.run.append_to_log(message, save=True)
+        logger.log(level, message)
+        self.run.append_to_log(
+            message,
+            save=True,
+            level=logging.getLevelName(level),
+            step=self.current_step,
+        )
+
+    def execute(self, resume_after=None):
+        """
+        Executes the pipeline steps and returns an (exitcode, output) tuple.
+
+        The steps up to the `resume_after` step name are skipped to resume a
+        suspended pipeline. The exitcode is None when a step suspended the
+        pipeline, see `PipelineSuspended`.
+        """
+        steps = self.get_steps()
 
-    def execute(self):
-        self.log(f"Pipeline [{self.pipeline_name}] starting")
+        if resume_after:
+            step_names = [step.__name__ for step in steps]
+            steps = steps[step_names.index(resume_after) + 1 :]
+            self.log(f"Pipeline [{self.pipeline_name}] resuming")
+        else:
+            self.log(f"Pipeline [{self.pipeline_name}] starting")
 
-        for step in self.get_steps():
+        for step in steps:
+            self.current_step = step.__name__
             self.log(f"Step [{step.__name__}] starting")
             start_time = timeit.default_timer()
 
             try:
-                step(self)
+                try:
+                    step(self)
+                except PipelineSuspended as suspended:
+                    self.log(f"Step [{step.__name__}] suspended")
+                    suspended.dispatch(self.run, step.__name__)
+                    return None, ""
             except Exception as e:
-                self.log(f"Pipeline failed")
+                self.log(f"Pipeline failed", level=logging.ERROR)
                 tb = "".join(traceback.format_tb(e.__traceback__))
                 return 1, f"{e}\n\nTraceback:\n{tb}"
+            finally:
+                # The project counts are refreshed in bulk at each step boundary.
+                self.project.update_stats()
 
             run_time = timeit.default_timer() - start_time
             self.log(f"Step [{step.__name__}] completed in {run_time:.2f} seconds")
 
+        self.current_step = ""
         self.log(f"Pipeline completed")
 
         return 0, ""
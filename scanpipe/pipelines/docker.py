@@ -23,6 +23,7 @@
 from scanpipe.pipelines import root_filesystems
 from scanpipe.pipes import docker
 from scanpipe.pipes import rootfs
+from scanpipe.pipes import tagging
 
 
 class Docker(root_filesystems.RootFS):
@@ -41,8 +42,7 @@ class Docker(root_filesystems.RootFS):
             cls.collect_and_create_system_packages,
             cls.tag_uninteresting_codebase_resources,
             cls.tag_empty_files,
-            cls.scan_for_application_packages,
-            cls.scan_for_files,
+            *cls.get_scan_steps(),
             cls.analyze_scanned_files,
             cls.tag_not_analyzed_codebase_resources,
         )
@@ -96,5 +96,5 @@ class Docker(root_filesystems.RootFS):
         """
         Flags files that don't belong to any system package.
         """
-        docker.tag_whiteout_codebase_resources(self.project)
-        rootfs.tag_uninteresting_codebase_resources(self.project)
+        rules = [*docker.WHITEOUT_RULES, *rootfs.UNINTERESTING_RULES]
+        tagging.tag_codebase_resources(self.project, rules)
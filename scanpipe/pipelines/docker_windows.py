@@ -23,6 +23,7 @@
 from scanpipe.pipelines.docker import Docker
 from scanpipe.pipes import docker
 from scanpipe.pipes import rootfs
+from scanpipe.pipes import tagging
 from scanpipe.pipes import windows
 
 
@@ -44,8 +45,7 @@ class DockerWindows(Docker):
             cls.tag_uninteresting_codebase_resources,
             cls.tag_program_files_dirs_as_packages,
             cls.tag_empty_files,
-            cls.scan_for_application_packages,
-            cls.scan_for_files,
+            *cls.get_scan_steps(),
             cls.analyze_scanned_files,
             cls.tag_data_files_with_no_clues,
             cls.tag_not_analyzed_codebase_resources,
@@ -61,10 +61,13 @@ class DockerWindows(Docker):
         """
         Flags files that are known/labelled as uninteresting.
         """
-        docker.tag_whiteout_codebase_resources(self.project)
-        windows.tag_uninteresting_windows_codebase_resources(self.project)
-        rootfs.tag_ignorable_codebase_resources(self.project)
-        rootfs.tag_media_files_as_uninteresting(self.project)
+        rules = [
+            *docker.WHITEOUT_RULES,
+            *windows.UNINTERESTING_WINDOWS_RULES,
+            *rootfs.get_ignorable_rules(),
+            *rootfs.MEDIA_FILE_RULES,
+        ]
+        tagging.tag_codebase_resources(self.project, rules)
 
     def tag_program_files_dirs_as_packages(self):
         """
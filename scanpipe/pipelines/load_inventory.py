@@ -51,6 +51,5 @@ class LoadInventory(Pipeline):
         Processes a given JSON scan input to populate codebase resources and packages.
         """
         project = self.project
-        scanned_codebase = scancode.get_virtual_codebase(project, self.input_location)
-        scancode.create_codebase_resources(project, scanned_codebase)
-        scancode.create_discovered_packages(project, scanned_codebase)
+        scanned_codebase = scancode.get_streamed_codebase(project, self.input_location)
+        scancode.create_inventory_from_scan(project, scanned_codebase)
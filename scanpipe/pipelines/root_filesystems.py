@@ -35,6 +35,11 @@ class RootFS(Pipeline):
 
     @classmethod
     def steps(cls):
+        # The files matched to system packages are not scanned for files.
+        scan_steps = cls.get_scan_steps(
+            before_files_scan=(cls.match_not_analyzed_to_system_packages,)
+        )
+
         return (
             cls.extract_input_files_to_codebase_directory,
             cls.find_root_filesystems,
@@ -43,13 +48,27 @@ class RootFS(Pipeline):
             cls.collect_and_create_system_packages,
             cls.tag_uninteresting_codebase_resources,
             cls.tag_empty_files,
-            cls.scan_for_application_packages,
-            cls.match_not_analyzed_to_system_packages,
-            cls.scan_for_files,
+            *scan_steps,
             cls.analyze_scanned_files,
             cls.tag_not_analyzed_codebase_resources,
         )
 
+    @classmethod
+    def get_scan_steps(cls, before_files_scan=()):
+        """
+        Returns the steps to scan the resources for application packages and files.
+        Both scans run as a single step when the SCANCODEIO_SCAN_FUSED setting is
+        enabled.
+        The optional `before_files_scan` steps are run before the files scan.
+        """
+        if scancode.SCANCODEIO_SCAN_FUSED:
+            return (*before_files_scan, cls.scan_for_packages_and_files)
+        return (
+            cls.scan_for_application_packages,
+            *before_files_scan,
+            cls.scan_for_files,
+        )
+
     def extract_input_files_to_codebase_directory(self):
         """
         Extracts root filesystem input archives with extractcode.
@@ -115,34 +134,43 @@ class RootFS(Pipeline):
         """
         Scans unknown resources for packages information.
         """
-        scancode.scan_for_application_packages(self.project)
+        scancode.scan_for_application_packages(self.project, progress_logger=self.log)
 
     def match_not_analyzed_to_system_packages(self):
         """
         Matches "not-yet-analyzed" files to files already belong to system packages.
         """
-        rootfs.match_not_analyzed(
+        matched_count = rootfs.match_not_analyzed(
             self.project,
             reference_status="system-package",
             not_analyzed_status="",
         )
+        self.log(f"{matched_count} resources matched to system packages")
 
     def match_not_analyzed_to_application_packages(self):
         """
         Matches "not-yet-analyzed" files to files already belong to application packages.
         """
         # TODO: do it one rootfs at a time e.g. for rfs in self.root_filesystems:
-        rootfs.match_not_analyzed(
+        matched_count = rootfs.match_not_analyzed(
             self.project,
             reference_status="application-package",
             not_analyzed_status="",
         )
+        self.log(f"{matched_count} resources matched to application packages")
 
     def scan_for_files(self):
         """
         Scans unknown resources for copyrights, licenses, emails, and urls.
         """
-        scancode.scan_for_files(self.project)
+        scancode.scan_for_files(self.project, progress_logger=self.log)
+
+    def scan_for_packages_and_files(self):
+        """
+        Scans unknown resources for packages information, copyrights, licenses,
+        emails, and urls in a single pass.
+        """
+        scancode.scan_for_packages_and_files(self.project, progress_logger=self.log)
 
     def analyze_scanned_files(self):
         """
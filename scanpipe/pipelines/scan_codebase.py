@@ -100,9 +100,10 @@ class ScanCodebase(Pipeline):
         Processes the JSON scan results to determine resources and packages.
         """
         project = self.project
-        scanned_codebase = scancode.get_virtual_codebase(project, str(self.scan_output))
-        scancode.create_codebase_resources(project, scanned_codebase)
-        scancode.create_discovered_packages(project, scanned_codebase)
+        scanned_codebase = scancode.get_streamed_codebase(
+            project, str(self.scan_output)
+        )
+        scancode.create_inventory_from_scan(project, scanned_codebase)
 
     def csv_output(self):
         """
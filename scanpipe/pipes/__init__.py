@@ -22,15 +22,20 @@
 
 import subprocess
 import sys
+from contextlib import contextmanager
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 
+from django.db import connection
+from django.db import transaction
 from django.db.models import Count
 
 from packageurl import normalize_qualifiers
 
 from scanpipe.models import CodebaseResource
 from scanpipe.models import DiscoveredPackage
+from scanpipe.models import get_parent_path
 from scanpipe.pipes import scancode
 
 
@@ -69,17 +74,69 @@ def make_codebase_resource(project, location, rootfs_path=None):
     codebase_resource.save(save_error=False)
 
 
-def update_or_create_package(project, package_data):
+def make_codebase_resources(project, resources, layer_id="", batch_size=1000):
     """
-    Gets, updates or creates a DiscoveredPackage then returns it.
-    Uses the `project` and `package_data` mapping to lookup and creates the
-    DiscoveredPackage using its Package URL as a unique key.
+    Creates a CodebaseResource for each (location, rootfs_path) tuple of the
+    `resources` iterable for the `project`.
+    The optional `layer_id` of the Docker image layer is stored on each resource.
+
+    This is the bulk version of `make_codebase_resource`: the file info are
+    computed in parallel, see `scancode.get_resources_info`, and the resources are
+    inserted in batches of `batch_size`.
+    The resources with a path already existing in the `project` are skipped.
+    """
+    codebase_dir = str(project.codebase_path)
+    resources = iter(resources)
+
+    while True:
+        batch = list(islice(resources, batch_size))
+        if not batch:
+            break
+
+        locations = [location.rstrip("/") for location, _ in batch]
+        for resource_location in locations:
+            assert resource_location.startswith(codebase_dir), (
+                f"Location: {resource_location} is not under project/codebase/: "
+                f"{codebase_dir}"
+            )
+
+        resources_info = scancode.get_resources_info(locations)
+
+        codebase_resources = []
+        for (_, rootfs_path), resource_location, resource_data in zip(
+            batch, locations, resources_info
+        ):
+            if rootfs_path:
+                resource_data["rootfs_path"] = rootfs_path
+            if layer_id:
+                resource_data["layer_id"] = layer_id
+            path = resource_location.replace(codebase_dir, "")
+            codebase_resources.append(
+                CodebaseResource(
+                    project=project,
+                    path=path,
+                    parent_path=get_parent_path(path),
+                    **resource_data,
+                )
+            )
+
+        try:
+            with transaction.atomic():
+                CodebaseResource.objects.bulk_create(
+                    codebase_resources, ignore_conflicts=True
+                )
+        except Exception:
+            # Fall back to single inserts to skip the invalid resources only.
+            for codebase_resource in codebase_resources:
+                codebase_resource.save(save_error=False)
+
+
+def split_package_data(package_data):
+    """
+    Returns a tuple of (purl_data, package_data) mappings from the `package_data`.
+    The `purl_data` contains the Package URL fields, the `package_data` the other
+    known DiscoveredPackage fields with values.
     """
-    # make a copy
-    package_data = dict(package_data or {})
-    if not package_data:
-        return
-
     # keep only known fields with values
     package_data = {
         field_name: value
@@ -96,6 +153,50 @@ def update_or_create_package(project, package_data):
             v = normalize_qualifiers(v, encode=True)
         purl_data[k] = v or ""
 
+    return purl_data, package_data
+
+
+def get_package_purl(package_data):
+    """
+    Returns the Package URL string of the `package_data` mapping, or an empty
+    string if a valid Package URL cannot be built.
+    """
+    purl_data, _ = split_package_data(package_data or {})
+    return DiscoveredPackage(**purl_data).package_url
+
+
+def merge_package_data(discovered_package, package_data):
+    """
+    Sets the empty fields of the `discovered_package` from the `package_data`.
+    Returns the list of updated field names.
+    """
+    updated_fields = []
+    for field_name, value in package_data.items():
+        if not value:
+            continue
+        existing_value = getattr(discovered_package, field_name, "")
+        if not existing_value:
+            setattr(discovered_package, field_name, value)
+            updated_fields.append(field_name)
+        elif existing_value != value:
+            # TODO: handle this case
+            pass
+    return updated_fields
+
+
+def update_or_create_package(project, package_data):
+    """
+    Gets, updates or creates a DiscoveredPackage then returns it.
+    Uses the `project` and `package_data` mapping to lookup and creates the
+    DiscoveredPackage using its Package URL as a unique key.
+    """
+    # make a copy
+    package_data = dict(package_data or {})
+    if not package_data:
+        return
+
+    purl_data, package_data = split_package_data(package_data)
+
     if not purl_data:
         raise Exception(f"Package without any Package URL fields: {package_data}")
 
@@ -111,24 +212,134 @@ def update_or_create_package(project, package_data):
 
     if not created:
         # update/merge records since we have an existing record
-        dp_fields = DiscoveredPackage.model_fields()
-        has_updates = False
-        for field_name, value in package_data.items():
-            if field_name not in dp_fields or not value:
-                continue
-            existing_value = getattr(dp, field_name, "")
-            if not existing_value:
-                setattr(dp, field_name, value)
-                has_updates = True
-            elif existing_value != value:
-                # TODO: handle this case
-                pass
-        if has_updates:
+        if merge_package_data(dp, package_data):
             dp.save()
 
     return dp
 
 
+def update_or_create_packages(project, packages_data, batch_size=1000):
+    """
+    Gets, updates or creates a DiscoveredPackage for each mapping of the
+    `packages_data` iterable and returns a {purl: pk} mapping.
+
+    This is the bulk version of `update_or_create_package`. The packages are
+    deduplicated by Package URL in memory, merging their empty fields. The existing
+    packages of the `project` are looked up in batches of `batch_size` and their
+    empty fields are merged with bulk updates, the new packages are created with
+    bulk inserts.
+    A package without a valid Package URL is skipped and a ProjectError is created.
+
+    The DiscoveredPackage Package URL is not unique in the database, the same
+    Package URL can be detected multiple times, so the lookups and inserts are
+    not an `INSERT ... ON CONFLICT` upsert. Instead, the concurrent calls on the
+    same `project` are serialized with `lock_project_packages`.
+    """
+    packages_by_purl = {}
+
+    for package_data in packages_data:
+        if not package_data:
+            continue
+
+        purl_data, cleaned_package_data = split_package_data(package_data)
+        purl = DiscoveredPackage(**purl_data).package_url
+        if not purl:
+            project.add_error(
+                error="Package without a valid Package URL",
+                model=DiscoveredPackage.__name__,
+                details=package_data,
+            )
+            continue
+
+        if purl in packages_by_purl:
+            _, existing_package_data = packages_by_purl[purl]
+            for field_name, value in cleaned_package_data.items():
+                existing_package_data.setdefault(field_name, value)
+        else:
+            packages_by_purl[purl] = (purl_data, cleaned_package_data)
+
+    purls = list(packages_by_purl.keys())
+    pks_by_purl = {}
+
+    with lock_project_packages(project):
+        for index in range(0, len(purls), batch_size):
+            batch = {
+                purl: packages_by_purl[purl]
+                for purl in purls[index : index + batch_size]
+            }
+            pks_by_purl.update(_update_or_create_packages_batch(project, batch))
+
+    return pks_by_purl
+
+
+@contextmanager
+def lock_project_packages(project):
+    """
+    Holds a PostgreSQL session advisory lock on the DiscoveredPackage of the
+    `project`, so a single pipeline at a time looks up and creates those.
+    The lock is released on exit, or when the database session ends.
+    """
+    lock_id = project.pk.int % 2**63
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [lock_id])
+
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+
+def _update_or_create_packages_batch(project, packages_by_purl):
+    """
+    Updates or creates the packages of the `packages_by_purl` mapping of
+    {purl: (purl_data, package_data)} and returns a {purl: pk} mapping.
+    """
+    names = {purl_data["name"] for purl_data, _ in packages_by_purl.values()}
+    existing_packages = {}
+    for package in project.discoveredpackages.filter(name__in=names).order_by("pk"):
+        existing_packages.setdefault(package.package_url, package)
+
+    to_update = []
+    updated_fields = set()
+    to_create = []
+
+    for purl, (purl_data, package_data) in packages_by_purl.items():
+        package = existing_packages.get(purl)
+        if package:
+            package_updated_fields = merge_package_data(package, package_data)
+            if package_updated_fields:
+                to_update.append(package)
+                updated_fields.update(package_updated_fields)
+        else:
+            to_create.append(
+                DiscoveredPackage(project=project, **purl_data, **package_data)
+            )
+
+    if to_update:
+        DiscoveredPackage.objects.bulk_update(to_update, fields=updated_fields)
+
+    try:
+        with transaction.atomic():
+            DiscoveredPackage.objects.bulk_create(to_create)
+    except Exception:
+        # Fall back to single inserts to record the errors on the project.
+        for package in to_create:
+            package.pk = None
+            package.save()
+
+    pks_by_purl = {
+        purl: existing_packages[purl].pk
+        for purl in packages_by_purl
+        if purl in existing_packages
+    }
+    pks_by_purl.update(
+        {package.package_url: package.pk for package in to_create if package.pk}
+    )
+    return pks_by_purl
+
+
 def analyze_scanned_files(project):
     """
     Sets the status for CodebaseResource to unknown or no license.
@@ -0,0 +1,160 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from contextlib import suppress
+from pathlib import Path
+
+logger = logging.getLogger("scanpipe.pipes")
+
+
+def get_cache_key(*parts):
+    """
+    Returns a stable hexadecimal cache key computed from the provided `parts`.
+    """
+    key = ":".join(str(part) for part in parts)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class FileSystemCache:
+    """
+    A persistent key/value cache stored as one JSON file per entry in the
+    `location` directory. The cache can be shared across projects and processes.
+
+    The total size of the entries is bounded by `max_size` bytes. The least
+    recently used entries are evicted first, using the entries modification time
+    that is refreshed on each cache hit. The eviction goes down to the
+    `eviction_ratio` of `max_size` so it does not run again on the next writes.
+
+    The number of `hits` and `misses` are tracked on the instance.
+    """
+
+    eviction_ratio = 0.9
+
+    def __init__(self, location, max_size):
+        self.location = Path(location)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def get_path(self, key):
+        """
+        Returns the location of the entry file for `key`.
+        The entries are stored in sub-directories named from the first key
+        characters to keep the number of files per directory reasonable.
+        """
+        return self.location / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """
+        Returns the value stored for `key`, or None if not available.
+        """
+        path = self.get_path(key)
+
+        try:
+            value = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self.misses += 1
+            return
+
+        # Refresh the modification time used for the LRU eviction.
+        with suppress(OSError):
+            os.utime(path)
+
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+        Stores the JSON serializable `value` for `key`.
+        The file is written atomically to support concurrent access.
+        """
+        path = self.get_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(value, separators=(",", ":"))
+
+        # The size of an overwritten entry is not counted twice.
+        size = self.size
+        with suppress(OSError):
+            size -= path.stat().st_size
+
+        with tempfile.NamedTemporaryFile(
+            mode="w", dir=path.parent, suffix=".tmp", delete=False
+        ) as temp_file:
+            temp_file.write(content)
+        os.replace(temp_file.name, path)
+
+        self._size = size + len(content)
+        if self._size > self.max_size:
+            self.evict()
+
+    @property
+    def size(self):
+        """
+        Returns the total size in bytes of the cache entries.
+        The size is computed once from the filesystem and then tracked on `set`.
+        """
+        if self._size is None:
+            self._size = sum(stat.st_size for _, stat in self.entries())
+        return self._size
+
+    def entries(self):
+        """
+        Yields (path, stat) for each entry of the cache.
+        """
+        for path in self.location.glob("*/*.json"):
+            with suppress(OSError):
+                yield path, path.stat()
+
+    def evict(self):
+        """
+        Deletes the least recently used entries until the cache size is below the
+        `eviction_ratio` of `max_size`.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[1].st_mtime)
+        size = sum(stat.st_size for _, stat in entries)
+        target_size = self.max_size * self.eviction_ratio
+
+        evicted_count = 0
+        for path, stat in entries:
+            if size <= target_size:
+                break
+            with suppress(OSError):
+                path.unlink()
+                size -= stat.st_size
+                evicted_count += 1
+
+        logger.info(f"Evicted {evicted_count} entries from cache {self.location}")
+        self._size = size
+
+    def get_stats(self):
+        """
+        Returns a message summarizing the hits and misses of this cache.
+        """
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100 if total else 0
+        return f"{self.hits} hits, {self.misses} misses ({ratio:.1f}% hit ratio)"
@@ -20,9 +20,12 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+from collections import defaultdict
+
 from django.core.exceptions import ObjectDoesNotExist
 
 from scanpipe.models import Project
+from scanpipe.models import get_parent_path
 
 
 def sort_by_lower_name(resource):
@@ -53,6 +56,39 @@ def get_tree(resource, fields, codebase=None):
     return resource_dict
 
 
+def get_resource_tree(resource, fields):
+    """
+    Returns a tree as a dictionary structure starting from the provided
+    `resource` scanpipe.models.CodebaseResource.
+
+    This is the equivalent of `get_tree`, built from a single database query on
+    the `resource` descendants instead of one `children()` query per directory.
+    """
+    values_fields = list(dict.fromkeys([*fields, "name", "path", "type"]))
+    descendants = resource.descendants().order_by().values_list(*values_fields)
+
+    children_by_parent = defaultdict(list)
+    for values in descendants.iterator(chunk_size=10000):
+        child = dict(zip(values_fields, values))
+        children_by_parent[get_parent_path(child["path"])].append(child)
+
+    def build_tree(resource_data):
+        resource_dict = {field: resource_data[field] for field in fields}
+
+        if resource_data["type"] == "directory":
+            children = children_by_parent.get(resource_data["path"], [])
+            if children:
+                resource_dict["children"] = [
+                    build_tree(child)
+                    for child in sorted(children, key=sort_by_lower_name)
+                ]
+
+        return resource_dict
+
+    root_data = {field: getattr(resource, field) for field in values_fields}
+    return build_tree(root_data)
+
+
 class ProjectCodebase:
     """
     Represents the codebase of a project stored in the database.
@@ -86,4 +122,4 @@ class ProjectCodebase:
             yield root
 
     def get_tree(self):
-        return get_tree(self.root, fields=["name", "path"])
+        return get_resource_tree(self.root, fields=["name", "path"])
@@ -21,6 +21,7 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 from scanpipe.pipes import scancode
+from scanpipe.pipes import tagging
 
 """
 A common compliance pattern for images is to store known licenses in a /licenses
@@ -35,20 +36,27 @@ def analyze_licenses_and_sources(self):
     util.analyze_compliance_licenses(self.project)
 """
 
+COMPLIANCE_RULES = [
+    tagging.Rule(
+        status="compliance-licenses",
+        field="rootfs_path",
+        lookup="startswith",
+        values=("/licenses",),
+    ),
+    tagging.Rule(
+        status="compliance-sourcemirror",
+        field="rootfs_path",
+        lookup="startswith",
+        values=("/sourcemirror",),
+    ),
+]
+
 
 def tag_compliance_files(project):
     """
     Tags compliance files status for the provided `project`.
     """
-    compliance_dirs = {
-        "/licenses": "compliance-licenses",
-        "/sourcemirror": "compliance-sourcemirror",
-    }
-
-    qs = project.codebaseresources.no_status()
-
-    for path, status in compliance_dirs.items():
-        qs.filter(rootfs_path__startswith=path).update(status=status)
+    tagging.tag_codebase_resources(project, COMPLIANCE_RULES)
 
 
 def analyze_compliance_licenses(project):
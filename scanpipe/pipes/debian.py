@@ -21,6 +21,9 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 from packagedcode import debian
+from packagedcode import debian_copyright
+
+from scanpipe.pipes import scancode
 
 
 def package_getter(root_dir, distro="debian", detect_licenses=True, **kwargs):
@@ -33,3 +36,49 @@ def package_getter(root_dir, distro="debian", detect_licenses=True, **kwargs):
     )
     for package in packages:
         yield package.purl, package
+
+
+def get_copyright_license_data(copyright_location):
+    """
+    Returns a mapping of the declared license, license expression and copyright
+    detected in the Debian copyright file at `copyright_location`.
+    """
+    dc = debian_copyright.parse_copyright_file(copyright_location)
+    if not dc:
+        return {}
+
+    return {
+        "declared_license": dc.get_declared_license(
+            filter_duplicates=True,
+            skip_debian_packaging=True,
+        ),
+        "license_expression": dc.get_license_expression(
+            skip_debian_packaging=True,
+            simplify_licenses=True,
+        ),
+        "copyright": dc.get_copyright(
+            skip_debian_packaging=True,
+            unique_copyrights=True,
+        ),
+    }
+
+
+def detect_licenses(installed_packages):
+    """
+    Detects the licenses in the Debian copyright file of each (package, root_dir)
+    of the `installed_packages` and sets them on the package.
+    The copyright files are processed in parallel in the scan process pool.
+    """
+    installed_packages = list(installed_packages)
+    copyright_locations = [
+        package.get_copyright_file_path(root_dir)
+        for package, root_dir in installed_packages
+    ]
+
+    licenses_data = scancode.map_in_scan_pool(
+        get_copyright_license_data, copyright_locations
+    )
+
+    for (package, _), license_data in zip(installed_packages, licenses_data):
+        for field_name, value in license_data.items():
+            setattr(package, field_name, value)
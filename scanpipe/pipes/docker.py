@@ -21,8 +21,7 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 import logging
-import posixpath
-from functools import partial
+from collections import defaultdict
 from pathlib import Path
 
 from container_inspector.image import Image
@@ -30,10 +29,19 @@ from container_inspector.image import Image
 from scanpipe import pipes
 from scanpipe.pipes import rootfs
 from scanpipe.pipes import scancode
-from scanpipe.pipes.rootfs import has_hash_diff
+from scanpipe.pipes import tagging
 
 logger = logging.getLogger(__name__)
 
+WHITEOUT_RULES = [
+    tagging.Rule(
+        status="ignored-whiteout",
+        field="name",
+        lookup="startswith",
+        values=(".wh.",),
+    ),
+]
+
 
 def extract_images_from_inputs(project):
     """
@@ -87,12 +95,32 @@ def create_codebase_resources(project, image):
     """
     Creates the CodebaseResource for an `image` in a `project`.
     """
-    for layer_resource in image.get_layers_resources():
-        pipes.make_codebase_resource(
-            project=project,
-            location=layer_resource.location,
-            rootfs_path=layer_resource.path,
+    for layer in image.layers:
+        resources = (
+            (layer_resource.location, layer_resource.path)
+            for layer_resource in layer.get_resources()
         )
+        pipes.make_codebase_resources(project, resources, layer_id=layer.layer_id)
+
+
+def get_resources_by_layer(project, image):
+    """
+    Returns a {layer_id: {rootfs_path: [ResourceHashes]}} mapping of the `project`
+    CodebaseResource of the `image` layers.
+    A layer shared by several images of the `project` maps to several resources.
+    """
+    layer_ids = [layer.layer_id for layer in image.layers]
+    resources = project.codebaseresources.filter(layer_id__in=layer_ids).order_by()
+    values = resources.values_list(
+        "layer_id", "rootfs_path", *rootfs.ResourceHashes._fields
+    )
+
+    resources_by_layer = defaultdict(lambda: defaultdict(list))
+    for layer_id, rootfs_path, *hashes in values.iterator(chunk_size=10000):
+        resource_hashes = rootfs.ResourceHashes(*hashes)
+        resources_by_layer[layer_id][rootfs_path].append(resource_hashes)
+
+    return resources_by_layer
 
 
 def scan_image_for_system_packages(project, image, detect_licenses=True):
@@ -111,60 +139,22 @@ def scan_image_for_system_packages(project, image, detect_licenses=True):
     if distro_id not in rootfs.PACKAGE_GETTER_BY_DISTRO:
         raise rootfs.DistroNotSupported(f'Distro "{distro_id}" is not supported.')
 
-    package_getter = partial(
-        rootfs.PACKAGE_GETTER_BY_DISTRO[distro_id],
-        distro=distro_id,
-        detect_licenses=detect_licenses,
+    package_getter = rootfs.CachedPackageGetter(
+        distro_id, detect_licenses, cache=rootfs.get_installed_packages_cache()
+    )
+    installed_packages = list(image.get_installed_packages(package_getter))
+    package_getter.detect_licenses(
+        [(purl, package) for purl, package, _ in installed_packages]
     )
 
-    installed_packages = image.get_installed_packages(package_getter)
-
-    for i, (purl, package, layer) in enumerate(installed_packages):
-        logger.info(f"Creating package #{i}: {purl}")
-        created_package = pipes.update_or_create_package(project, package.to_dict())
-
-        # We have no files for this installed package, we cannot go further.
-        if not package.installed_files:
-            logger.info(f"  No installed_files for: {purl}")
-            continue
-
-        missing_resources = created_package.missing_resources[:]
-        modified_resources = created_package.modified_resources[:]
-
-        codebase_resources = project.codebaseresources.all()
-
-        for install_file in package.installed_files:
-            install_file_path = pipes.normalize_path(install_file.path)
-            layer_rootfs_path = posixpath.join(
-                layer.layer_id,
-                install_file_path.strip("/"),
-            )
-            logger.info(f"   installed file rootfs_path: {install_file_path}")
-            logger.info(f"   layer rootfs_path: {layer_rootfs_path}")
-            cbr_qs = codebase_resources.filter(
-                path__endswith=layer_rootfs_path,
-                rootfs_path=install_file_path,
-            )
-            found_res = False
-            for codebase_resource in cbr_qs:
-                found_res = True
-                if created_package not in codebase_resource.discovered_packages.all():
-                    codebase_resource.discovered_packages.add(created_package)
-                    codebase_resource.status = "system-package"
-                    logger.info(f"      added as system-package to: {purl}")
-                    codebase_resource.save()
-
-                if has_hash_diff(install_file, codebase_resource):
-                    if install_file.path not in modified_resources:
-                        modified_resources.append(install_file.path)
-
-            if not found_res and install_file_path not in missing_resources:
-                missing_resources.append(install_file_path)
-                logger.info(f"      installed file is missing: {install_file_path}")
-
-        created_package.missing_resources = missing_resources
-        created_package.modified_resources = modified_resources
-        created_package.save()
+    resources_by_layer = get_resources_by_layer(project, image)
+    rootfs.create_system_packages(
+        project,
+        (
+            (purl, package, resources_by_layer[layer.layer_id])
+            for purl, package, layer in installed_packages
+        ),
+    )
 
 
 def tag_whiteout_codebase_resources(project):
@@ -173,6 +163,4 @@ def tag_whiteout_codebase_resources(project):
     See https://github.com/opencontainers/image-spec/blob/master/layer.md#whiteouts
     for details.
     """
-    whiteout_prefix = ".wh."
-    qs = project.codebaseresources.no_status()
-    qs.filter(name__startswith=whiteout_prefix).update(status="ignored-whiteout")
+    tagging.tag_codebase_resources(project, WHITEOUT_RULES)
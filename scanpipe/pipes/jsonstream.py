@@ -0,0 +1,197 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACES = " \t\n\r"
+
+
+class JSONStreamReader:
+    """
+    An incremental reader for a JSON document made of a top-level object, such as
+    a ScanCode JSON scan file, located at `location`.
+
+    The file is read in chunks and the top-level entries are decoded one at a
+    time. The values of the `stream_keys` arrays are yielded item by item, so the
+    memory usage is bounded by the size of the largest item rather than by the size
+    of the file.
+
+    Usage::
+
+        with JSONStreamReader(location) as reader:
+            for key, value in reader.items(stream_keys=["files"]):
+                ...
+    """
+
+    def __init__(self, location, chunk_size=CHUNK_SIZE):
+        self.location = location
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.file = None
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def __enter__(self):
+        self.file = open(self.location, encoding="utf-8")
+        return self
+
+    def __exit__(self, *args):
+        self.file.close()
+
+    def read(self):
+        """
+        Reads the next chunk of the file in the buffer.
+        The chunk size is at least the size of the pending data to keep the
+        decoding of large values linear.
+        Returns False when the end of the file is reached.
+        """
+        pending = self.buffer[self.position :]
+        data = self.file.read(max(self.chunk_size, len(pending)))
+        if not data:
+            self.eof = True
+            return False
+
+        self.buffer = pending + data
+        self.position = 0
+        return True
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character, or an empty string at the end
+        of the file. The whitespaces are consumed.
+        """
+        while True:
+            while self.position < len(self.buffer):
+                if self.buffer[self.position] not in WHITESPACES:
+                    return self.buffer[self.position]
+                self.position += 1
+            if not self.read():
+                return ""
+
+    def consume(self, expected):
+        """
+        Consumes the next non-whitespace character, which must be one of the
+        `expected` characters, and returns it.
+        """
+        char = self.peek()
+        if not char or char not in expected:
+            raise ValueError(
+                f"Expecting one of {expected!r} at position {self.position}, "
+                f"got {char!r} in {self.location}"
+            )
+        self.position += 1
+        return char
+
+    def decode(self):
+        """
+        Decodes and returns the next JSON value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.read():
+                    continue
+                raise
+
+            # A value ending with the buffer, such as a number, may be truncated.
+            if end == len(self.buffer) and not self.eof and self.read():
+                continue
+
+            self.position = end
+            return value
+
+    def iter_array(self):
+        """
+        Yields each item of the next JSON array.
+        """
+        self.consume("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+
+        while True:
+            yield self.decode()
+            if self.consume(",]") == "]":
+                return
+
+    def items(self, stream_keys=()):
+        """
+        Yields (key, value) for each entry of the top-level JSON object.
+        The value of the `stream_keys` entries is an iterator of the array items.
+        The items not consumed from this iterator are skipped when the next entry
+        is requested.
+        """
+        self.consume("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+
+        while True:
+            key = self.decode()
+            self.consume(":")
+
+            if key in stream_keys and self.peek() == "[":
+                array_items = self.iter_array()
+                yield key, array_items
+                # Exhaust the remaining items, if any.
+                for _ in array_items:
+                    pass
+            else:
+                yield key, self.decode()
+
+            if self.consume(",}") == "}":
+                return
+
+
+def iter_array_items(location, key):
+    """
+    Yields each item of the `key` array of the JSON top-level object stored at
+    `location`.
+    """
+    with JSONStreamReader(location) as reader:
+        for item_key, value in reader.items(stream_keys=[key]):
+            if item_key == key:
+                yield from value
+
+
+def get_values(location, keys, stream_keys=()):
+    """
+    Returns a mapping of the `keys` top-level values of the JSON object stored at
+    `location`. The reading stops as soon as all the `keys` are found.
+    The `stream_keys` arrays are skipped item by item without loading them.
+    """
+    values = {}
+    keys = set(keys)
+
+    with JSONStreamReader(location) as reader:
+        for key, value in reader.items(stream_keys=stream_keys):
+            if key in keys:
+                values[key] = value
+            if keys.issubset(values):
+                break
+
+    return values
@@ -21,25 +21,65 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 import fnmatch
+import hashlib
 import logging
 import os
+from collections import defaultdict
+from collections import namedtuple
 from functools import partial
+from pathlib import Path
 
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from django.db.models import Exists
+from django.db.models import OuterRef
 from django.db.models import Q
+from django.utils.module_loading import import_string
 
 import attr
 from commoncode.ignore import default_ignores
 from container_inspector.distro import Distro
+from packagedcode.models import PackageFile
 
 from scanpipe import pipes
+from scanpipe.models import CodebaseResource
+from scanpipe.models import DiscoveredPackage
 from scanpipe.pipes import alpine
 from scanpipe.pipes import debian
 from scanpipe.pipes import rpm
+from scanpipe.pipes import scancode
+from scanpipe.pipes import tagging
 from scanpipe.pipes import windows
+from scanpipe.pipes.cache import FileSystemCache
+from scanpipe.pipes.cache import get_cache_key
 
 logger = logging.getLogger(__name__)
 
+UNINTERESTING_RULES = [
+    tagging.Rule(
+        status="ignored-not-interesting",
+        field="rootfs_path",
+        lookup="startswith",
+        values=(
+            "/tmp/",
+            "/etc/",
+            "/var/",
+            "/proc/",
+            "/dev/",
+            "/run/",
+            "/lib/apk/db/",  # alpine specific
+        ),
+    ),
+]
+
+MEDIA_FILE_RULES = [
+    tagging.Rule(
+        status="ignored-media-file",
+        field="is_media",
+        lookup="exact",
+        values=(True,),
+    ),
+]
+
 PACKAGE_GETTER_BY_DISTRO = {
     "alpine": alpine.package_getter,
     "debian": partial(debian.package_getter, distro="debian"),
@@ -54,6 +94,36 @@ PACKAGE_GETTER_BY_DISTRO = {
     "windows": windows.package_getter,
 }
 
+# The licenses of the installed packages of these distros are detected in a second
+# phase, in parallel, after the quick collection of the installed packages.
+LICENSE_DETECTOR_BY_DISTRO = {
+    "debian": debian.detect_licenses,
+    "ubuntu": debian.detect_licenses,
+    "rhel": rpm.detect_licenses,
+    "centos": rpm.detect_licenses,
+    "fedora": rpm.detect_licenses,
+    "sles": rpm.detect_licenses,
+    "opensuse": rpm.detect_licenses,
+    "opensuse-tumbleweed": rpm.detect_licenses,
+    "photon": rpm.detect_licenses,
+}
+
+# The installed packages database files of these distros, relative to the root
+# directory. The parsed installed packages are cached using the content of these
+# files as the key.
+PACKAGE_DB_PATHS_BY_DISTRO = {
+    "alpine": ("lib/apk/db/installed",),
+    "debian": ("var/lib/dpkg/status", "var/lib/dpkg/status.d"),
+    "ubuntu": ("var/lib/dpkg/status", "var/lib/dpkg/status.d"),
+    "rhel": ("var/lib/rpm", "usr/lib/sysimage/rpm"),
+    "centos": ("var/lib/rpm", "usr/lib/sysimage/rpm"),
+    "fedora": ("var/lib/rpm", "usr/lib/sysimage/rpm"),
+    "sles": ("var/lib/rpm", "usr/lib/sysimage/rpm"),
+    "opensuse": ("var/lib/rpm", "usr/lib/sysimage/rpm"),
+    "opensuse-tumbleweed": ("var/lib/rpm", "usr/lib/sysimage/rpm"),
+    "photon": ("var/lib/rpm", "usr/lib/sysimage/rpm"),
+}
+
 
 class DistroNotFound(Exception):
     pass
@@ -157,12 +227,10 @@ def create_codebase_resources(project, rootfs):
     """
     Creates the CodebaseResource for a `rootfs` in `project`.
     """
-    for resource in rootfs.get_resources():
-        pipes.make_codebase_resource(
-            project=project,
-            location=resource.location,
-            rootfs_path=resource.rootfs_path,
-        )
+    resources = (
+        (resource.location, resource.rootfs_path) for resource in rootfs.get_resources()
+    )
+    pipes.make_codebase_resources(project, resources)
 
 
 def has_hash_diff(install_file, codebase_resource):
@@ -190,72 +258,346 @@ def has_hash_diff(install_file, codebase_resource):
     return False
 
 
-def scan_rootfs_for_system_packages(project, rootfs, detect_licenses=True):
-    """
-    Given a `project` Project and a `rootfs` RootFs, scan the `rootfs` for
-    installed system packages, and create a DiscoveredPackage for each.
+ResourceHashes = namedtuple("ResourceHashes", ["pk", "sha512", "sha256", "sha1", "md5"])
 
-    Then for each installed DiscoveredPackage file, check if it exists
-    as a CodebaseResource. If exists, relate that CodebaseResource to its
-    DiscoveredPackage; otherwise, keep that as a missing file.
+
+def get_resources_by_rootfs_path(project, rootfs):
     """
-    if not rootfs.distro:
-        raise DistroNotFound(f"Distro not found.")
+    Returns a {rootfs_path: [ResourceHashes]} mapping of the `project`
+    CodebaseResource located in the `rootfs`.
+    """
+    codebase_dir = str(project.codebase_path)
+    resources = project.codebaseresources.exclude(rootfs_path="").order_by()
 
-    distro_id = rootfs.distro.identifier
-    if distro_id not in PACKAGE_GETTER_BY_DISTRO:
-        raise DistroNotSupported(f'Distro "{distro_id}" is not supported.')
+    if rootfs.location.startswith(codebase_dir):
+        rootfs_dir = rootfs.location.replace(codebase_dir, "", 1)
+        resources = resources.filter(path__startswith=f"{rootfs_dir.rstrip('/')}/")
 
-    package_getter = partial(
-        PACKAGE_GETTER_BY_DISTRO[distro_id],
-        distro=distro_id,
-        detect_licenses=detect_licenses,
+    resources_by_rootfs_path = defaultdict(list)
+    values = resources.values_list("rootfs_path", *ResourceHashes._fields)
+    for rootfs_path, *hashes in values.iterator(chunk_size=10000):
+        resources_by_rootfs_path[rootfs_path].append(ResourceHashes(*hashes))
+
+    return resources_by_rootfs_path
+
+
+def create_system_packages(project, installed_packages):
+    """
+    Creates a DiscoveredPackage for each (purl, package, resources_by_rootfs_path)
+    of the `installed_packages` and relates each package to the CodebaseResource
+    of its installed files using its `resources_by_rootfs_path`
+    {rootfs_path: [ResourceHashes]} mapping.
+
+    The installed files that are not found are stored as the package
+    `missing_resources`, the ones with a different hash as `modified_resources`.
+    The packages are written with bulk upserts, the package to resources relations
+    with bulk inserts, and the "system-package" status with bulk updates.
+    """
+    installed_packages = list(installed_packages)
+    packages_data = [package.to_dict() for _, package, _ in installed_packages]
+    package_pks_by_purl = pipes.update_or_create_packages(project, packages_data)
+    packages_by_pk = project.discoveredpackages.in_bulk(package_pks_by_purl.values())
+
+    ThroughModel = DiscoveredPackage.codebase_resources.through
+    existing_relations = set(
+        ThroughModel.objects.filter(
+            discoveredpackage_id__in=packages_by_pk.keys()
+        ).values_list("discoveredpackage_id", "codebaseresource_id")
     )
 
-    installed_packages = rootfs.get_installed_packages(package_getter)
+    relations = []
+    system_package_resource_pks = set()
+    updated_packages = {}
 
-    for i, (purl, package) in enumerate(installed_packages):
-        logger.info(f"Creating package #{i}: {purl}")
-        created_package = pipes.update_or_create_package(project, package.to_dict())
+    for (purl, package, resources_by_rootfs_path), package_data in zip(
+        installed_packages, packages_data
+    ):
+        package_pk = package_pks_by_purl.get(pipes.get_package_purl(package_data))
+        created_package = packages_by_pk.get(package_pk)
+        if not created_package:
+            continue
 
         # We have no files for this installed package, we cannot go further.
         if not package.installed_files:
             logger.info(f"  No installed_files for: {purl}")
             continue
 
-        missing_resources = created_package.missing_resources[:]
-        modified_resources = created_package.modified_resources[:]
-
-        codebase_resources = project.codebaseresources.all()
+        missing_resources = created_package.missing_resources
+        modified_resources = created_package.modified_resources
 
         for install_file in package.installed_files:
             rootfs_path = pipes.normalize_path(install_file.path)
-            logger.info(f"   installed file rootfs_path: {rootfs_path}")
+            codebase_resources = resources_by_rootfs_path.get(rootfs_path)
 
-            try:
-                codebase_resource = codebase_resources.get(
-                    rootfs_path=rootfs_path,
-                )
-            except ObjectDoesNotExist:
+            if not codebase_resources:
                 if rootfs_path not in missing_resources:
                     missing_resources.append(rootfs_path)
-                logger.info(f"      installed file is missing: {rootfs_path}")
                 continue
 
-            # id list?
-            if created_package not in codebase_resource.discovered_packages.all():
-                codebase_resource.discovered_packages.add(created_package)
-                codebase_resource.status = "system-package"
-                logger.info(f"      added as system-package to: {purl}")
-                codebase_resource.save()
+            for codebase_resource in codebase_resources:
+                relation = (package_pk, codebase_resource.pk)
+                if relation not in existing_relations:
+                    existing_relations.add(relation)
+                    relations.append(
+                        ThroughModel(
+                            discoveredpackage_id=package_pk,
+                            codebaseresource_id=codebase_resource.pk,
+                        )
+                    )
+                    system_package_resource_pks.add(codebase_resource.pk)
+
+                if has_hash_diff(install_file, codebase_resource):
+                    if install_file.path not in modified_resources:
+                        modified_resources.append(install_file.path)
+
+        updated_packages[package_pk] = created_package
+        logger.info(
+            f"Package {purl}: {len(package.installed_files)} installed files, "
+            f"{len(missing_resources)} missing, {len(modified_resources)} modified"
+        )
+
+    ThroughModel.objects.bulk_create(relations, batch_size=5000)
+
+    system_package_resource_pks = list(system_package_resource_pks)
+    for index in range(0, len(system_package_resource_pks), 5000):
+        chunk = system_package_resource_pks[index : index + 5000]
+        CodebaseResource.objects.filter(pk__in=chunk).update(status="system-package")
+
+    DiscoveredPackage.objects.bulk_update(
+        updated_packages.values(),
+        fields=["missing_resources", "modified_resources"],
+        batch_size=1000,
+    )
+
+
+def get_package_getter(distro_id, detect_licenses=True):
+    """
+    Returns a (package_getter, license_detector) tuple for the `distro_id`.
+
+    When `detect_licenses` is True and the distro has a license detector, the
+    `package_getter` collects the installed packages without license detection and
+    the `license_detector` is to be called afterwards with the
+    (package, root_dir) of the collected packages to detect their licenses in
+    parallel. The `license_detector` is None otherwise.
+    """
+    license_detector = None
+    if detect_licenses:
+        license_detector = LICENSE_DETECTOR_BY_DISTRO.get(distro_id)
+
+    package_getter = partial(
+        PACKAGE_GETTER_BY_DISTRO[distro_id],
+        distro=distro_id,
+        detect_licenses=detect_licenses and not license_detector,
+    )
+    return package_getter, license_detector
+
+
+def get_installed_packages_cache():
+    """
+    Returns the installed packages cache as a FileSystemCache stored in the scan
+    results cache directory, or None if the scan results cache is not enabled.
+    """
+    if not scancode.SCANCODEIO_SCAN_CACHE_LOCATION:
+        return
+
+    location = Path(scancode.SCANCODEIO_SCAN_CACHE_LOCATION) / "installed_packages"
+    max_size = scancode.SCANCODEIO_SCAN_CACHE_MAX_SIZE * 1024 * 1024
+    return FileSystemCache(location, max_size)
 
-            if has_hash_diff(install_file, codebase_resource):
-                if install_file.path not in modified_resources:
-                    modified_resources.append(install_file.path)
 
-        created_package.missing_resources = missing_resources
-        created_package.modified_resources = modified_resources
-        created_package.save()
+def get_package_db_checksum(root_dir, distro_id):
+    """
+    Returns a sha1 checksum of the content of the installed packages database files
+    of the `distro_id` found in the `root_dir`, or None if there are no such files.
+    """
+    sha1 = hashlib.sha1()
+    found = False
+
+    for db_path in PACKAGE_DB_PATHS_BY_DISTRO.get(distro_id, []):
+        db_location = Path(root_dir) / db_path
+        if db_location.is_dir():
+            locations = sorted(
+                path for path in db_location.rglob("*") if path.is_file()
+            )
+        elif db_location.is_file():
+            locations = [db_location]
+        else:
+            continue
+
+        for location in locations:
+            sha1.update(str(location.relative_to(root_dir)).encode("utf-8"))
+            sha1.update(location.read_bytes())
+            found = True
+
+    if found:
+        return sha1.hexdigest()
+
+
+def dump_package(package):
+    """
+    Returns a JSON serializable mapping of the `package` including its installed
+    files and its class import path.
+    """
+    package_class = package.__class__
+    return {
+        "class": f"{package_class.__module__}.{package_class.__qualname__}",
+        "data": package.to_dict(_detailed=True),
+    }
+
+
+def load_package(package_dump):
+    """
+    Returns a package object from a `package_dump` mapping of `dump_package`.
+    """
+    package_class = import_string(package_dump["class"])
+    field_names = {field.name for field in attr.fields(package_class)}
+    package_data = dict(package_dump["data"])
+    installed_files = [
+        PackageFile(**installed_file)
+        for installed_file in package_data.pop("installed_files", [])
+    ]
+
+    return package_class(
+        installed_files=installed_files,
+        **{key: value for key, value in package_data.items() if key in field_names},
+    )
+
+
+class CachedPackageGetter:
+    """
+    A package getter callable for the `distro_id` that reuses the installed
+    packages cached for a root directory with the same installed packages database
+    content, distro and ScanCode-toolkit version.
+
+    On a cache miss, the installed packages are collected without license detection
+    and kept as pending. Call `detect_licenses` once all the root directories are
+    collected to detect the licenses of the pending packages in parallel, and to
+    store them in the cache.
+
+    As in `Image.get_installed_packages`, a package is reported in the first root
+    directory where its purl is seen. Its further instances are not detected, unless
+    they are stored in the cache.
+    """
+
+    def __init__(self, distro_id, detect_licenses=True, cache=None):
+        self.distro_id = distro_id
+        self.detect_licenses_enabled = detect_licenses
+        self.package_getter, self.license_detector = get_package_getter(
+            distro_id, detect_licenses
+        )
+        self.cache = cache
+        # List of (cache_key, root_dir, installed_packages, first_seen_purls) collected
+        # on cache misses, where `installed_packages` is a list of (purl, package).
+        self.pending = []
+        # The purls of all the packages returned, in the order of the calls.
+        self.seen_purls = set()
+
+    def get_cache_key(self, root_dir):
+        """
+        Returns the cache key of the installed packages of the `root_dir`, or None.
+        """
+        if not self.cache:
+            return
+
+        checksum = get_package_db_checksum(root_dir, self.distro_id)
+        if checksum:
+            return get_cache_key(
+                checksum,
+                self.distro_id,
+                scancode.scancode_version,
+                self.detect_licenses_enabled,
+            )
+
+    def __call__(self, root_dir, **kwargs):
+        cache_key = self.get_cache_key(root_dir)
+        if cache_key:
+            package_dumps = self.cache.get(cache_key)
+            if package_dumps is not None:
+                packages = [
+                    load_package(package_dump) for package_dump in package_dumps
+                ]
+                installed_packages = [(package.purl, package) for package in packages]
+                self.seen_purls.update(purl for purl, _ in installed_packages)
+                return installed_packages
+
+        installed_packages = list(self.package_getter(root_dir))
+        first_seen_purls = {
+            purl for purl, _ in installed_packages if purl not in self.seen_purls
+        }
+        self.seen_purls.update(first_seen_purls)
+        self.pending.append((cache_key, root_dir, installed_packages, first_seen_purls))
+        return installed_packages
+
+    def detect_licenses(self, installed_packages=None):
+        """
+        Detects the licenses of the pending packages in parallel and stores them in
+        the cache.
+        When the cache is not used, the detection is limited to the first instance
+        of each purl, among the `installed_packages` list of (purl, package) when
+        provided.
+        """
+        installed_purls = None
+        if installed_packages is not None:
+            installed_purls = {purl for purl, _ in installed_packages}
+
+        packages_and_root_dirs = []
+        for cache_key, root_dir, pending_packages, first_seen_purls in self.pending:
+            for purl, package in pending_packages:
+                if not cache_key:
+                    if purl not in first_seen_purls:
+                        continue
+                    if installed_purls is not None and purl not in installed_purls:
+                        continue
+                    # Only the first package of a purl is detected.
+                    first_seen_purls.discard(purl)
+                packages_and_root_dirs.append((package, root_dir))
+
+        if self.license_detector and packages_and_root_dirs:
+            self.license_detector(packages_and_root_dirs)
+
+        for cache_key, _, pending_packages, _ in self.pending:
+            if cache_key:
+                package_dumps = [
+                    dump_package(package) for _, package in pending_packages
+                ]
+                self.cache.set(cache_key, package_dumps)
+
+        if self.cache:
+            logger.info(f"Installed packages cache: {self.cache.get_stats()}")
+
+        self.pending = []
+
+
+def scan_rootfs_for_system_packages(project, rootfs, detect_licenses=True):
+    """
+    Given a `project` Project and a `rootfs` RootFs, scan the `rootfs` for
+    installed system packages, and create a DiscoveredPackage for each.
+
+    Then for each installed DiscoveredPackage file, check if it exists
+    as a CodebaseResource. If exists, relate that CodebaseResource to its
+    DiscoveredPackage; otherwise, keep that as a missing file.
+    """
+    if not rootfs.distro:
+        raise DistroNotFound(f"Distro not found.")
+
+    distro_id = rootfs.distro.identifier
+    if distro_id not in PACKAGE_GETTER_BY_DISTRO:
+        raise DistroNotSupported(f'Distro "{distro_id}" is not supported.')
+
+    package_getter = CachedPackageGetter(
+        distro_id, detect_licenses, cache=get_installed_packages_cache()
+    )
+    installed_packages = list(rootfs.get_installed_packages(package_getter))
+    package_getter.detect_licenses(installed_packages)
+
+    resources_by_rootfs_path = get_resources_by_rootfs_path(project, rootfs)
+    create_system_packages(
+        project,
+        (
+            (purl, package, resources_by_rootfs_path)
+            for purl, package in installed_packages
+        ),
+    )
 
 
 def get_resource_with_md5(project, status):
@@ -276,37 +618,61 @@ def match_not_analyzed(
     not_analyzed_status="not-analyzed",
 ):
     """
-    Given a `project` Project :
-    1. Build an MD5 index of files assigned to a package that has a status of
-    `reference_status`
-    2. Attempt to match resources with status `not_analyzed_status` to that
-    index
-    3. Relate each matched CodebaseResource to the matching DiscoveredPackage and
-    set its status.
+    Given a `project` Project, relates each resource with a `not_analyzed_status`
+    status to the DiscoveredPackage of a resource with a `reference_status` status
+    and the same md5 and size. The status of the matched resources is set to
+    `reference_status`.
+
+    The matching is done in the database with a single INSERT ... SELECT joining
+    the resources on their (md5, size) to create the package relations, and a
+    single UPDATE for the statuses.
+    Returns the number of matched resources.
     """
-    known_resources = get_resource_with_md5(project=project, status=reference_status)
-    known_resources_by_md5_size = {
-        (
-            r.md5,
-            r.size,
-        ): r
-        for r in known_resources
-    }
-    count = 0
-    matchables = get_resource_with_md5(project=project, status=not_analyzed_status)
-    for matchable in matchables:
-        key = (
-            matchable.md5,
-            matchable.size,
+    resource_table = CodebaseResource._meta.db_table
+    relation_table = DiscoveredPackage.codebase_resources.through._meta.db_table
+
+    # When several packages match, the one of the first reference resource is used.
+    insert_relations_sql = f"""
+        INSERT INTO {relation_table} (discoveredpackage_id, codebaseresource_id)
+        SELECT DISTINCT ON (matchable.id) relation.discoveredpackage_id, matchable.id
+        FROM {resource_table} AS matchable
+        INNER JOIN {resource_table} AS reference
+            ON reference.project_id = matchable.project_id
+            AND reference.status = %s
+            AND reference.md5 = matchable.md5
+            AND reference.size = matchable.size
+        INNER JOIN {relation_table} AS relation
+            ON relation.codebaseresource_id = reference.id
+        WHERE matchable.project_id = %s
+            AND matchable.status = %s
+            AND matchable.md5 <> ''
+            AND matchable.size <> 0
+        ORDER BY matchable.id, reference.id, relation.discoveredpackage_id
+        ON CONFLICT DO NOTHING
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            insert_relations_sql, [reference_status, project.pk, not_analyzed_status]
         )
-        matched = known_resources_by_md5_size.get(key)
-        if matched is None:
-            continue
-        count += 1
-        package = matched.discovered_packages.all()[0]
-        matchable.status = reference_status
-        matchable.discovered_packages.add(package)
-        matchable.save()
+
+    references_with_package = CodebaseResource.objects.filter(
+        project=project,
+        status=reference_status,
+        md5=OuterRef("md5"),
+        size=OuterRef("size"),
+        discovered_packages__isnull=False,
+    )
+    # The `status` is filtered explicitly as `get_resource_with_md5` returns the
+    # resources with any status for an empty `status`.
+    matchables = (
+        project.codebaseresources.filter(status=not_analyzed_status)
+        .exclude(md5__exact="")
+        .exclude(size__exact=0)
+    )
+    return matchables.filter(Exists(references_with_package)).update(
+        status=reference_status
+    )
 
 
 def tag_empty_codebase_resources(project):
@@ -324,22 +690,32 @@ def tag_uninteresting_codebase_resources(project):
     - Generated
     - Log file of sorts (such as var) using few heuristics
     """
-    uninteresting_and_transient = (
-        "/tmp/",
-        "/etc/",
-        "/var/",
-        "/proc/",
-        "/dev/",
-        "/run/",
-        "/lib/apk/db/",  # alpine specific
-    )
+    tagging.tag_codebase_resources(project, UNINTERESTING_RULES)
 
-    lookups = Q()
-    for segment in uninteresting_and_transient:
-        lookups |= Q(rootfs_path__startswith=segment)
 
-    qs = project.codebaseresources.no_status()
-    qs.filter(lookups).update(status="ignored-not-interesting")
+def get_ignorable_rules():
+    """
+    Returns the tagging rules of the ignorable files/directories, from the glob
+    patterns of commoncode.ignore.
+    """
+    patterns = list(default_ignores.keys())
+    # Translate glob patterns to regex
+    translated_patterns = [fnmatch.translate(pattern) for pattern in patterns]
+
+    return [
+        tagging.Rule(
+            status="ignored-default-ignores",
+            field="rootfs_path",
+            lookup="icontains",
+            values=patterns,
+        ),
+        tagging.Rule(
+            status="ignored-default-ignores",
+            field="rootfs_path",
+            lookup="iregex",
+            values=translated_patterns,
+        ),
+    ]
 
 
 def tag_ignorable_codebase_resources(project):
@@ -347,18 +723,7 @@ def tag_ignorable_codebase_resources(project):
     Using the glob patterns from commoncode.ignore of ignorable files/directories,
     tag codebase resources from `project` if their paths match an ignorable pattern.
     """
-    lookups = Q()
-    for pattern in default_ignores.keys():
-        # Translate glob pattern to regex
-        translated_pattern = fnmatch.translate(pattern)
-        # PostgreSQL does not like parts of Python regex
-        if translated_pattern.startswith("(?s"):
-            translated_pattern = translated_pattern.replace("(?s", "(?")
-        lookups |= Q(rootfs_path__icontains=pattern)
-        lookups |= Q(rootfs_path__iregex=translated_pattern)
-
-    qs = project.codebaseresources.no_status()
-    qs.filter(lookups).update(status="ignored-default-ignores")
+    tagging.tag_codebase_resources(project, get_ignorable_rules())
 
 
 def tag_data_files_with_no_clues(project):
@@ -385,5 +750,4 @@ def tag_media_files_as_uninteresting(project):
     """
     Tags CodebaseResources that are media files to be uninteresting.
     """
-    qs = project.codebaseresources.no_status()
-    qs.filter(is_media=True).update(status="ignored-media-file")
+    tagging.tag_codebase_resources(project, MEDIA_FILE_RULES)
@@ -22,6 +22,8 @@
 
 from packagedcode import rpm
 
+from scanpipe.pipes import scancode
+
 
 def package_getter(root_dir, detect_licenses=True, **kwargs):
     """
@@ -30,3 +32,26 @@ def package_getter(root_dir, detect_licenses=True, **kwargs):
     packages = rpm.get_installed_packages(root_dir, detect_licenses=detect_licenses)
     for package in packages:
         yield package.purl, package
+
+
+def get_license_expression(declared_license):
+    """
+    Returns the license expression detected from the RPM `declared_license`.
+    """
+    _declared, detected = rpm.detect_declared_license(declared_license)
+    return detected
+
+
+def detect_licenses(installed_packages):
+    """
+    Detects the license expression from the declared license of each
+    (package, root_dir) of the `installed_packages` and sets it on the package.
+    The declared licenses are processed in parallel in the scan process pool.
+    """
+    packages = [package for package, _ in installed_packages]
+    license_expressions = scancode.map_in_scan_pool(
+        get_license_expression, [package.declared_license for package in packages]
+    )
+
+    for package, license_expression in zip(packages, license_expressions):
+        package.license_expression = license_expression
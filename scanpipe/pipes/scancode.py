@@ -20,31 +20,57 @@
 # ScanCode.io is a free software code scanning tool from nexB Inc. and others.
 # Visit https://github.com/nexB/scancode.io for support and download.
 
+import atexit
 import concurrent.futures
 import hashlib
-import json
+import itertools
 import logging
+import math
+import multiprocessing
 import os
+import posixpath
 import shlex
+import signal
+import time
+from abc import ABC
+from abc import abstractmethod
 from collections import defaultdict
+from collections import deque
+from collections import namedtuple
+from contextlib import suppress
 from functools import partial
 from pathlib import Path
 
 from django.apps import apps
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.forms import model_to_dict
 
 import packagedcode
+from celery import group
 from commoncode import fileutils
 from commoncode.resource import VirtualCodebase
 from extractcode import all_kinds
 from extractcode.extract import extract_file
+from licensedcode.cache import get_cache as get_license_cache
 from scancode import ScancodeError
 from scancode import Scanner
 from scancode import api as scancode_api
 from scancode import cli as scancode_cli
+from scancode_config import __version__ as scancode_version
 
 from scanpipe import pipes
+from scanpipe import tasks
 from scanpipe.models import CodebaseResource
+from scanpipe.models import DiscoveredPackage
+from scanpipe.models import ProjectError
+from scanpipe.models import get_parent_path
+from scanpipe.pipelines import PipelineSuspended
+from scanpipe.pipes import jsonstream
+from scanpipe.pipes.cache import FileSystemCache
+from scanpipe.pipes.cache import get_cache_key
 
 logger = logging.getLogger("scanpipe.pipes")
 
@@ -59,6 +85,53 @@ scanpipe_app = apps.get_app_config("scanpipe")
 # machine has CPUs.
 SCANCODEIO_PROCESSES = getattr(settings, "SCANCODEIO_PROCESSES", None)
 
+# The number of scan tasks kept in flight for each process of the pool.
+# New resources are pulled from the database as the tasks complete.
+SCANCODEIO_SCAN_QUEUE_SIZE_PER_PROCESS = getattr(
+    settings, "SCANCODEIO_SCAN_QUEUE_SIZE_PER_PROCESS", 4
+)
+
+# The scan results are written in the database in batches of this number of resources,
+# or every SCANCODEIO_SCAN_FLUSH_INTERVAL seconds, whichever comes first.
+SCANCODEIO_SCAN_BATCH_SIZE = getattr(settings, "SCANCODEIO_SCAN_BATCH_SIZE", 1000)
+SCANCODEIO_SCAN_FLUSH_INTERVAL = getattr(settings, "SCANCODEIO_SCAN_FLUSH_INTERVAL", 10)
+
+# The directory where the scan results are cached, keyed by the file content sha1.
+# The cache is shared across projects and disabled when not set.
+SCANCODEIO_SCAN_CACHE_LOCATION = getattr(settings, "SCANCODEIO_SCAN_CACHE_LOCATION", "")
+# The maximum size of the scan results cache in MB.
+# The least recently used entries are evicted first.
+SCANCODEIO_SCAN_CACHE_MAX_SIZE = getattr(
+    settings, "SCANCODEIO_SCAN_CACHE_MAX_SIZE", 1024
+)
+
+# Run the package and file scans in a single pass in the root filesystem pipelines.
+SCANCODEIO_SCAN_FUSED = getattr(settings, "SCANCODEIO_SCAN_FUSED", False)
+
+# Select the file scanners to run for each resource based on its file type.
+# The files larger than SCANCODEIO_SCAN_PREFILTER_MAX_SIZE MB are only scanned for
+# copyrights and licenses.
+SCANCODEIO_SCAN_PREFILTER = getattr(settings, "SCANCODEIO_SCAN_PREFILTER", False)
+SCANCODEIO_SCAN_PREFILTER_MAX_SIZE = getattr(
+    settings, "SCANCODEIO_SCAN_PREFILTER_MAX_SIZE", 10
+)
+
+# The number of shards the scans are split in to be distributed across the Celery
+# workers. The scans are not distributed when set to 0 or 1.
+SCANCODEIO_SCAN_SHARDS = getattr(settings, "SCANCODEIO_SCAN_SHARDS", 0)
+
+# The maximum wall-clock time in seconds to scan a single file in the pool workers.
+SCANCODEIO_SCAN_FILE_TIMEOUT = getattr(settings, "SCANCODEIO_SCAN_FILE_TIMEOUT", 600)
+
+# The scan pool workers are replaced once a worker completed this number of tasks, or
+# when its resident memory exceeds SCANCODEIO_SCAN_MAX_WORKER_MEMORY MB.
+SCANCODEIO_SCAN_MAX_TASKS_PER_WORKER = getattr(
+    settings, "SCANCODEIO_SCAN_MAX_TASKS_PER_WORKER", 10000
+)
+SCANCODEIO_SCAN_MAX_WORKER_MEMORY = getattr(
+    settings, "SCANCODEIO_SCAN_MAX_WORKER_MEMORY", 4096
+)
+
 
 def extract(location, target):
     """
@@ -124,6 +197,41 @@ def get_resource_info(location):
     return file_info
 
 
+def get_max_workers():
+    """
+    Returns the number of processes to use for multiprocessing calls, see the
+    SCANCODEIO_PROCESSES setting.
+    """
+    if SCANCODEIO_PROCESSES is None:
+        return os.cpu_count() - 1 or 1
+    return SCANCODEIO_PROCESSES
+
+
+def map_in_scan_pool(func, items):
+    """
+    Returns the list of `func` results for each of the `items`.
+    The calls are run in parallel in the scan process pool when multiprocessing is
+    enabled. The `func` and `items` must be picklable.
+    """
+    items = list(items)
+    max_workers = get_max_workers()
+    if max_workers <= 0 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    scan_pool = get_scan_pool(max_workers)
+    chunksize = max(len(items) // (max_workers * 4), 1)
+    return list(scan_pool.map(func, items, chunksize=chunksize))
+
+
+def get_resources_info(locations):
+    """
+    Returns a list of `get_resource_info` mappings for each of the `locations`.
+    The file info are computed in parallel in the scan process pool when
+    multiprocessing is enabled.
+    """
+    return map_in_scan_pool(get_resource_info, locations)
+
+
 def _scan_resource(location, scanners, with_threading=True):
     """
     Wraps the scancode-toolkit `scan_resource` method to support timeout on direct
@@ -141,20 +249,76 @@ def _scan_resource(location, scanners, with_threading=True):
     return results, errors
 
 
-def scan_file(location, with_threading=True):
+def scan_file(location, with_threading=True, scanner_names=None):
     """
     Runs a license, copyright, email, and url scan on a provided `location`,
     using the scancode-toolkit direct API.
+    The scan can be limited to a subset of `scanner_names`, see
+    `select_file_scanners`.
 
     Returns a dictionary of scan `results` and a list of `errors`.
     """
+    scanners = _get_file_scanners(scanner_names)
+    return _scan_resource(location, scanners, with_threading)
+
+
+def _get_file_scanners(scanner_names=None):
     scanners = [
         Scanner("copyrights", scancode_api.get_copyrights),
         Scanner("licenses", partial(scancode_api.get_licenses, include_text=True)),
         Scanner("emails", scancode_api.get_emails),
         Scanner("urls", scancode_api.get_urls),
     ]
-    return _scan_resource(location, scanners, with_threading)
+    if scanner_names is None:
+        return scanners
+    return [scanner for scanner in scanners if scanner.name in scanner_names]
+
+
+def select_file_scanners(resource_info):
+    """
+    Returns the names of the file scanners worth running on a resource given its
+    `resource_info` mapping of CodebaseResource fields values.
+
+    The copyrights, licenses, emails, and urls scanners are all selected for text
+    files. Media and compressed files are not scanned. Other binaries, minified
+    JavaScript, and files larger than SCANCODEIO_SCAN_PREFILTER_MAX_SIZE are only
+    scanned for copyrights and licenses.
+    """
+    all_scanners = ["copyrights", "licenses", "emails", "urls"]
+    legal_scanners = ["copyrights", "licenses"]
+
+    file_type = resource_info.get("file_type") or ""
+    mime_type = resource_info.get("mime_type") or ""
+    is_binary = resource_info.get("is_binary")
+
+    if is_binary and resource_info.get("is_media"):
+        return []
+
+    if "compressed data" in file_type or mime_type in COMPRESSED_MIME_TYPES:
+        return []
+
+    if is_binary:
+        return legal_scanners
+
+    is_javascript = resource_info.get("programming_language") == "JavaScript"
+    path = resource_info.get("path") or ""
+    if is_javascript and path.endswith(".min.js"):
+        return legal_scanners
+
+    max_size = SCANCODEIO_SCAN_PREFILTER_MAX_SIZE * 1024 * 1024
+    if max_size and (resource_info.get("size") or 0) > max_size:
+        return legal_scanners
+
+    return all_scanners
+
+
+COMPRESSED_MIME_TYPES = [
+    "application/gzip",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-lzma",
+    "application/zstd",
+]
 
 
 def scan_for_package_info(location, with_threading=True):
@@ -169,44 +333,845 @@ def scan_for_package_info(location, with_threading=True):
     return _scan_resource(location, scanners, with_threading)
 
 
+def scan_for_package_and_file_info(location, with_threading=True, scanner_names=None):
+    """
+    Runs a package, license, copyright, email, and url scan on provided `location`
+    in a single pass, using the scancode-toolkit direct API.
+    The file scanners can be limited to a subset of `scanner_names`, the package
+    scanner is always run.
+
+    Returns a dict of scan `results` and a list of `errors`.
+    """
+    scanners = [
+        Scanner("packages", scancode_api.get_package_info),
+        *_get_file_scanners(scanner_names),
+    ]
+    return _scan_resource(location, scanners, with_threading)
+
+
 def save_scan_file_results(codebase_resource, scan_results, scan_errors):
     """
     Saves the resource scan file results in the database.
     Creates project errors if any occurred during the scan.
+    This is the single resource version of the `FileScanResultsWriter`.
     """
-    if scan_errors:
-        codebase_resource.add_errors(scan_errors)
-        codebase_resource.status = "scanned-with-error"
-    else:
-        codebase_resource.status = "scanned"
-
-    codebase_resource.set_scan_results(scan_results, save=True)
+    with FileScanResultsWriter(codebase_resource.project) as writer:
+        writer.save(codebase_resource, scan_results, scan_errors)
 
 
 def save_scan_package_results(codebase_resource, scan_results, scan_errors):
     """
     Saves the resource scan package results in the database.
     Creates project errors if any occurred during the scan.
+    This is the single resource version of the `PackageScanResultsWriter`.
+    """
+    with PackageScanResultsWriter(codebase_resource.project) as writer:
+        writer.save(codebase_resource, scan_results, scan_errors)
+
+
+class ScanResultsWriter(ABC):
+    """
+    Collects the scan results of codebase resources and writes those in the
+    database in batches, instead of saving each resource one at a time.
+
+    The results are flushed every `batch_size` resources or when `flush_interval`
+    seconds are elapsed since the previous flush, whichever comes first.
+    Use this class as a context manager to ensure that the remaining results are
+    flushed at the end of the scan.
+
+    Subclasses implement `add_results` and may extend `get_update_fields`.
+    """
+
+    def __init__(self, project, batch_size=None, flush_interval=None):
+        self.project = project
+        self.batch_size = batch_size or SCANCODEIO_SCAN_BATCH_SIZE
+        self.flush_interval = flush_interval or SCANCODEIO_SCAN_FLUSH_INTERVAL
+        self.resources = []
+        self.project_errors = []
+        self.last_flush_time = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def save(self, codebase_resource, scan_results, scan_errors):
+        """
+        Collects the `scan_results` and `scan_errors` of the `codebase_resource`.
+        The signature is compatible with the `save_func` of `_scan_and_save`.
+        """
+        if scan_errors:
+            self.add_errors(codebase_resource, scan_errors)
+
+        if self.add_results(codebase_resource, scan_results, scan_errors):
+            self.resources.append(codebase_resource)
+
+        elapsed_time = time.monotonic() - self.last_flush_time
+        if len(self.resources) >= self.batch_size or (
+            elapsed_time >= self.flush_interval
+        ):
+            self.flush()
+
+    def get_update_fields(self):
+        """
+        Returns the list of CodebaseResource fields updated on flush.
+        """
+        return ["status"]
+
+    @abstractmethod
+    def add_results(self, codebase_resource, scan_results, scan_errors):
+        """
+        Sets the `scan_results` on the `codebase_resource` instance.
+        Returns True if the `codebase_resource` needs to be updated in the database.
+        """
+
+    def add_errors(self, codebase_resource, scan_errors):
+        """
+        Collects a "ProjectError" for each of the `scan_errors`.
+        """
+        details = model_to_dict(codebase_resource)
+        for error in scan_errors:
+            self.project_errors.append(
+                ProjectError(
+                    project=self.project,
+                    model=codebase_resource.__class__.__name__,
+                    details=details,
+                    message=str(error),
+                )
+            )
+
+    def flush(self):
+        """
+        Writes the collected results in the database.
+        """
+        if self.resources:
+            CodebaseResource.objects.bulk_update(
+                self.resources,
+                fields=self.get_update_fields(),
+                batch_size=self.batch_size,
+            )
+        if self.project_errors:
+            ProjectError.objects.bulk_create(self.project_errors)
+
+        self.resources = []
+        self.project_errors = []
+        self.last_flush_time = time.monotonic()
+
+
+class FileScanResultsWriter(ScanResultsWriter):
+    """
+    Writes the results of `scan_file` in batches.
+    The license policies are injected and the `compliance_alert` computed the same
+    way as in `CodebaseResource.save()`.
+    """
+
+    def get_update_fields(self):
+        return [
+            *CodebaseResource.scan_fields(),
+            "license_keys",
+            "license_categories",
+            "has_unknown_license",
+            "status",
+            "compliance_alert",
+            "extra_data",
+        ]
+
+    def add_results(self, codebase_resource, scan_results, scan_errors):
+        if scan_errors:
+            codebase_resource.status = "scanned-with-error"
+        else:
+            codebase_resource.status = "scanned"
+
+        codebase_resource.set_scan_results(scan_results)
+        codebase_resource.set_license_fields()
+
+        if scanpipe_app.policies_enabled and codebase_resource.licenses:
+            policies_index = scanpipe_app.license_policies_index
+            codebase_resource.inject_licenses_policy(policies_index)
+            compliance_alert = codebase_resource.compute_compliance_alert()
+            codebase_resource.compliance_alert = compliance_alert
+
+        return True
+
+
+class PackageScanResultsWriter(ScanResultsWriter):
+    """
+    Writes the results of `scan_for_package_info` in batches.
+    The DiscoveredPackage are bulk created and assigned to their codebase resources
+    through a bulk insert in the `discovered_packages` relationship table.
     """
-    packages = scan_results.get("packages", [])
-    if packages:
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # List of (codebase_resource, discovered_package) tuples
+        self.resource_packages = []
+
+    def add_results(self, codebase_resource, scan_results, scan_errors):
+        packages = scan_results.get("packages", [])
         for package_data in packages:
-            codebase_resource.create_and_add_package(package_data)
-        codebase_resource.status = "application-package"
-        codebase_resource.save()
+            discovered_package = DiscoveredPackage.build_from_data(
+                self.project, package_data
+            )
+            if discovered_package:
+                self.resource_packages.append((codebase_resource, discovered_package))
+
+        if scan_errors:
+            codebase_resource.status = "scanned-with-error"
+        elif packages:
+            codebase_resource.status = "application-package"
+        else:
+            return False
+
+        return True
+
+    def flush(self):
+        self.create_packages()
+        super().flush()
+
+    def create_packages(self):
+        """
+        Creates the collected DiscoveredPackage and their relationships with the
+        codebase resources.
+        """
+        if not self.resource_packages:
+            return
+
+        packages = [package for _, package in self.resource_packages]
+        try:
+            with transaction.atomic():
+                DiscoveredPackage.objects.bulk_create(packages)
+        except Exception:
+            # Fall back to single inserts to record the errors as "ProjectError".
+            for package in packages:
+                package.save()
+
+        ThroughModel = DiscoveredPackage.codebase_resources.through
+        ThroughModel.objects.bulk_create(
+            [
+                ThroughModel(
+                    codebaseresource_id=resource.pk,
+                    discoveredpackage_id=package.pk,
+                )
+                for resource, package in self.resource_packages
+                if package.pk
+            ],
+            ignore_conflicts=True,
+        )
+
+        self.resource_packages = []
 
-    if scan_errors:
-        codebase_resource.add_errors(scan_errors)
-        codebase_resource.status = "scanned-with-error"
-        codebase_resource.save()
 
+class PackageAndFileScanResultsWriter(FileScanResultsWriter, PackageScanResultsWriter):
+    """
+    Writes the results of `scan_for_package_and_file_info` in batches.
+    The file scan results are set on all the resources while the resources with
+    packages get the "application-package" status.
+    """
+
+    def add_results(self, codebase_resource, scan_results, scan_errors):
+        PackageScanResultsWriter.add_results(
+            self, codebase_resource, scan_results, scan_errors
+        )
+        FileScanResultsWriter.add_results(
+            self, codebase_resource, scan_results, scan_errors
+        )
+
+        if scan_results.get("packages") and not scan_errors:
+            codebase_resource.status = "application-package"
 
-def _log_progress(scan_func, resource, resource_count, index):
+        return True
+
+
+def _log_progress(scan_func, resource_pk, resource_count, index):
     progress = f"{index / resource_count * 100:.1f}% ({index}/{resource_count})"
-    logger.info(f"{scan_func.__name__} {progress} pk={resource.pk}")
+    logger.info(f"{scan_func.__name__} {progress} pk={resource_pk}")
+
+
+ScanTask = namedtuple("ScanTask", ["pk", "location", "sha1", "scanner_names"])
+# The `scanner_names` defaults to None, all the scanners are run.
+ScanTask.__new__.__defaults__ = (None,)
+
+# CodebaseResource fields provided to the `select_scanners` functions.
+SCANNER_SELECTION_FIELDS = [
+    "is_binary",
+    "is_media",
+    "mime_type",
+    "file_type",
+    "programming_language",
+    "size",
+]
+
+
+def _get_scan_tasks(project, queryset, select_scanners=None):
+    """
+    Yields a ScanTask for each resource of the `queryset`.
+    Only the `pk`, `path`, and `sha1` values are fetched from the database, 2000
+    rows at the time.
+
+    When a `select_scanners` function is provided, it is called with a mapping of
+    the resource SCANNER_SELECTION_FIELDS values and returns the names of the
+    scanners to run on that resource.
+    """
+    codebase_path = project.codebase_path
+    fields = ["pk", "path", "sha1"]
+    if select_scanners:
+        fields.extend(SCANNER_SELECTION_FIELDS)
+
+    values = queryset.values(*fields).iterator(chunk_size=2000)
+    for resource_info in values:
+        # strip the leading / to allow joining this with the codebase_path
+        location = str(codebase_path / resource_info["path"].strip("/"))
+        scanner_names = None
+        if select_scanners:
+            scanner_names = select_scanners(resource_info)
+        yield ScanTask(
+            resource_info["pk"], location, resource_info["sha1"], scanner_names
+        )
+
+
+class SequentialExecutor(concurrent.futures.Executor):
+    """
+    Executes the submitted calls immediately in the current process.
+    Used in place of the process pool when multiprocessing is disabled.
+    The `with_threading` value is provided as the last argument of each call.
+    """
+
+    def __init__(self, with_threading=True):
+        self.with_threading = with_threading
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, self.with_threading, **kwargs))
+        except Exception as exception:
+            future.set_exception(exception)
+        return future
+
+
+def get_scan_results_cache():
+    """
+    Returns the scan results cache as a FileSystemCache, or None if the cache is
+    not enabled using the `SCANCODEIO_SCAN_CACHE_LOCATION` setting.
+    """
+    if not SCANCODEIO_SCAN_CACHE_LOCATION:
+        return
+
+    max_size = SCANCODEIO_SCAN_CACHE_MAX_SIZE * 1024 * 1024
+    return FileSystemCache(SCANCODEIO_SCAN_CACHE_LOCATION, max_size)
+
+
+def get_scan_cache_key(sha1, scan_func, scanner_names=None):
+    """
+    Returns the cache key for the results of `scan_func` on a file content
+    identified by its `sha1`, limited to the `scanner_names` when provided.
+    The ScanCode-toolkit version is part of the key as the results may differ
+    between versions.
+    """
+    parts = [sha1, scancode_version, scan_func.__name__]
+    if scanner_names is not None:
+        parts.append(",".join(sorted(scanner_names)))
+    return get_cache_key(*parts)
+
+
+def exclude_duplicates(queryset):
+    """
+    Excludes from the resources `queryset` the duplicates, resources that share the
+    same content, based on their `sha1` and `size`, with another resource of the
+    `queryset` that has a lower `pk`.
+    Only one representative resource is kept for each content.
+    """
+    duplicates = queryset.filter(
+        sha1=OuterRef("sha1"),
+        size=OuterRef("size"),
+        pk__lt=OuterRef("pk"),
+    ).exclude(sha1="")
+    return queryset.filter(~Exists(duplicates))
+
+
+def copy_duplicates_scan_results(project, batch_size=None):
+    """
+    Copies the scan results of the scanned resources to their duplicates left
+    without status in the `project`, see `exclude_duplicates`.
+    The `status` and `compliance_alert` values are copied along the scan results.
+
+    Returns the number of updated resources.
+    """
+    batch_size = batch_size or SCANCODEIO_SCAN_BATCH_SIZE
+    update_fields = [
+        *CodebaseResource.scan_fields(),
+        "license_keys",
+        "license_categories",
+        "has_unknown_license",
+        "status",
+        "compliance_alert",
+        "extra_data",
+    ]
+    scanned_statuses = ["scanned", "scanned-with-error"]
+
+    duplicates = project.codebaseresources.no_status().exclude(sha1="")
+    duplicate_pks = list(duplicates.values_list("pk", flat=True))
+    updated_count = 0
+
+    for start in range(0, len(duplicate_pks), batch_size):
+        batch_pks = duplicate_pks[start : start + batch_size]
+        resources = project.codebaseresources.in_bulk(batch_pks).values()
+
+        representatives = {}
+        scanned_resources = project.codebaseresources.filter(
+            status__in=scanned_statuses,
+            sha1__in={resource.sha1 for resource in resources},
+        )
+        for scanned in scanned_resources.order_by("pk"):
+            representatives.setdefault((scanned.sha1, scanned.size), scanned)
+
+        updated_resources = []
+        for resource in resources:
+            representative = representatives.get((resource.sha1, resource.size))
+            if not representative:
+                continue
+            resource.copy_scan_results(representative)
+            resource.set_license_fields()
+            resource.status = representative.status
+            resource.compliance_alert = representative.compliance_alert
+            if "scanners" in representative.extra_data:
+                resource.extra_data["scanners"] = representative.extra_data["scanners"]
+            updated_resources.append(resource)
+
+        CodebaseResource.objects.bulk_update(updated_resources, fields=update_fields)
+        updated_count += len(updated_resources)
+
+    return updated_count
+
+
+_scan_pool = None
+_scan_pool_max_workers = None
+
+# Queue of the (task_id, pid, start_time) sent by the pool workers when they start
+# a task, shared by all the scan pools, see `get_task_start_queue`.
+_task_start_queue = None
+
+# Each ScanScheduler has its own namespace of task ids, as the `_task_start_queue`
+# may still hold the start messages of the tasks of a previous scheduler.
+_scheduler_ids = itertools.count()
+
+# Number of tasks completed by the current pool worker process.
+_worker_task_count = 0
+
+# The `_task_start_queue` of the parent process in a pool worker process.
+_worker_start_queue = None
+
+
+def _init_scan_worker(start_queue):
+    """
+    Initializes a scan pool worker process.
+    The license index is already loaded when inherited from the parent process
+    on fork, this only loads it when the workers are spawned.
+    """
+    global _worker_task_count, _worker_start_queue
+    _worker_task_count = 0
+    _worker_start_queue = start_queue
+    get_license_cache()
+
+
+def get_task_start_queue():
+    """
+    Returns the queue used by the pool workers to report the tasks they start.
+    """
+    global _task_start_queue
+
+    if _task_start_queue is None:
+        _task_start_queue = multiprocessing.SimpleQueue()
+    return _task_start_queue
+
+
+def get_scan_pool(max_workers):
+    """
+    Returns a process pool of `max_workers` processes shared across the scan
+    steps of a pipeline run, instead of building new workers for each step.
+
+    The license index is loaded in the parent process before the workers are
+    forked so its memory pages are shared copy-on-write between the workers,
+    which do not have to load it on their first scan.
+    Call `shutdown_scan_pool` to release the pool workers.
+    """
+    global _scan_pool, _scan_pool_max_workers
+
+    if _scan_pool and _scan_pool_max_workers == max_workers:
+        return _scan_pool
+
+    shutdown_scan_pool()
+    _scan_pool = _make_scan_pool(max_workers)
+    _scan_pool_max_workers = max_workers
+    return _scan_pool
+
+
+def _make_scan_pool(max_workers):
+    get_license_cache()
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers,
+        initializer=_init_scan_worker,
+        initargs=(get_task_start_queue(),),
+    )
+
+
+def discard_scan_pool(pool):
+    """
+    Shuts down the `pool` without waiting for its pending tasks to complete.
+    A new shared pool is created on the next `get_scan_pool` call if the `pool`
+    was the shared one.
+    """
+    global _scan_pool
+
+    if _scan_pool is pool:
+        _scan_pool = None
+    pool.shutdown(wait=False)
+
+
+def shutdown_scan_pool():
+    """
+    Shuts down the shared scan process pool, if any.
+    """
+    global _scan_pool
+
+    if _scan_pool:
+        _scan_pool.shutdown(wait=True)
+        _scan_pool = None
+
+
+atexit.register(shutdown_scan_pool)
+
+
+def get_memory_usage():
+    """
+    Returns the resident memory of the current process in MB.
+    Returns 0 when not available on this platform.
+    """
+    try:
+        with open("/proc/self/statm") as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def _run_scan_task(task_id, scan_func, *args, **kwargs):
+    """
+    Runs the `scan_func` with `args` and `kwargs` in a pool worker process.
+    The start of the `task_id` task is reported with the worker process id, used
+    to supervise the running time of the task.
+
+    Returns the scan `results` and `errors`, along the number of tasks completed
+    by this worker and its memory usage in MB, used to decide the pool recycling.
+    """
+    global _worker_task_count
+
+    if _worker_start_queue is not None:
+        _worker_start_queue.put((task_id, os.getpid(), time.time()))
 
+    scan_results, scan_errors = scan_func(*args, **kwargs)
+    _worker_task_count += 1
+    return scan_results, scan_errors, _worker_task_count, get_memory_usage()
 
-def _scan_and_save(project, scan_func, save_func):
+
+class ScanScheduler:
+    """
+    Runs the `scan_func` on each ScanTask of the `scan_tasks` iterator while keeping
+    at most `max_in_flight` tasks pending in the process pool at a time.
+    New tasks are submitted as soon as previous ones are completed.
+    Multiprocessing is disabled when `max_workers` is 0 or less.
+
+    The pool workers are supervised:
+
+    - A task running for more than `timeout` seconds is reported with an error and
+      its worker process is killed, which breaks the pool. The other interrupted
+      tasks are submitted again to a new pool. The running time starts when the
+      worker reports the start of the task, not when the task is queued.
+    - When a worker process dies, the interrupted tasks are run again one at a time
+      in a separate single worker pool to identify the resource responsible for
+      the crash. This resource is reported with an error.
+    - The pool is replaced by a new one once a worker completed
+      `max_tasks_per_worker` tasks, or when its memory usage exceeds
+      `max_worker_memory` MB. The tasks in flight are completed by the previous
+      pool workers.
+
+    When a `cache` is provided, the results are looked up using the resource `sha1`
+    before the task is submitted, and the successful scan results are stored in
+    the cache.
+
+    Iterating over the scheduler yields lists of (scan_task, scan_results,
+    scan_errors) tuples for the completed tasks.
+    The pending tasks are cancelled when the iteration is interrupted.
+    """
+
+    timeout_error = "ERROR: Processing interrupted: timeout after {} seconds."
+    crash_error = "ERROR: Processing interrupted: the worker process died."
+
+    def __init__(
+        self,
+        scan_func,
+        scan_tasks,
+        max_workers,
+        max_in_flight,
+        with_threading=True,
+        cache=None,
+        timeout=None,
+        max_tasks_per_worker=None,
+        max_worker_memory=None,
+    ):
+        self.scan_func = scan_func
+        self.scan_tasks = iter(scan_tasks)
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.cache = cache
+        self.timeout = timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_worker_memory = max_worker_memory
+
+        self.sequential_executor = None
+        if max_workers <= 0:
+            self.sequential_executor = SequentialExecutor(with_threading)
+
+        # Mapping of {future: (task_id, scan_task, pool, quarantined)}
+        self.pending = {}
+        # Mapping of {task_id: (pid, start_time)} of the pending tasks started by a
+        # worker. The task ids are (scheduler_id, task_number) tuples.
+        self.started = {}
+        self.scheduler_id = next(_scheduler_ids)
+        self.task_numbers = itertools.count()
+        self.completed = []
+        self.retry_tasks = deque()
+        self.quarantined_tasks = deque()
+        self.quarantine_pool = None
+        self.quarantine_in_flight = False
+        self.terminated_pools = set()
+        self.exhausted = False
+
+    def __iter__(self):
+        try:
+            while True:
+                self.submit_next()
+                if not self.completed:
+                    if not self.pending:
+                        break
+                    self.wait()
+
+                completed, self.completed = self.completed, []
+                if completed:
+                    yield completed
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Cancels the pending tasks and shuts down the quarantine pool.
+        """
+        for future in self.pending:
+            future.cancel()
+        self.pending = {}
+        self.started = {}
+
+        if self.quarantine_pool:
+            self.quarantine_pool.shutdown(wait=False)
+            self.quarantine_pool = None
+
+    def submit_next(self):
+        """
+        Submits new tasks until `max_in_flight` tasks are pending.
+        The tasks to retry are submitted first.
+        """
+        if self.quarantined_tasks and not self.quarantine_in_flight:
+            self.submit(self.quarantined_tasks.popleft(), quarantine=True)
+
+        while self.retry_tasks and len(self.pending) < self.max_in_flight:
+            self.submit(self.retry_tasks.popleft())
+
+        while not self.exhausted and len(self.pending) < self.max_in_flight:
+            # Do not accumulate too many cached results before yielding those.
+            if len(self.completed) >= self.max_in_flight:
+                break
+
+            scan_task = next(self.scan_tasks, None)
+            if scan_task is None:
+                self.exhausted = True
+                break
+
+            scan_results = self.get_cached_results(scan_task)
+            if scan_results is not None:
+                self.completed.append((scan_task, scan_results, []))
+            else:
+                self.submit(scan_task)
+
+    def get_pool(self, quarantine=False):
+        if self.sequential_executor:
+            return self.sequential_executor
+
+        if not quarantine:
+            return get_scan_pool(self.max_workers)
+
+        if not self.quarantine_pool:
+            self.quarantine_pool = _make_scan_pool(max_workers=1)
+        return self.quarantine_pool
+
+    def discard_pool(self, pool):
+        if pool is self.quarantine_pool:
+            self.quarantine_pool = None
+        discard_scan_pool(pool)
+
+    def terminate_pool(self, pool, pid):
+        """
+        Kills the `pool` worker process `pid`, which breaks the `pool`.
+        The other tasks interrupted by this termination are submitted again.
+        """
+        with suppress(OSError):
+            os.kill(pid, signal.SIGKILL)
+        self.terminated_pools.add(pool)
+        self.discard_pool(pool)
+
+    def submit(self, scan_task, quarantine=False):
+        pool = self.get_pool(quarantine)
+        task_id = (self.scheduler_id, next(self.task_numbers))
+        args = (_run_scan_task, task_id, self.scan_func, scan_task.location)
+        kwargs = {}
+        if scan_task.scanner_names is not None:
+            kwargs["scanner_names"] = scan_task.scanner_names
+
+        try:
+            future = pool.submit(*args, **kwargs)
+        except concurrent.futures.process.BrokenProcessPool:
+            self.discard_pool(pool)
+            pool = self.get_pool(quarantine)
+            future = pool.submit(*args, **kwargs)
+
+        self.pending[future] = (task_id, scan_task, pool, quarantine)
+        if quarantine:
+            self.quarantine_in_flight = True
+
+    def wait(self):
+        """
+        Waits for at least one pending task to complete, and checks the pending
+        tasks running time every second when a `timeout` is set.
+        The start queue is drained before the completed tasks are processed so the
+        start of a completed task is not recorded after its completion.
+        """
+        poll_interval = 1 if self.timeout else None
+        done, _ = concurrent.futures.wait(
+            self.pending,
+            timeout=poll_interval,
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+
+        self.collect_started_tasks()
+
+        for future in done:
+            self.process_done(future)
+
+        if self.timeout:
+            self.check_timeouts()
+
+    def collect_started_tasks(self):
+        """
+        Collects the (pid, start_time) of the pending tasks started by the pool
+        workers. The queue is always drained to not block the workers, and the
+        start of the tasks that are not pending in this scheduler is ignored.
+        """
+        start_queue = _task_start_queue
+        if start_queue is None:
+            return
+
+        pending_task_ids = {task_id for task_id, *_ in self.pending.values()}
+        while not start_queue.empty():
+            task_id, pid, start_time = start_queue.get()
+            if task_id in pending_task_ids:
+                self.started[task_id] = pid, start_time
+
+    def process_done(self, future):
+        task_id, scan_task, pool, quarantined = self.pending.pop(future)
+        self.started.pop(task_id, None)
+        if quarantined:
+            self.quarantine_in_flight = False
+
+        try:
+            scan_results, scan_errors, task_count, memory = future.result()
+        except concurrent.futures.process.BrokenProcessPool:
+            self.discard_pool(pool)
+            if pool in self.terminated_pools:
+                self.retry_tasks.append(scan_task)
+            elif quarantined:
+                logger.info(f"Worker process died scanning {scan_task.location}")
+                self.completed.append((scan_task, {}, [self.crash_error]))
+            else:
+                self.quarantined_tasks.append(scan_task)
+            return
+        except Exception as exception:
+            self.completed.append((scan_task, {}, [str(exception)]))
+            return
+
+        self.completed.append((scan_task, scan_results, scan_errors))
+        self.set_cached_results(scan_task, scan_results, scan_errors)
+
+        if not self.sequential_executor and self.needs_recycle(task_count, memory):
+            logger.info(
+                f"Recycle the scan pool workers ({task_count} tasks {memory}MB)"
+            )
+            self.discard_pool(pool)
+
+    def check_timeouts(self):
+        """
+        Reports the tasks running for more than `timeout` seconds with an error
+        and terminates their pool workers.
+        A task is considered running once its worker reported its start.
+        """
+        now = time.time()
+
+        for future, (task_id, scan_task, pool, quarantined) in list(
+            self.pending.items()
+        ):
+            if future.done() or task_id not in self.started:
+                continue
+
+            pid, start_time = self.started[task_id]
+            if now - start_time > self.timeout:
+                logger.info(f"Timeout scanning {scan_task.location}")
+                del self.pending[future]
+                del self.started[task_id]
+                if quarantined:
+                    self.quarantine_in_flight = False
+                error = self.timeout_error.format(self.timeout)
+                self.completed.append((scan_task, {}, [error]))
+                self.terminate_pool(pool, pid)
+
+    def needs_recycle(self, task_count, memory):
+        if self.max_tasks_per_worker and task_count >= self.max_tasks_per_worker:
+            return True
+        return bool(self.max_worker_memory and memory >= self.max_worker_memory)
+
+    def get_cached_results(self, scan_task):
+        if self.cache and scan_task.sha1:
+            cache_key = self.get_cache_key(scan_task)
+            return self.cache.get(cache_key)
+
+    def set_cached_results(self, scan_task, scan_results, scan_errors):
+        if self.cache and scan_task.sha1 and not scan_errors:
+            cache_key = self.get_cache_key(scan_task)
+            self.cache.set(cache_key, scan_results)
+
+    def get_cache_key(self, scan_task):
+        return get_scan_cache_key(
+            scan_task.sha1, self.scan_func, scan_task.scanner_names
+        )
+
+
+def _scan_and_save(
+    project,
+    scan_func,
+    save_func,
+    cache=None,
+    progress_logger=None,
+    skip_duplicates=False,
+    select_scanners=None,
+    pk_range=None,
+):
     """
     Runs the `scan_func` on files without status for a `project`.
     The `save_func` is called to save the results.
@@ -218,63 +1183,272 @@ def _scan_and_save(project, scan_func, save_func):
 
     The codebase resources QuerySet is chunked in 2000 results at the time,
     this can result in a significant reduction in memory usage.
+    Only a bounded window of tasks is kept in flight, see the
+    `SCANCODEIO_SCAN_QUEUE_SIZE_PER_PROCESS` setting, and only the resources
+    location are sent to the workers. The memory usage of the main process stays
+    flat regardless of the number of resources.
+
+    The process pool is shared across the scan steps, see `get_scan_pool`, and
+    supervised, see `ScanScheduler`. A resource that times out or crashes its
+    worker is saved with a "scanned-with-error" status and the scan keeps going.
+
+    When a `cache` is provided, the results are looked up using the resource
+    `sha1` before the scan is submitted, and the successful scan results are
+    stored in the cache. The cache statistics are logged using the
+    `progress_logger` at the end of the scan.
+
+    When `skip_duplicates` is True, only one resource is scanned for each
+    content, see `exclude_duplicates`.
+
+    When a `select_scanners` function is provided, the scanners to run are
+    selected for each resource, see `_get_scan_tasks`. The selected scanner names
+    are recorded in the resource `extra_data` as "scanners".
+
+    The scan is limited to the resources in the (min_pk, max_pk) `pk_range` when
+    provided.
 
     Note that all database related actions are executed in this main process as the
     database connection does not always fork nicely in the pool processes.
     """
     codebase_resources = project.codebaseresources.no_status()
+    if skip_duplicates:
+        codebase_resources = exclude_duplicates(codebase_resources)
+    if pk_range:
+        codebase_resources = codebase_resources.filter(pk__range=pk_range)
     resource_count = codebase_resources.count()
     logger.info(f"Scan {resource_count} codebase resources with {scan_func.__name__}")
-    resource_iterator = codebase_resources.iterator(chunk_size=2000)
 
-    if SCANCODEIO_PROCESSES is None:
-        max_workers = os.cpu_count() - 1 or 1
-    else:
-        max_workers = SCANCODEIO_PROCESSES
+    max_workers = get_max_workers()
+    with_threading = max_workers == 0
+    max_in_flight = max(max_workers, 1) * max(SCANCODEIO_SCAN_QUEUE_SIZE_PER_PROCESS, 1)
+
+    scheduler = ScanScheduler(
+        scan_func=scan_func,
+        scan_tasks=_get_scan_tasks(project, codebase_resources, select_scanners),
+        max_workers=max_workers,
+        max_in_flight=max_in_flight,
+        with_threading=with_threading,
+        cache=cache,
+        timeout=SCANCODEIO_SCAN_FILE_TIMEOUT,
+        max_tasks_per_worker=SCANCODEIO_SCAN_MAX_TASKS_PER_WORKER,
+        max_worker_memory=SCANCODEIO_SCAN_MAX_WORKER_MEMORY,
+    )
 
-    if max_workers <= 0:
-        with_threading = True if max_workers == 0 else False
-        for index, resource in enumerate(resource_iterator):
-            _log_progress(scan_func, resource, resource_count, index)
-            scan_results, scan_errors = scan_func(resource.location, with_threading)
+    index = 0
+    for completed in scheduler:
+        pks = [scan_task.pk for scan_task, _, _ in completed]
+        resources_by_pk = project.codebaseresources.in_bulk(pks)
+
+        for scan_task, scan_results, scan_errors in completed:
+            _log_progress(scan_func, scan_task.pk, resource_count, index)
+            index += 1
+            resource = resources_by_pk[scan_task.pk]
+            if scan_task.scanner_names is not None:
+                resource.extra_data["scanners"] = scan_task.scanner_names
             save_func(resource, scan_results, scan_errors)
-        return
 
-    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
-        future_to_resource = {
-            executor.submit(scan_func, resource.location): resource
-            for resource in resource_iterator
-        }
+    if cache:
+        message = f"Scan results cache: {cache.get_stats()}"
+        logger.info(message)
+        if progress_logger:
+            progress_logger(message)
 
-        # Iterate over the Futures as they complete (finished or cancelled)
-        future_as_completed = concurrent.futures.as_completed(future_to_resource)
 
-        for index, future in enumerate(future_as_completed):
-            resource = future_to_resource[future]
-            _log_progress(scan_func, resource, resource_count, index)
-            scan_results, scan_errors = future.result()
-            save_func(resource, scan_results, scan_errors)
+def get_scanners_prefilter():
+    """
+    Returns the function used to select the file scanners of each resource, or
+    None when the SCANCODEIO_SCAN_PREFILTER setting is not enabled.
+    """
+    if SCANCODEIO_SCAN_PREFILTER:
+        return select_file_scanners
 
 
-def scan_for_files(project):
+def scan_for_files(project, progress_logger=None, pk_range=None):
     """
     Runs a license, copyright, email, and url scan on files without a status for
     a `project`.
 
     Multiprocessing is enabled by default on this pipe, the number of processes can be
     controlled through the SCANCODEIO_PROCESSES setting.
+    The results are written in the database in batches, see `ScanResultsWriter`.
+    The results are reused from the scan results cache when enabled, see the
+    SCANCODEIO_SCAN_CACHE_LOCATION setting.
+
+    The resources sharing the same content are scanned only once and the results
+    are copied to the duplicates at the end of the scan.
+
+    The scanners are selected for each file based on its type when the
+    SCANCODEIO_SCAN_PREFILTER setting is enabled, see `select_file_scanners`.
+
+    The scan is limited to the resources in the (min_pk, max_pk) `pk_range` when
+    provided, otherwise the scan is distributed in shards when the
+    SCANCODEIO_SCAN_SHARDS setting is enabled, see `scan_in_shards`.
+    """
+    if pk_range is None and SCANCODEIO_SCAN_SHARDS > 1:
+        scan_in_shards(project, "scan_for_files", progress_logger)
+    else:
+        cache = get_scan_results_cache()
+        with FileScanResultsWriter(project) as writer:
+            _scan_and_save(
+                project,
+                scan_file,
+                writer.save,
+                cache=cache,
+                progress_logger=progress_logger,
+                skip_duplicates=True,
+                select_scanners=get_scanners_prefilter(),
+                pk_range=pk_range,
+            )
+
+    # The duplicates of a shard may have their representative in another shard,
+    # those are copied once all the shards are completed, see `complete_shards`.
+    if pk_range is None:
+        copy_duplicates(project, progress_logger)
+
+
+def copy_duplicates(project, progress_logger=None):
     """
-    _scan_and_save(project, scan_file, save_scan_file_results)
+    Copies the scan results of the `project` resources to their duplicates, see
+    `copy_duplicates_scan_results`, and logs the number of copied results.
+    """
+    duplicates_count = copy_duplicates_scan_results(project)
+    if duplicates_count:
+        message = f"Scan results copied to {duplicates_count} duplicate resources"
+        logger.info(message)
+        if progress_logger:
+            progress_logger(message)
 
 
-def scan_for_application_packages(project):
+def scan_for_application_packages(project, progress_logger=None, pk_range=None):
     """
     Runs a package scan on files without a status for a `project`.
 
     Multiprocessing is enabled by default on this pipe, the number of processes can be
     controlled through the SCANCODEIO_PROCESSES setting.
+    The results are written in the database in batches, see `ScanResultsWriter`.
+
+    The scan is limited to the resources in the (min_pk, max_pk) `pk_range` when
+    provided, otherwise the scan is distributed in shards when the
+    SCANCODEIO_SCAN_SHARDS setting is enabled, see `scan_in_shards`.
+    """
+    if pk_range is None and SCANCODEIO_SCAN_SHARDS > 1:
+        scan_in_shards(project, "scan_for_application_packages", progress_logger)
+        return
+
+    with PackageScanResultsWriter(project) as writer:
+        _scan_and_save(
+            project,
+            scan_for_package_info,
+            writer.save,
+            progress_logger=progress_logger,
+            pk_range=pk_range,
+        )
+
+
+def scan_for_packages_and_files(project, progress_logger=None, pk_range=None):
+    """
+    Runs a package, license, copyright, email, and url scan on files without a
+    status for a `project` in a single pass, instead of the two passes of
+    `scan_for_application_packages` and `scan_for_files`.
+    Each file is read and scheduled only once.
+
+    Multiprocessing is enabled by default on this pipe, the number of processes can be
+    controlled through the SCANCODEIO_PROCESSES setting.
+    The results are written in the database in batches, see `ScanResultsWriter`.
+
+    The scan results cache and duplicates coalescing are not used as the package
+    detection depends on the resource path.
+    The file scanners are selected for each file based on its type when the
+    SCANCODEIO_SCAN_PREFILTER setting is enabled.
+    The scan can be limited to a `pk_range` or distributed in shards, see
+    `scan_for_files`.
+    """
+    if pk_range is None and SCANCODEIO_SCAN_SHARDS > 1:
+        scan_in_shards(project, "scan_for_packages_and_files", progress_logger)
+        return
+
+    with PackageAndFileScanResultsWriter(project) as writer:
+        _scan_and_save(
+            project,
+            scan_for_package_and_file_info,
+            writer.save,
+            progress_logger=progress_logger,
+            select_scanners=get_scanners_prefilter(),
+            pk_range=pk_range,
+        )
+
+
+def get_pk_ranges(queryset, shard_count):
+    """
+    Returns a list of (min_pk, max_pk) ranges splitting the `queryset` in at most
+    `shard_count` shards of similar size.
+    """
+    count = queryset.count()
+    if not count:
+        return []
+
+    shard_size = math.ceil(count / shard_count)
+    pks = queryset.order_by("pk").values_list("pk", flat=True)
+
+    pk_ranges = []
+    for offset in range(0, count, shard_size):
+        last_offset = min(offset + shard_size, count) - 1
+        pk_ranges.append((pks[offset], pks[last_offset]))
+
+    return pk_ranges
+
+
+def scan_in_shards(project, scan_name, progress_logger=None):
+    """
+    Splits the resources without status of the `project` in pk range shards, see
+    the SCANCODEIO_SCAN_SHARDS setting, and runs the `scan_name` scan pipe on each
+    shard as a Celery subtask so the shards are distributed across the workers.
+
+    The pipeline is not waiting for the shards in its worker: a PipelineSuspended
+    is raised with the Celery chord of the shards, and the pipeline is resumed
+    once all the shards are completed, see `complete_shards`.
+    The failed shards are retried on their own, see `scan_shard_task`.
+    The project workspace needs to be available to all the Celery workers.
+    """
+    queryset = project.codebaseresources.no_status()
+    pk_ranges = get_pk_ranges(queryset, SCANCODEIO_SCAN_SHARDS)
+
+    message = f"Distribute {scan_name} in {len(pk_ranges)} shards"
+    logger.info(message)
+    if progress_logger:
+        progress_logger(message)
+
+    shards = group(
+        tasks.scan_shard_task.si(str(project.pk), scan_name, min_pk, max_pk)
+        for min_pk, max_pk in pk_ranges
+    )
+    # A group followed by a task is a chord: the callback runs once all the shards
+    # are completed.
+    raise PipelineSuspended(
+        shards | tasks.complete_shards_task.si(str(project.pk), scan_name)
+    )
+
+
+def complete_shards(project, scan_name):
     """
-    _scan_and_save(project, scan_for_package_info, save_scan_package_results)
+    Completes the `scan_name` scan of the `project` once all its shards are
+    completed, see `scan_in_shards`.
+    """
+    if scan_name == "scan_for_files":
+        copy_duplicates(project)
+
+
+def scan_shard(project, scan_name, pk_range):
+    """
+    Runs the `scan_name` scan pipe on the resources of a `project` shard
+    identified by its (min_pk, max_pk) `pk_range`.
+    """
+    scan_pipes = {
+        "scan_for_files": scan_for_files,
+        "scan_for_application_packages": scan_for_application_packages,
+        "scan_for_packages_and_files": scan_for_packages_and_files,
+    }
+    scan_pipes[scan_name](project, pk_range=pk_range)
 
 
 def run_extractcode(location, options=None, raise_on_error=False):
@@ -335,6 +1509,460 @@ def get_virtual_codebase(project, input_location):
     return VirtualCodebase(input_location, temp_dir=str(temp_path), max_in_memory=0)
 
 
+class StreamedResource:
+    """
+    A Resource of a `StreamedCodebase` built from a ScanCode JSON scan `files`
+    entry `data`.
+
+    Provides the subset of the commoncode.resource.Resource API used by the
+    `InventoryLoader` and the packagedcode package resources lookups.
+    The `path` is stripped from the scan root and is an empty string for the root.
+    """
+
+    def __init__(self, path, is_file, data=None):
+        self.path = path
+        self.is_file = is_file
+        self.data = data or {}
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["data"][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __repr__(self):
+        return f"StreamedResource(path={self.path!r})"
+
+    @property
+    def name(self):
+        return posixpath.basename(self.path)
+
+    @property
+    def is_dir(self):
+        return not self.is_file
+
+    @property
+    def is_root(self):
+        return not self.path
+
+    def get_path(self, strip_root=False):
+        """
+        Returns the path of this resource, always stripped from the scan root.
+        """
+        return self.path
+
+    def has_children(self):
+        return self.is_dir
+
+    def parent(self, codebase):
+        if not self.is_root:
+            return codebase.get_resource(posixpath.dirname(self.path))
+
+    def ancestors(self, codebase):
+        """
+        Returns a list of the ancestors resources from the root to self included.
+        """
+        ancestors = [self]
+        while not ancestors[0].is_root:
+            ancestors.insert(0, ancestors[0].parent(codebase))
+        return ancestors
+
+    def children(self, codebase):
+        return codebase.get_children(self)
+
+    def walk(self, codebase, topdown=True, ignored=lambda resource, codebase: False):
+        """
+        Yields all the descendant resources of this resource, see
+        `commoncode.resource.Resource.walk`.
+        """
+        for child in self.children(codebase):
+            if ignored(child, codebase):
+                continue
+            if topdown:
+                yield child
+            for subchild in child.walk(codebase, topdown=topdown, ignored=ignored):
+                yield subchild
+            if not topdown:
+                yield child
+
+
+class StreamedCodebase:
+    """
+    A ScanCode codebase read incrementally from the JSON scan file located at
+    `location`, see `jsonstream.JSONStreamReader`.
+
+    Unlike a `VirtualCodebase`, the resources are not kept in memory: `walk()`
+    yields the resources as they are read from the file and the tree lookups,
+    such as `get_resource` and `get_children`, are resolved from the `project`
+    CodebaseResource objects, once loaded in the database.
+    """
+
+    def __init__(self, project, location):
+        self.project = project
+        self.location = location
+        # The scan root path is set by `walk()`, see `get_scan_root_path`.
+        self.root_path = None
+        self.root = StreamedResource(path="", is_file=False)
+
+    def get_stripped_path(self, path):
+        """
+        Returns the `path` stripped from the scan root path, if any.
+        """
+        path = path.strip("/")
+        if not self.root_path:
+            return path
+        if path == self.root_path:
+            return ""
+        return pipes.remove_prefix(path, f"{self.root_path}/")
+
+    def walk(self, skip_root=False):
+        """
+        Yields a StreamedResource for each entry of the scan `files`.
+        The scan root path is the first segment shared by all the `files` paths,
+        as detected by `VirtualCodebase`. When the scan `headers` guarantee a
+        single root directory, the root is taken from the first entry and the scan
+        file is read in a single pass. Otherwise, such as for a `--strip-root`
+        scan, the paths are read in a first pass, see `get_scan_root_path`.
+        """
+        if not skip_root:
+            yield self.root
+
+        headers = []
+        with jsonstream.JSONStreamReader(self.location) as reader:
+            for key, value in reader.items(stream_keys=["files"]):
+                if key == "headers":
+                    headers = value
+                elif key == "files":
+                    yield from self.walk_files(value, headers)
+
+    def walk_files(self, files, headers):
+        """
+        Yields a StreamedResource for each entry of the scan `files` iterator.
+        The parent directories missing from the scan, such as the directories
+        above the scanned directory of a `--full-root` scan, are yielded as well,
+        the same way `VirtualCodebase` creates them.
+        """
+        if self.root_path is None and not has_single_root(headers):
+            self.root_path = get_scan_root_path(self.location)
+
+        # The scan is in top-down order: only the directories of the previous
+        # entry are kept to detect the missing parents.
+        previous_directories = set()
+
+        for data in files:
+            path = data.get("path", "")
+            if self.root_path is None:
+                self.root_path = get_first_segment(path)
+            path = self.get_stripped_path(path)
+            if not path:
+                continue
+
+            is_file = data.get("type") == "file"
+            directories = set()
+            for parent_path in get_parent_paths(path):
+                directories.add(parent_path)
+                if parent_path not in previous_directories:
+                    yield StreamedResource(parent_path, is_file=False)
+
+            if not is_file:
+                directories.add(path)
+            previous_directories = directories
+
+            yield StreamedResource(path, is_file, data)
+
+    def _get_resource_from_values(self, path, resource_type):
+        return StreamedResource(path, resource_type == CodebaseResource.Type.FILE)
+
+    def get_resource(self, path):
+        """
+        Returns the StreamedResource for `path` from the database, or None.
+        """
+        if not path:
+            return self.root
+
+        qs = self.project.codebaseresources.filter(path=path)
+        resource_type = qs.values_list("type", flat=True).first()
+        if resource_type:
+            return self._get_resource_from_values(path, resource_type)
+
+    def get_children(self, resource):
+        """
+        Returns the sorted direct children StreamedResource of `resource` from the
+        database, see `commoncode.resource.Resource.children`.
+        The children are looked up on the indexed `parent_path`.
+        """
+        qs = self.project.codebaseresources.filter(parent_path=resource.path)
+        children = [
+            self._get_resource_from_values(path, resource_type)
+            for path, resource_type in qs.values_list("path", "type")
+        ]
+        return sorted(
+            children, key=lambda r: (r.has_children(), r.name.lower(), r.name)
+        )
+
+
+def get_first_segment(path):
+    """
+    Returns the first segment of the scan `path`.
+    """
+    return path.strip("/").split("/")[0]
+
+
+def get_parent_paths(path):
+    """
+    Returns the list of the parent paths of `path`, from the top-level down.
+    """
+    segments = path.split("/")[:-1]
+    return ["/".join(segments[: index + 1]) for index in range(len(segments))]
+
+
+def has_single_root(headers):
+    """
+    Returns True if the ScanCode scan `headers` guarantee that all the `files`
+    entries are located under the first entry: the scan of a single input without
+    the `--strip-root` option.
+    """
+    if not headers:
+        return False
+
+    for header in headers:
+        options = header.get("options") or {}
+        if options.get("--strip-root"):
+            return False
+        inputs = options.get("input")
+        if isinstance(inputs, list) and len(inputs) != 1:
+            return False
+
+    return True
+
+
+def get_scan_root_path(location):
+    """
+    Returns the first path segment shared by all the `files` entries of the
+    ScanCode JSON scan file at `location`, or an empty string if the paths do not
+    share a common root.
+    This mirrors the `VirtualCodebase` root detection; the scan file is streamed.
+    """
+    root_path = None
+
+    for data in jsonstream.iter_array_items(location, "files"):
+        first_segment = get_first_segment(data.get("path", ""))
+        if root_path is None:
+            root_path = first_segment
+        elif first_segment != root_path:
+            return ""
+
+    return root_path or ""
+
+
+def get_streamed_codebase(project, input_location):
+    """
+    Returns a StreamedCodebase reading the JSON scan file located at the
+    `input_location` incrementally.
+    """
+    return StreamedCodebase(project, input_location)
+
+
+def get_codebase_resource(project, scanned_resource):
+    """
+    Returns an unsaved CodebaseResource of the `project` built from a ScanCode
+    `scanned_resource` commoncode.resource.Resource object.
+    The license policies are injected and the `compliance_alert` computed the same
+    way as in `CodebaseResource.save()`.
+    """
+    resource_data = {}
+
+    for field in CodebaseResource._meta.fields:
+        # Do not include the path as provided by the scanned_resource since it
+        # includes the "root". The `get_path` method is used instead.
+        if field.name == "path":
+            continue
+        value = getattr(scanned_resource, field.name, None)
+        if value is not None:
+            resource_data[field.name] = value
+
+    resource_type = "FILE" if scanned_resource.is_file else "DIRECTORY"
+    resource_data["type"] = CodebaseResource.Type[resource_type]
+    resource_path = scanned_resource.get_path(strip_root=True)
+
+    codebase_resource = CodebaseResource(
+        project=project,
+        path=resource_path,
+        parent_path=get_parent_path(resource_path),
+        **resource_data,
+    )
+    codebase_resource.set_license_fields()
+
+    if scanpipe_app.policies_enabled and codebase_resource.licenses:
+        codebase_resource.inject_licenses_policy(scanpipe_app.license_policies_index)
+        codebase_resource.compliance_alert = (
+            codebase_resource.compute_compliance_alert()
+        )
+
+    return codebase_resource
+
+
+def get_package_resource_paths(scanned_resource, scanned_codebase, scan_data):
+    """
+    Returns the list of paths of the resources of the package `scan_data` detected
+    on the `scanned_resource` of the `scanned_codebase`, starting with the
+    `scanned_resource` path.
+    """
+    scanned_package = packagedcode.get_package_instance(scan_data)
+    scanned_package_resources = scanned_package.get_package_resources(
+        scanned_resource, scanned_codebase
+    )
+    return [
+        scanned_resource.get_path(strip_root=True),
+        *[resource.get_path(strip_root=True) for resource in scanned_package_resources],
+    ]
+
+
+def get_resource_pks_by_path(project, paths, batch_size=None):
+    """
+    Returns a {path: pk} mapping of the `project` CodebaseResource for the
+    provided `paths`. The paths are looked up in chunks of `batch_size`.
+    """
+    batch_size = batch_size or SCANCODEIO_SCAN_BATCH_SIZE
+    paths = list(paths)
+    resource_pks_by_path = {}
+
+    for index in range(0, len(paths), batch_size):
+        chunk = paths[index : index + batch_size]
+        qs = project.codebaseresources.filter(path__in=chunk)
+        resource_pks_by_path.update(qs.values_list("path", "pk"))
+
+    return resource_pks_by_path
+
+
+class InventoryLoader:
+    """
+    Loads the resources and packages of a ScanCode `scanned_codebase`
+    commoncode.resource.Codebase object in the database for the `project`.
+
+    The resources are inserted with bulk inserts of `batch_size` rows, the existing
+    objects (based on the `path`) are skipped.
+    The packages are collected while walking the codebase and their resources
+    are resolved once all the resources are inserted, as a `StreamedCodebase`
+    relies on the database for the package resources lookups.
+    The package to resources relations are then inserted in bulk.
+    """
+
+    def __init__(self, project, scanned_codebase, batch_size=None):
+        self.project = project
+        self.scanned_codebase = scanned_codebase
+        self.batch_size = batch_size or SCANCODEIO_SCAN_BATCH_SIZE
+        self.resources = []
+        self.packages = []
+
+    def load(self, with_resources=True, with_packages=True):
+        """
+        Walks the codebase once and loads its resources and/or packages.
+        """
+        for scanned_resource in self.scanned_codebase.walk(skip_root=True):
+            if with_resources:
+                self.add_resource(scanned_resource)
+            if with_packages:
+                self.add_packages(scanned_resource)
+
+        self.flush_resources()
+        self.create_packages()
+
+    def add_resource(self, scanned_resource):
+        """
+        Adds the `scanned_resource` to the resources batch.
+        """
+        self.resources.append(get_codebase_resource(self.project, scanned_resource))
+        if len(self.resources) >= self.batch_size:
+            self.flush_resources()
+
+    def flush_resources(self):
+        """
+        Inserts the resources batch in the database.
+        """
+        if self.resources:
+            CodebaseResource.objects.bulk_create(self.resources, ignore_conflicts=True)
+            self.resources = []
+
+    def add_packages(self, scanned_resource):
+        """
+        Collects the packages of the `scanned_resource`.
+        """
+        for scan_data in getattr(scanned_resource, "packages", []) or []:
+            self.packages.append((scan_data, scanned_resource))
+
+    def create_packages(self):
+        """
+        Creates the collected packages and relates them to their resources.
+        """
+        if not self.packages:
+            return
+
+        packages = [
+            (
+                scan_data,
+                get_package_resource_paths(
+                    scanned_resource, self.scanned_codebase, scan_data
+                ),
+            )
+            for scan_data, scanned_resource in self.packages
+        ]
+
+        all_paths = {path for _, paths in packages for path in paths}
+        resource_pks_by_path = get_resource_pks_by_path(
+            self.project, all_paths, self.batch_size
+        )
+
+        package_pks_by_purl = pipes.update_or_create_packages(
+            self.project,
+            [scan_data for scan_data, _ in packages],
+            self.batch_size,
+        )
+
+        ThroughModel = DiscoveredPackage.codebase_resources.through
+        relations = []
+        package_resource_pks = set()
+
+        for scan_data, resource_paths in packages:
+            package_pk = package_pks_by_purl.get(pipes.get_package_purl(scan_data))
+            if not package_pk:
+                continue
+
+            for path in resource_paths:
+                resource_pk = resource_pks_by_path.get(path)
+                if resource_pk is None:
+                    continue
+                package_resource_pks.add(resource_pk)
+                relations.append(
+                    ThroughModel(
+                        discoveredpackage_id=package_pk,
+                        codebaseresource_id=resource_pk,
+                    )
+                )
+
+        ThroughModel.objects.bulk_create(
+            relations, batch_size=self.batch_size, ignore_conflicts=True
+        )
+
+        package_resource_pks = list(package_resource_pks)
+        for index in range(0, len(package_resource_pks), self.batch_size):
+            chunk = package_resource_pks[index : index + self.batch_size]
+            CodebaseResource.objects.filter(pk__in=chunk).update(
+                status="application-package"
+            )
+
+        self.packages = []
+
+
+def create_inventory_from_scan(project, scanned_codebase):
+    """
+    Saves the resources and packages of a ScanCode `scanned_codebase`
+    scancode.resource.Codebase object to the database as CodebaseResource and
+    DiscoveredPackage of the `project`, in a single walk of the codebase.
+    """
+    InventoryLoader(project, scanned_codebase).load()
+
+
 def create_codebase_resources(project, scanned_codebase):
     """
     Saves the resources of a ScanCode `scanned_codebase` scancode.resource.Codebase
@@ -343,27 +1971,7 @@ def create_codebase_resources(project, scanned_codebase):
     CodebaseResource objects as the existing objects (based on the `path`) will be
     skipped.
     """
-    for scanned_resource in scanned_codebase.walk(skip_root=True):
-        resource_data = {}
-
-        for field in CodebaseResource._meta.fields:
-            # Do not include the path as provided by the scanned_resource since it
-            # includes the "root". The `get_path` method is used instead.
-            if field.name == "path":
-                continue
-            value = getattr(scanned_resource, field.name, None)
-            if value is not None:
-                resource_data[field.name] = value
-
-        resource_type = "FILE" if scanned_resource.is_file else "DIRECTORY"
-        resource_data["type"] = CodebaseResource.Type[resource_type]
-        resource_path = scanned_resource.get_path(strip_root=True)
-
-        CodebaseResource.objects.get_or_create(
-            project=project,
-            path=resource_path,
-            defaults=resource_data,
-        )
+    InventoryLoader(project, scanned_codebase).load(with_packages=False)
 
 
 def create_discovered_packages(project, scanned_codebase):
@@ -372,32 +1980,7 @@ def create_discovered_packages(project, scanned_codebase):
     object to the database as a DiscoveredPackage of `project`.
     Relate package resources to CodebaseResource.
     """
-    for scanned_resource in scanned_codebase.walk(skip_root=True):
-        scanned_packages = getattr(scanned_resource, "packages", [])
-        if not scanned_packages:
-            continue
-
-        scanned_resource_path = scanned_resource.get_path(strip_root=True)
-        cbr = CodebaseResource.objects.get(project=project, path=scanned_resource_path)
-
-        for scan_data in scanned_packages:
-            discovered_package = pipes.update_or_create_package(project, scan_data)
-            set_codebase_resource_for_package(
-                codebase_resource=cbr, discovered_package=discovered_package
-            )
-
-            scanned_package = packagedcode.get_package_instance(scan_data)
-            # Set all the resource attached to that package
-            scanned_package_resources = scanned_package.get_package_resources(
-                scanned_resource, scanned_codebase
-            )
-            for scanned_package_res in scanned_package_resources:
-                package_cbr = CodebaseResource.objects.get(
-                    project=project, path=scanned_package_res.get_path(strip_root=True)
-                )
-                set_codebase_resource_for_package(
-                    codebase_resource=package_cbr, discovered_package=discovered_package
-                )
+    InventoryLoader(project, scanned_codebase).load(with_resources=False)
 
 
 def set_codebase_resource_for_package(codebase_resource, discovered_package):
@@ -452,8 +2035,11 @@ def make_results_summary(project, scan_results_location):
     from scanpipe.api.serializers import CodebaseResourceSerializer
     from scanpipe.api.serializers import DiscoveredPackageSerializer
 
-    with open(scan_results_location) as f:
-        scan_data = json.load(f)
+    scan_data = jsonstream.get_values(
+        scan_results_location,
+        keys=["summary", "license_clarity_score"],
+        stream_keys=["files"],
+    )
 
     summary = scan_data.get("summary")
 
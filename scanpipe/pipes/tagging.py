@@ -0,0 +1,203 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# http://nexb.com and https://github.com/nexB/scancode.io
+# The ScanCode.io software is licensed under the Apache License version 2.0.
+# Data generated with ScanCode.io is provided as-is without warranties.
+# ScanCode is a trademark of nexB Inc.
+#
+# You may not use this software except in compliance with the License.
+# You may obtain a copy of the License at: http://apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software distributed
+# under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR
+# CONDITIONS OF ANY KIND, either express or implied. See the License for the
+# specific language governing permissions and limitations under the License.
+#
+# Data Generated with ScanCode.io is provided on an "AS IS" BASIS, WITHOUT WARRANTIES
+# OR CONDITIONS OF ANY KIND, either express or implied. No content created from
+# ScanCode.io should be considered or used as legal advice. Consult an Attorney
+# for any legal advice.
+#
+# ScanCode.io is a free software code scanning tool from nexB Inc. and others.
+# Visit https://github.com/nexB/scancode.io for support and download.
+
+"""
+Tag CodebaseResource with a status using path, name and extension rules.
+
+A Rule sets its `status` on the resources without a status when one of its `values`
+matches the resource `field` using the `lookup`, with the same semantic as the
+Django field lookup of the same name:
+
+- "startswith": case-sensitive prefix, compiled in a prefix trie.
+- "istartswith", "iendswith", "icontains", "iregex": case-insensitive, compiled in
+  a single regex per field.
+- "exact": equality, for boolean fields such as `is_media`.
+
+All the rules are compiled in a RuleMatcher and evaluated in a single pass over the
+resources. When multiple rules match a resource, the first rule in the list wins,
+the same way as calling one tagging function per rule in that order.
+"""
+
+import re
+from collections import defaultdict
+from collections import namedtuple
+
+Rule = namedtuple("Rule", ["status", "field", "lookup", "values"])
+
+TRIE_LOOKUPS = ("startswith",)
+REGEX_LOOKUPS = ("istartswith", "iendswith", "icontains", "iregex")
+EXACT_LOOKUPS = ("exact",)
+
+
+def get_lookup_pattern(lookup, value):
+    """
+    Returns a regex pattern matching the `value` for the `lookup`.
+    """
+    if lookup == "iregex":
+        return value
+    pattern = re.escape(value)
+    if lookup == "istartswith":
+        return f"^{pattern}"
+    if lookup == "iendswith":
+        return rf"{pattern}\Z"
+    return pattern
+
+
+class PrefixTrie:
+    """
+    A character trie of prefixes, each prefix carrying one or more values.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, prefix, value):
+        """
+        Adds the `value` for the `prefix`.
+        """
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(value)
+
+    def get_prefix_values(self, string):
+        """
+        Returns the list of values of all the prefixes of the `string`, from the
+        shortest to the longest prefix.
+        """
+        node = self.root
+        values = list(node.get(None, []))
+        for char in string:
+            node = node.get(char)
+            if node is None:
+                break
+            values.extend(node.get(None, []))
+        return values
+
+
+class RuleMatcher:
+    """
+    Matches resource values against a list of tagging rules, in priority order.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.tries = defaultdict(PrefixTrie)
+        self.exacts = defaultdict(list)
+        patterns_by_field = defaultdict(list)
+
+        for index, rule in enumerate(self.rules):
+            if rule.lookup in TRIE_LOOKUPS:
+                for value in rule.values:
+                    self.tries[rule.field].add(value, index)
+            elif rule.lookup in REGEX_LOOKUPS:
+                alternatives = "|".join(
+                    f"(?:{get_lookup_pattern(rule.lookup, value)})"
+                    for value in rule.values
+                )
+                # An empty named group, that only participates in the match when
+                # the lookahead finds one of the rule alternatives in the value.
+                patterns_by_field[rule.field].append(
+                    rf"(?:(?=[\s\S]*?(?:{alternatives}))(?P<rule{index}>))?"
+                )
+            elif rule.lookup in EXACT_LOOKUPS:
+                for value in rule.values:
+                    self.exacts[rule.field].append((value, index))
+            else:
+                raise ValueError(f"Unsupported rule lookup: {rule.lookup}")
+
+        self.regexes = {
+            field: re.compile("^" + "".join(patterns), re.IGNORECASE)
+            for field, patterns in patterns_by_field.items()
+        }
+
+    @property
+    def fields(self):
+        """
+        Returns the list of resource field names used by the rules.
+        """
+        return sorted({rule.field for rule in self.rules})
+
+    def match_index(self, values):
+        """
+        Returns the index of the first rule matching the `values` mapping of
+        {field: value}, or None.
+        """
+        matched = []
+
+        for field, trie in self.tries.items():
+            matched.extend(trie.get_prefix_values(values.get(field) or ""))
+
+        for field, regex in self.regexes.items():
+            match = regex.match(values.get(field) or "")
+            matched.extend(
+                int(name[4:])
+                for name, group in match.groupdict().items()
+                if group is not None
+            )
+
+        for field, exacts in self.exacts.items():
+            value = values.get(field)
+            matched.extend(index for expected, index in exacts if value == expected)
+
+        if matched:
+            return min(matched)
+
+    def match(self, values):
+        """
+        Returns the status of the first rule matching the `values` mapping of
+        {field: value}, or None.
+        """
+        index = self.match_index(values)
+        if index is not None:
+            return self.rules[index].status
+
+
+def tag_codebase_resources(project, rules, chunk_size=2000):
+    """
+    Tags the `project` CodebaseResource without a status using the `rules`, in a
+    single pass over the resources.
+    The statuses are written with bulk updates, in the `rules` priority order.
+    Returns a {status: count} mapping of the tagged resources.
+    """
+    matcher = RuleMatcher(rules)
+    fields = matcher.fields
+
+    pks_by_status = defaultdict(list)
+    qs = project.codebaseresources.no_status().order_by()
+    for pk, *values in qs.values_list("pk", *fields).iterator(chunk_size=chunk_size):
+        status = matcher.match(dict(zip(fields, values)))
+        if status:
+            pks_by_status[status].append(pk)
+
+    updated_counts = {}
+    for status in dict.fromkeys(rule.status for rule in matcher.rules):
+        pks = pks_by_status.get(status)
+        if not pks:
+            continue
+        for index in range(0, len(pks), chunk_size):
+            project.codebaseresources.filter(
+                pk__in=pks[index : index + chunk_size]
+            ).update(status=status)
+        updated_counts[status] = len(pks)
+
+    return updated_counts
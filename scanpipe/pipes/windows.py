@@ -21,12 +21,16 @@
 # Visit https://github.com/nexB/scancode.io for support and download.
 
 import re
+from collections import defaultdict
+from collections import namedtuple
 
 from django.db.models import Q
 
 from packagedcode import win_reg
 
 from scanpipe import pipes
+from scanpipe.models import DiscoveredPackage
+from scanpipe.pipes import tagging
 
 
 def package_getter(root_dir, **kwargs):
@@ -38,59 +42,85 @@ def package_getter(root_dir, **kwargs):
         yield package.purl, package
 
 
+UNINTERESTING_WINDOWS_RULES = [
+    tagging.Rule(
+        status="ignored-not-interesting",
+        field="rootfs_path",
+        lookup="iendswith",
+        values=(
+            "DefaultUser_Delta",
+            "Sam_Delta",
+            "Security_Delta",
+            "Software_Delta",
+            "System_Delta",
+            "NTUSER.DAT",
+            "desktop.ini",
+            "BBI",
+            "BCD-Template",
+            "DEFAULT",
+            "DRIVERS",
+            "ELAM",
+            "SAM",
+            "SECURITY",
+            "SOFTWARE",
+            "SYSTEM",
+            "system.ini",
+        ),
+    ),
+    tagging.Rule(
+        status="ignored-not-interesting",
+        field="extension",
+        lookup="icontains",
+        values=(
+            ".lnk",
+            ".library-ms",
+            ".LOG",
+            ".inf_loc",
+            ".NLS",
+            ".dat",
+            ".pem",
+            ".xrm-ms",
+            ".sql",
+            ".mof",
+            ".mfl",
+            ".manifest",
+            ".inf",
+            ".cat",
+            ".efi",
+            ".evtx",
+            ".cat",
+            ".pnf",
+        ),
+    ),
+]
+
+
 def tag_uninteresting_windows_codebase_resources(project):
     """
     Tags known uninteresting files as uninteresting
     """
-    uninteresting_files = (
-        "DefaultUser_Delta",
-        "Sam_Delta",
-        "Security_Delta",
-        "Software_Delta",
-        "System_Delta",
-        "NTUSER.DAT",
-        "desktop.ini",
-        "BBI",
-        "BCD-Template",
-        "DEFAULT",
-        "DRIVERS",
-        "ELAM",
-        "SAM",
-        "SECURITY",
-        "SOFTWARE",
-        "SYSTEM",
-        "system.ini",
-    )
+    tagging.tag_codebase_resources(project, UNINTERESTING_WINDOWS_RULES)
 
-    uninteresting_file_extensions = (
-        ".lnk",
-        ".library-ms",
-        ".LOG",
-        ".inf_loc",
-        ".NLS",
-        ".dat",
-        ".pem",
-        ".xrm-ms",
-        ".sql",
-        ".mof",
-        ".mfl",
-        ".manifest",
-        ".inf",
-        ".cat",
-        ".efi",
-        ".evtx",
-        ".cat",
-        ".pnf",
-    )
 
-    lookups = Q()
-    for file_name in uninteresting_files:
-        lookups |= Q(rootfs_path__iendswith=file_name)
-    for file_extension in uninteresting_file_extensions:
-        lookups |= Q(extension__icontains=file_extension)
-
-    qs = project.codebaseresources.no_status()
-    qs.filter(lookups).update(status="ignored-not-interesting")
+def add_installed_package_files(project, resource_pks_by_package_pk):
+    """
+    Relates the CodebaseResource to their DiscoveredPackage from the
+    `resource_pks_by_package_pk` mapping of {package_pk: [resource_pk]}.
+    The relations are created with bulk inserts and the status is set with one
+    UPDATE per package.
+    """
+    ThroughModel = DiscoveredPackage.codebase_resources.through
+    relations = [
+        ThroughModel(discoveredpackage_id=package_pk, codebaseresource_id=pk)
+        for package_pk, resource_pks in resource_pks_by_package_pk.items()
+        for pk in resource_pks
+    ]
+    ThroughModel.objects.bulk_create(relations, batch_size=5000, ignore_conflicts=True)
+
+    for resource_pks in resource_pks_by_package_pk.values():
+        project.codebaseresources.filter(pk__in=resource_pks).update(
+            status="installed-package"
+        )
 
 
 def tag_installed_package_files(project, root_dir_pattern, package, q_objects=None):
@@ -108,104 +138,156 @@ def tag_installed_package_files(project, root_dir_pattern, package, q_objects=No
     for q_object in q_objects or []:
         lookup &= q_object
 
-    installed_package_files = qs.filter(lookup)
+    installed_package_file_pks = list(qs.filter(lookup).values_list("pk", flat=True))
     # If we find files whose names start with `root_dir_pattern`, we consider
     # these files to be part of the Package `package` and tag these files as such.
-    if installed_package_files:
+    if installed_package_file_pks:
         created_package = pipes.update_or_create_package(project, package.to_dict())
-        for installed_package_file in installed_package_files:
-            installed_package_file.discovered_packages.add(created_package)
-            installed_package_file.status = "installed-package"
-            installed_package_file.save()
-        created_package.save()
+        add_installed_package_files(
+            project, {created_package.pk: installed_package_file_pks}
+        )
 
 
-def _tag_python_software(project):
-    qs = project.codebaseresources.no_status()
-    python_root_pattern = r"(?P<root_path>^/(Files/)?Python(?P<version>\d+)?)/.*$"
-    python_root_pattern_compiled = re.compile(python_root_pattern)
-    python_resources = qs.filter(rootfs_path__regex=r"(^/(Files/)?Python(\d+)?)/.*$")
-
-    python_versions_by_path = {}
-    for python_resource in python_resources:
-        match = python_root_pattern_compiled.match(python_resource.rootfs_path)
-        if not match:
-            continue
+# A KnownSoftware describes the root directories of an installed software:
+#
+# - `root_pattern` is a compiled regex matched on the resource `rootfs_path` with a
+#   `root_path` named group for the software root directory.
+# - `get_package` is a callable returning an InstalledWindowsProgram from the
+#   `root_pattern` match object, or None when the root directory is not a package.
+# - `exclude_pattern` is an optional compiled regex searched in the `rootfs_path`
+#   of the files under the root directory that are not part of the software.
+KnownSoftware = namedtuple(
+    "KnownSoftware", ["root_pattern", "get_package", "exclude_pattern"]
+)
 
-        python_root_path = match.group("root_path")
-        if python_root_path in python_versions_by_path:
-            continue
 
-        version = match.group("version")
-        if not version:
-            version = "nv"
-        if version != "nv":
-            version = ".".join(digit for digit in version)
+def get_python_package(match):
+    """
+    Returns an Python InstalledWindowsProgram from the root path `match`.
+    """
+    version = match.group("version")
+    if version:
+        version = ".".join(digit for digit in version)
+
+    return win_reg.InstalledWindowsProgram(
+        name="Python",
+        version=version or "nv",
+        license_expression="python",
+        copyright="Copyright (c) Python Software Foundation",
+        homepage_url="https://www.python.org/",
+    )
+
+
+def get_openjdk_package(match):
+    """
+    Returns an OpenJDK InstalledWindowsProgram from the root path `match`.
+    """
+    return win_reg.InstalledWindowsProgram(
+        name="OpenJDK",
+        version=match.group("version") or "nv",
+        license_expression="gpl-2.0 WITH oracle-openjdk-classpath-exception-2.0",
+        copyright="Copyright (c) Oracle and/or its affiliates",
+        homepage_url="http://openjdk.java.net/",
+    )
 
-        python_versions_by_path[python_root_path] = version
 
+PYTHON_SOFTWARE = KnownSoftware(
+    root_pattern=re.compile(r"(?P<root_path>^/(Files/)?Python(?P<version>\d+)?)/.*$"),
+    get_package=get_python_package,
     # We do not want to tag the files in the `site-packages` directory as being
     # from Python proper. The packages found here are oftentimes third-party
     # packages from outside the Python foundation
-    q_objects = [~Q(rootfs_path__icontains="site-packages")]
-
-    for python_path, python_version in python_versions_by_path.items():
-        python_package = win_reg.InstalledWindowsProgram(
-            name="Python",
-            version=python_version,
-            license_expression="python",
-            copyright="Copyright (c) Python Software Foundation",
-            homepage_url="https://www.python.org/",
-        )
-        tag_installed_package_files(
-            project=project,
-            root_dir_pattern=python_path,
-            package=python_package,
-            q_objects=q_objects,
-        )
-
+    exclude_pattern=re.compile("site-packages", re.IGNORECASE),
+)
 
-def _tag_openjdk_software(project):
-    qs = project.codebaseresources.no_status()
-    openjdk_root_pattern = (
+OPENJDK_SOFTWARE = KnownSoftware(
+    root_pattern=re.compile(
         r"^(?P<root_path>/(Files/)?(open)?jdk(-(?P<version>(\d*)(\.\d+)*))*)/.*$"
-    )
-    openjdk_root_pattern_compiled = re.compile(openjdk_root_pattern)
-    openjdk_resources = qs.filter(
-        rootfs_path__regex=r"^(/(Files/)?(open)?jdk(-((\d*)(\.\d+)*))*)/.*$"
-    )
+    ),
+    get_package=get_openjdk_package,
+    exclude_pattern=None,
+)
 
-    openjdk_versions_by_path = {}
-    for openjdk_codebase_resource in openjdk_resources:
-        match = openjdk_root_pattern_compiled.match(
-            openjdk_codebase_resource.rootfs_path
-        )
-        if not match:
+KNOWN_SOFTWARE = [
+    PYTHON_SOFTWARE,
+    OPENJDK_SOFTWARE,
+]
+
+
+def get_software_owner(rootfs_path, candidates, known_software):
+    """
+    Returns the root path of the software owning the `rootfs_path` file among the
+    `candidates` list of (software_index, root_path), or None.
+    The first software of the `known_software` list wins and for a given software,
+    the longest root path wins.
+    """
+    for index, root_path in sorted(candidates, key=lambda c: (c[0], -len(c[1]))):
+        exclude_pattern = known_software[index].exclude_pattern
+        if exclude_pattern and exclude_pattern.search(rootfs_path):
             continue
+        return root_path
+
 
-        openjdk_root_path = match.group("root_path")
-        if openjdk_root_path in openjdk_versions_by_path:
+def tag_software_roots(project, known_software):
+    """
+    Finds the root directories of the `known_software` list of KnownSoftware in a
+    single pass over the `project` CodebaseResource without a status, sorted by
+    `rootfs_path`.
+    A DiscoveredPackage is created for each software root directory and all the
+    files under that root directory are considered installed files for that
+    package. The files are related to their package with bulk inserts and tagged
+    with one UPDATE per package.
+    """
+    packages_by_root = {}
+    roots_trie = tagging.PrefixTrie()
+    last_root_paths = [None] * len(known_software)
+    resources = []
+
+    qs = project.codebaseresources.no_status().order_by("rootfs_path")
+    for pk, rootfs_path in qs.values_list("pk", "rootfs_path").iterator(2000):
+        resources.append((pk, rootfs_path))
+
+        for index, software in enumerate(known_software):
+            # The paths are sorted, the files of a known root are consecutive.
+            last_root_path = last_root_paths[index]
+            if last_root_path and rootfs_path.startswith(f"{last_root_path}/"):
+                continue
+
+            match = software.root_pattern.match(rootfs_path)
+            if not match:
+                continue
+
+            root_path = match.group("root_path")
+            last_root_paths[index] = root_path
+            if root_path in packages_by_root:
+                continue
+
+            package = software.get_package(match)
+            if package:
+                packages_by_root[root_path] = package
+                roots_trie.add(root_path, (index, root_path))
+
+    resource_pks_by_root = defaultdict(list)
+    for pk, rootfs_path in resources:
+        candidates = roots_trie.get_prefix_values(rootfs_path)
+        if not candidates:
             continue
+        root_path = get_software_owner(rootfs_path, candidates, known_software)
+        if root_path:
+            resource_pks_by_root[root_path].append(pk)
 
-        openjdk_version = match.group("version")
-        if not openjdk_version:
-            openjdk_version = "nv"
+    packages_data = [
+        packages_by_root[root_path].to_dict() for root_path in resource_pks_by_root
+    ]
+    package_pks_by_purl = pipes.update_or_create_packages(project, packages_data)
 
-        openjdk_versions_by_path[openjdk_root_path] = openjdk_version
+    resource_pks_by_package_pk = defaultdict(list)
+    for package_data, resource_pks in zip(packages_data, resource_pks_by_root.values()):
+        package_pk = package_pks_by_purl.get(pipes.get_package_purl(package_data))
+        if package_pk:
+            resource_pks_by_package_pk[package_pk].extend(resource_pks)
 
-    for openjdk_path, openjdk_version in openjdk_versions_by_path.items():
-        openjdk_package = win_reg.InstalledWindowsProgram(
-            name="OpenJDK",
-            version=openjdk_version,
-            license_expression="gpl-2.0 WITH oracle-openjdk-classpath-exception-2.0",
-            copyright="Copyright (c) Oracle and/or its affiliates",
-            homepage_url="http://openjdk.java.net/",
-        )
-        tag_installed_package_files(
-            project=project,
-            root_dir_pattern=openjdk_path,
-            package=openjdk_package,
-        )
+    add_installed_package_files(project, resource_pks_by_package_pk)
 
 
 def tag_known_software(project):
@@ -217,14 +299,13 @@ def tag_known_software(project):
     that software package's root directory are considered installed files for
     that package.
 
-    Currently, we are only checking for Python and openjdk in Windows Docker
-    image layers.
+    The known software are listed in `KNOWN_SOFTWARE`, currently Python and openjdk
+    in Windows Docker image layers.
 
     If a version number cannot be determined for an installed software Package,
     then a version number of "nv" will be set.
     """
-    _tag_python_software(project)
-    _tag_openjdk_software(project)
+    tag_software_roots(project, KNOWN_SOFTWARE)
 
 
 PROGRAM_FILES_DIRS_TO_IGNORE = (
@@ -233,6 +314,26 @@ PROGRAM_FILES_DIRS_TO_IGNORE = (
 )
 
 
+def get_program_files_package(match):
+    """
+    Returns an InstalledWindowsProgram from the Program Files subdirectory `match`,
+    or None for the ignored subdirectories.
+    """
+    dirname = match.group("dirname")
+    if dirname.lower() in map(str.lower, PROGRAM_FILES_DIRS_TO_IGNORE):
+        return
+    return win_reg.InstalledWindowsProgram(name=dirname, version="nv")
+
+
+PROGRAM_FILES_SOFTWARE = KnownSoftware(
+    root_pattern=re.compile(
+        r"(?P<root_path>^.*/Program Files( \(x86\))?/(?P<dirname>[^/]+))"
+    ),
+    get_package=get_program_files_package,
+    exclude_pattern=None,
+)
+
+
 def tag_program_files(project):
     """
     Reports all subdirectories of Program Files and Program Files (x86) as Packages.
@@ -241,36 +342,4 @@ def tag_program_files(project):
     the version from the path. If a version cannot be determined, a version of
     `nv` will be set for the Package.
     """
-    qs = project.codebaseresources.no_status()
-    # Get all files from Program Files and Program Files (x86)
-    program_files_subdir_pattern = (
-        r"(?P<program_files_subdir>^.*Program Files( \(x86\))?/(?P<dirname>[^/]+))"
-    )
-    program_files_subdir_pattern_compiled = re.compile(program_files_subdir_pattern)
-    program_files_resources = qs.filter(
-        rootfs_path__regex=r"^.*/Program Files( \(x86\))?"
-    )
-
-    program_files_dirname_by_path = {}
-    for program_file in program_files_resources:
-        match = program_files_subdir_pattern_compiled.match(program_file.rootfs_path)
-        if not match:
-            continue
-
-        program_files_subdir = match.group("program_files_subdir")
-        dirname = match.group("dirname")
-        if (
-            program_files_subdir in program_files_dirname_by_path
-            or dirname.lower() in map(str.lower, PROGRAM_FILES_DIRS_TO_IGNORE)
-        ):
-            continue
-
-        program_files_dirname_by_path[program_files_subdir] = dirname
-
-    for root_dir, root_dir_name in program_files_dirname_by_path.items():
-        package = win_reg.InstalledWindowsProgram(name=root_dir_name, version="nv")
-        tag_installed_package_files(
-            project=project,
-            root_dir_pattern=root_dir,
-            package=package,
-        )
+    tag_software_roots(project, [PROGRAM_FILES_SOFTWARE])
@@ -54,18 +54,99 @@ def execute_pipeline_task(self, run_pk):
     run.set_task_started(task_id)
 
     info(f'Run pipeline: "{run.pipeline_name}" on project: "{project.name}"', run_pk)
+    execute_run_pipeline(run)
 
+
+@shared_task(bind=True)
+def resume_pipeline_task(self, run_pk, step_name):
+    """
+    Resumes the suspended pipeline of the Run identified by `run_pk` after its
+    `step_name` step, see `PipelineSuspended`.
+    """
+    info(f"Enter `{self.name}` Task.id={self.request.id}", run_pk)
+
+    run = get_run_instance(run_pk)
+    info(f'Resume pipeline: "{run.pipeline_name}" after step: "{step_name}"', run_pk)
+    execute_run_pipeline(run, resume_after=step_name)
+
+
+@shared_task(bind=True)
+def fail_pipeline_task(self, run_pk, *args):
+    """
+    Ends the Run identified by `run_pk` as failed when one of the tasks its
+    suspended pipeline is waiting for has failed.
+    """
+    info(f"Enter `{self.name}` Task.id={self.request.id}", run_pk)
+
+    run = get_run_instance(run_pk)
+    run.set_task_ended(exitcode=1, output="A task of the suspended pipeline failed.")
+
+
+def execute_run_pipeline(run, resume_after=None):
+    """
+    Executes the `run` pipeline, optionally resumed after the `resume_after` step,
+    and updates the `run` with the execution results unless the pipeline was
+    suspended.
+    """
     pipeline = run.make_pipeline_instance()
 
     try:
-        exitcode, output = pipeline.execute()
+        exitcode, output = pipeline.execute(resume_after=resume_after)
     except SoftTimeLimitExceeded:
-        info("SoftTimeLimitExceeded", run_pk)
+        info("SoftTimeLimitExceeded", run.pk)
         exitcode, output = 1, "SoftTimeLimitExceeded"
+    finally:
+        # The scan workers are shared across the pipeline steps of this Run.
+        from scanpipe.pipes.scancode import shutdown_scan_pool
+
+        shutdown_scan_pool()
 
-    info("Update Run instance with exitcode, output, and end_date", run_pk)
+    if exitcode is None:
+        info("Pipeline suspended, the Run is ended once resumed", run.pk)
+        return
+
+    info("Update Run instance with exitcode, output, and end_date", run.pk)
     run.set_task_ended(exitcode, output, refresh_first=True)
 
     if run.task_succeeded:
         # We keep the temporary files available for debugging in case of error
-        project.clear_tmp_directory()
+        run.project.clear_tmp_directory()
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    max_retries=3,
+    retry_backoff=True,
+)
+def scan_shard_task(self, project_pk, scan_name, min_pk, max_pk):
+    """
+    Runs the `scan_name` scan pipe on the resources of the project identified by
+    `project_pk` in the (min_pk, max_pk) range.
+    The shard is retried on failure, only its resources left without status are
+    scanned again.
+    """
+    from scanpipe.pipes import scancode
+
+    tasks_logger.info(f"Project[{project_pk}] {scan_name} shard {min_pk}-{max_pk}")
+    project_model = apps.get_model("scanpipe", "Project")
+    project = project_model.objects.get(pk=project_pk)
+
+    try:
+        scancode.scan_shard(project, scan_name, pk_range=(min_pk, max_pk))
+    finally:
+        scancode.shutdown_scan_pool()
+
+
+@shared_task(bind=True)
+def complete_shards_task(self, project_pk, scan_name):
+    """
+    Completes the `scan_name` scan of the project identified by `project_pk` once
+    all its shards are completed.
+    """
+    from scanpipe.pipes import scancode
+
+    tasks_logger.info(f"Project[{project_pk}] {scan_name} shards completed")
+    project_model = apps.get_model("scanpipe", "Project")
+    project = project_model.objects.get(pk=project_pk)
+    scancode.complete_shards(project, scan_name)
@@ -111,6 +111,12 @@ class ScanPipeAPITest(TransactionTestCase):
         expected = [{"filename": "file", "source": "uploaded"}]
         self.assertEqual(expected, response.data["input_sources"])
 
+        run1 = self.project1.add_pipeline("docker")
+        run1.append_to_log("line1", save=True)
+        response = self.csrf_client.get(self.project1_detail_url)
+        self.assertEqual(str(run1.uuid), response.data["runs"][0]["uuid"])
+        self.assertNotIn("log", response.data["runs"][0])
+
     @mock.patch("requests.get")
     @mock.patch("scanpipe.models.Run.execute_task_async")
     def test_scanpipe_api_project_create(self, mock_execute_pipeline_task, mock_get):
@@ -356,6 +362,28 @@ class ScanPipeAPITest(TransactionTestCase):
         self.assertIsNone(response.data["execution_time"])
         self.assertEqual(Run.Status.NOT_STARTED, response.data["status"])
 
+    def test_scanpipe_api_run_action_log_entries(self):
+        run1 = self.project1.add_pipeline("docker")
+        url = reverse("run-log-entries", args=[run1.uuid])
+        response = self.csrf_client.get(url)
+        expected = {"offset": 0, "status": Run.Status.NOT_STARTED, "entries": []}
+        self.assertEqual(expected, response.data)
+
+        run1.append_to_log("line1")
+        run1.append_to_log("line2", level="ERROR", step="step1", save=True)
+        response = self.csrf_client.get(url)
+        entries = response.data["entries"]
+        self.assertEqual(["line1", "line2"], [e["message"] for e in entries])
+        self.assertEqual("ERROR", entries[1]["level"])
+        self.assertEqual("step1", entries[1]["step"])
+        self.assertEqual(entries[1]["id"], response.data["offset"])
+
+        response = self.csrf_client.get(url, {"offset": response.data["offset"]})
+        self.assertEqual([], response.data["entries"])
+
+        response = self.csrf_client.get(url, {"offset": "a"})
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
     @mock.patch("scanpipe.models.Run.execute_task_async")
     def test_scanpipe_api_run_action_start_pipeline(self, mock_execute_task):
         run1 = self.project1.add_pipeline("docker")
@@ -364,3 +364,21 @@ class ScanPipeManagementCommandTest(TestCase):
 
         self.assertFalse(Project.objects.filter(name="my_project").exists())
         self.assertFalse(work_path.exists())
+
+    def test_scanpipe_management_command_update_stats(self):
+        project = Project.objects.create(name="my_project")
+        self.assertEqual(0, project.resource_count)
+        project.codebaseresources.create(path="file")
+
+        out = StringIO()
+        options = ["--project", "non-existing", "--no-color"]
+        expected = "Project non-existing does not exist"
+        with self.assertRaisesMessage(CommandError, expected):
+            call_command("update-stats", *options, stdout=out)
+
+        options = ["--project", project.name, "--no-color"]
+        call_command("update-stats", *options, stdout=out)
+        self.assertIn("Stats updated for 1 project(s).", out.getvalue())
+
+        project = Project.objects.get(pk=project.pk)
+        self.assertEqual(1, project.resource_count)
@@ -42,6 +42,7 @@ from scanpipe.models import CodebaseResource
 from scanpipe.models import DiscoveredPackage
 from scanpipe.models import Project
 from scanpipe.models import ProjectError
+from scanpipe.models import ProjectStats
 from scanpipe.models import Run
 from scanpipe.models import get_project_work_directory
 from scanpipe.pipes.fetch import Download
@@ -528,6 +529,35 @@ class ScanPipeModelsTest(BaseScanPipeModelsTest, TestCase):
         run1.refresh_from_db()
         self.assertEqual("line1\nline2\n", run1.log)
 
+        run1.append_to_log("line3", level="ERROR", step="step1", save=True)
+        entry = run1.log_entries.last()
+        self.assertEqual("line3", str(entry))
+        self.assertEqual("ERROR", entry.level)
+        self.assertEqual("step1", entry.step)
+        self.assertEqual([], run1.pending_log_entries)
+
+        run1.log = "legacy\n"
+        run1.save()
+        run1.refresh_from_db()
+        self.assertEqual("legacy\nline1\nline2\nline3\n", run1.log)
+
+    def test_scanpipe_run_model_get_log_entries(self):
+        run1 = self.create_run()
+        self.assertEqual([], list(run1.get_log_entries()))
+
+        for message in ("line1", "line2", "line3"):
+            run1.append_to_log(message)
+        run1.save_log_entries()
+
+        entries = list(run1.get_log_entries())
+        self.assertEqual(["line1", "line2", "line3"], [str(e) for e in entries])
+
+        entries = list(run1.get_log_entries(offset=entries[0].id, limit=1))
+        self.assertEqual(["line2"], [str(e) for e in entries])
+
+        offset = run1.log_entries.last().id
+        self.assertEqual([], list(run1.get_log_entries(offset=offset)))
+
     def test_scanpipe_run_model_profile_method(self):
         run1 = self.create_run()
         self.assertIsNone(run1.profile())
@@ -864,6 +894,58 @@ class ScanPipeModelsTest(BaseScanPipeModelsTest, TestCase):
         self.assertEqual(1, CodebaseResource.objects.in_package().count())
         self.assertEqual(2, CodebaseResource.objects.not_in_package().count())
 
+    def test_scanpipe_codebase_resource_indexes_query_plans(self):
+        resources = self.project1.codebaseresources.order_by()
+        long_path = "/".join(["directory"] * 200)
+        index_by_queryset = [
+            (resources.status("scanned"), "scanpipe_resource_md5_idx"),
+            # Streamed with a server-side cursor, the plans favor the first rows.
+            (
+                resources.no_status().order_by("rootfs_path")[:10],
+                "scanpipe_resource_nostatus_idx",
+            ),
+            (
+                resources.filter(rootfs_path__startswith="/usr/"),
+                "scanpipe_resource_rootfs_idx",
+            ),
+            (resources.filter(name__startswith=".wh."), "scanpipe_resource_name_idx"),
+            (resources.directories(), "scanpipe_resource_type_idx"),
+            (resources.filter(licenses=[]), "scanpipe_resource_nolic_idx"),
+            (resources.license_keys(["mit"]), "scanpipe_resource_lickeys_gin"),
+            (
+                resources.licenses_categories(["Permissive"]),
+                "scanpipe_resource_liccats_gin",
+            ),
+            (
+                CodebaseResource.objects.filter(path=long_path).order_by(),
+                "scanpipe_resource_path_hash",
+            ),
+        ]
+
+        CodebaseResource.objects.bulk_create(
+            CodebaseResource(
+                project=self.project1,
+                path=f"root/dir{index % 10}/file{index}",
+                rootfs_path=f"/dir{index % 10}/file{index}",
+                name=f"file{index}",
+                type="directory" if index % 10 == 1 else "file",
+                status=["", "scanned"][index % 10] if index % 10 < 2 else "other",
+                licenses=[] if index % 10 == 2 else [{"key": "mit"}],
+                license_keys=["mit"] if index % 10 == 3 else [],
+                license_categories=["Permissive"] if index % 10 == 3 else [],
+            )
+            for index in range(1000)
+        )
+
+        # The sequential scans are always cheaper on the small test tables.
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE scanpipe_codebaseresource")
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+        for queryset, index_name in index_by_queryset:
+            query_plan = queryset.explain()
+            self.assertIn(index_name, query_plan, msg=str(queryset.query))
+
     def test_scanpipe_codebase_resource_queryset_licenses_categories(self):
         CodebaseResource.objects.all().delete()
 
@@ -896,6 +978,54 @@ class ScanPipeModelsTest(BaseScanPipeModelsTest, TestCase):
         expected = [resource1, resource2]
         self.assertQuerysetEqual(expected, resource_qs.licenses_categories(categories))
 
+    def test_scanpipe_codebase_resource_set_license_fields(self):
+        resource = CodebaseResource.objects.create(
+            project=self.project1,
+            path="1",
+            licenses=[
+                {"key": "gpl-3.0-plus", "category": "Copyleft"},
+                {"key": "mit", "category": "Permissive"},
+                {"key": "apache-2.0", "category": "Permissive"},
+            ],
+            license_expressions=["gpl-3.0-plus OR mit", "mit AND apache-2.0"],
+        )
+        resource.refresh_from_db()
+        self.assertEqual(["gpl-3.0-plus", "mit", "apache-2.0"], resource.license_keys)
+        expected = ["Copyleft", "Permissive", "Permissive"]
+        self.assertEqual(expected, resource.license_categories)
+        self.assertFalse(resource.has_unknown_license)
+
+        # The keys and categories are listed for each detection.
+        resource.licenses = [
+            {"key": "mit", "category": "Permissive"},
+            {"key": "mit", "category": "Permissive"},
+            {"key": "unknown"},
+        ]
+        resource.license_expressions = ["mit", "unknown"]
+        resource.set_license_fields()
+        self.assertEqual(["mit", "mit", "unknown"], resource.license_keys)
+        self.assertEqual(["Permissive", "Permissive"], resource.license_categories)
+        self.assertTrue(resource.has_unknown_license)
+
+    def test_scanpipe_codebase_resource_queryset_json_list_values_count(self):
+        CodebaseResource.objects.create(
+            project=self.project1, path="1", licenses=[{"key": "mit"}, {"key": "mit"}]
+        )
+        CodebaseResource.objects.create(
+            project=self.project1,
+            path="2",
+            licenses=[{"key": "mit"}, {"key": "gpl-2.0"}],
+        )
+        CodebaseResource.objects.create(project=self.project1, path="3")
+
+        resource_qs = self.project1.codebaseresources
+        expected = {"mit": 3, "gpl-2.0": 1}
+        self.assertEqual(expected, resource_qs.json_list_values_count("license_keys"))
+        self.assertEqual({}, resource_qs.json_list_values_count("license_categories"))
+
+        self.assertEqual(2, resource_qs.license_keys(["mit", "bsd-new"]).count())
+        self.assertEqual(1, resource_qs.license_keys(["gpl-2.0"]).count())
+
     def test_scanpipe_codebase_resource_queryset_json_field_contains(self):
         resource1 = CodebaseResource.objects.create(project=self.project1, path="1")
         resource1.holders = [
@@ -956,6 +1086,19 @@ class ScanPipeModelsTest(BaseScanPipeModelsTest, TestCase):
         ]
         self.assertEqual(expected, [resource.path for resource in children])
 
+    def test_scanpipe_codebase_resource_parent_path(self):
+        resource = CodebaseResource.objects.create(project=self.project1, path="root")
+        self.assertEqual("", resource.parent_path)
+        resource = CodebaseResource.objects.create(
+            project=self.project1, path="root/dir/file"
+        )
+        self.assertEqual("root/dir", resource.parent_path)
+
+        root = self.project_asgiref.codebaseresources.get(path="codebase")
+        with self.assertNumQueries(1):
+            walked_paths = [resource.path for resource in root.walk()]
+        self.assertEqual(18, len(walked_paths))
+
     def test_scanpipe_codebase_resource_create_and_add_package(self):
         codebase_resource = CodebaseResource.objects.create(
             project=self.project1, path="filename.ext"
@@ -1016,6 +1159,66 @@ class ScanPipeModelsTransactionTest(TransactionTestCase):
         self.assertEqual("Error message", error.message)
         self.assertEqual("", error.traceback)
 
+    def test_scanpipe_project_model_stats(self):
+        project1 = Project.objects.create(name="Analysis")
+        self.assertEqual(0, project1.resource_count)
+        # The stats are not stored on read.
+        self.assertFalse(ProjectStats.objects.exists())
+
+        CodebaseResource.objects.create(
+            project=project1, path="dir", type=CodebaseResource.Type.DIRECTORY
+        )
+        file1 = CodebaseResource.objects.create(
+            project=project1, path="dir/file1", type=CodebaseResource.Type.FILE
+        )
+        CodebaseResource.objects.create(
+            project=project1,
+            path="dir/file2",
+            type=CodebaseResource.Type.FILE,
+            status="scanned",
+        )
+        file1.create_and_add_package(package_data1)
+        project1.add_error(Exception("Error message"), model="Package")
+
+        # Without stored stats, the counts are computed live.
+        project1 = Project.objects.get(pk=project1.pk)
+        self.assertEqual(3, project1.resource_count)
+        self.assertEqual(1, project1.error_count)
+        self.assertFalse(ProjectStats.objects.exists())
+
+        stats = project1.update_stats()
+        self.assertEqual(project1, stats.project)
+        project1 = Project.objects.get(pk=project1.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(3, project1.resource_count)
+            self.assertEqual(2, project1.file_count)
+            self.assertEqual(1, project1.file_in_package_count)
+            self.assertEqual(1, project1.file_not_in_package_count)
+            self.assertEqual(1, project1.package_count)
+            self.assertEqual(1, project1.error_count)
+
+        expected = {"": 2, "scanned": 1}
+        self.assertEqual(expected, project1.stats.codebase_resources_summary)
+        expected = {
+            "total": 1,
+            "with_missing_resources": 0,
+            "with_modified_resources": 0,
+        }
+        self.assertEqual(expected, project1.stats.discovered_package_summary)
+
+        # The stored error count is incremented on each new error, while the other
+        # counts are only refreshed on `update_stats()`.
+        CodebaseResource.objects.create(project=project1, path="file3")
+        project1.add_error(Exception("Error message"), model="Package")
+        project1 = Project.objects.get(pk=project1.pk)
+        self.assertEqual(3, project1.resource_count)
+        self.assertEqual(2, project1.error_count)
+
+        project1.reset()
+        project1 = Project.objects.get(pk=project1.pk)
+        self.assertEqual(0, project1.resource_count)
+        self.assertEqual(0, project1.error_count)
+
     def test_scanpipe_project_model_update_extra_data(self):
         project1 = Project.objects.create(name="Analysis")
         self.assertEqual({}, project1.extra_data)
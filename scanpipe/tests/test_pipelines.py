@@ -30,7 +30,9 @@ from django.test import TestCase
 from django.test import tag
 
 from scanpipe.models import Project
+from scanpipe.models import ProjectStats
 from scanpipe.pipelines import Pipeline
+from scanpipe.pipelines import docker
 from scanpipe.pipelines import is_pipeline
 from scanpipe.pipelines import root_filesystems
 from scanpipe.tests.pipelines.do_nothing import DoNothing
@@ -82,6 +84,13 @@ class ScanPipePipelinesTest(TestCase):
         self.assertIn("Step [step2] completed", run.log)
         self.assertIn("Pipeline completed", run.log)
 
+        entry = run.log_entries.get(message__endswith="Step [step1] starting")
+        self.assertEqual("INFO", entry.level)
+        self.assertEqual("step1", entry.step)
+
+        # The project stats are stored at the step boundaries.
+        self.assertTrue(ProjectStats.objects.filter(project=project1).exists())
+
     def test_scanpipe_pipeline_class_execute_with_exception(self):
         project1 = Project.objects.create(name="Analysis")
         run = project1.add_pipeline("raise_exception")
@@ -101,6 +110,11 @@ class ScanPipePipelinesTest(TestCase):
         self.assertIn("Step [raise_exception_step] starting", run.log)
         self.assertIn("Pipeline failed", run.log)
 
+        entry = run.log_entries.last()
+        self.assertTrue(entry.message.endswith("Pipeline failed"))
+        self.assertEqual("ERROR", entry.level)
+        self.assertEqual("raise_exception_step", entry.step)
+
     def test_scanpipe_pipeline_class_save_errors_context_manager(self):
         project1 = Project.objects.create(name="Analysis")
         run = project1.add_pipeline("do_nothing")
@@ -188,6 +202,30 @@ class RootFSPipelineTest(TestCase):
         error = project1.projecterrors.get()
         self.assertEqual("Error\nError", error.message)
 
+    def test_scanpipe_rootfs_pipeline_fused_scan_steps(self):
+        steps = root_filesystems.RootFS.steps()
+        expected = (
+            root_filesystems.RootFS.scan_for_application_packages,
+            root_filesystems.RootFS.match_not_analyzed_to_system_packages,
+            root_filesystems.RootFS.scan_for_files,
+        )
+        self.assertEqual(expected, steps[7:10])
+        self.assertNotIn(root_filesystems.RootFS.scan_for_packages_and_files, steps)
+
+        with mock.patch("scanpipe.pipes.scancode.SCANCODEIO_SCAN_FUSED", True):
+            steps = root_filesystems.RootFS.steps()
+            docker_steps = docker.Docker.steps()
+
+        expected = (
+            root_filesystems.RootFS.match_not_analyzed_to_system_packages,
+            root_filesystems.RootFS.scan_for_packages_and_files,
+            root_filesystems.RootFS.analyze_scanned_files,
+        )
+        self.assertEqual(expected, steps[7:10])
+        self.assertNotIn(root_filesystems.RootFS.scan_for_files, steps)
+        self.assertIn(docker.Docker.scan_for_packages_and_files, docker_steps)
+        self.assertNotIn(docker.Docker.scan_for_application_packages, docker_steps)
+
 
 class ScanPackagePipelineTest(TestCase):
     maxDiff = None
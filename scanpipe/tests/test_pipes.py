@@ -22,33 +22,50 @@
 
 import collections
 import json
+import os
 import shutil
+import tempfile
+import time
 from pathlib import Path
 from unittest import mock
 from unittest.case import expectedFailure
 
 from django.apps import apps
 from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 from django.test import TransactionTestCase
 
 from commoncode.archive import extract_tar
+from packagedcode import debian as debian_packagedcode
 from scancode.interrupt import TimeoutError as InterruptTimeoutError
 
 from scanpipe.models import CodebaseResource
 from scanpipe.models import DiscoveredPackage
 from scanpipe.models import Project
+from scanpipe.pipelines import PipelineSuspended
 from scanpipe.pipes import codebase
+from scanpipe.pipes import debian
 from scanpipe.pipes import docker
 from scanpipe.pipes import fetch
 from scanpipe.pipes import filename_now
+from scanpipe.pipes import get_package_purl
+from scanpipe.pipes import jsonstream
+from scanpipe.pipes import lock_project_packages
 from scanpipe.pipes import make_codebase_resource
+from scanpipe.pipes import make_codebase_resources
 from scanpipe.pipes import output
 from scanpipe.pipes import rootfs
+from scanpipe.pipes import rpm
 from scanpipe.pipes import scancode
 from scanpipe.pipes import strip_root
 from scanpipe.pipes import tag_not_analyzed_codebase_resources
+from scanpipe.pipes import tagging
+from scanpipe.pipes import update_or_create_package
+from scanpipe.pipes import update_or_create_packages
 from scanpipe.pipes import windows
+from scanpipe.pipes.cache import FileSystemCache
+from scanpipe.pipes.cache import get_cache_key
 from scanpipe.pipes.input import copy_inputs
 from scanpipe.tests import license_policies_index
 from scanpipe.tests import mocked_now
@@ -57,6 +74,16 @@ from scanpipe.tests import package_data1
 scanpipe_app = apps.get_app_config("scanpipe")
 
 
+def supervised_scan_func(location, with_threading=True):
+    if location == "crash":
+        os._exit(1)
+    if location == "hang":
+        time.sleep(60)
+    if location.startswith("slow"):
+        time.sleep(1.5)
+    return {"location": location}, []
+
+
 class ScanPipePipesTest(TestCase):
     data_location = Path(__file__).parent / "data"
 
@@ -344,6 +371,9 @@ class ScanPipePipesTest(TestCase):
         scan_results = {"license_expressions": ["mit"]}
         scan_errors = []
         mock_scan_resource.return_value = scan_results, scan_errors
+        # Make sure the pool workers are forked with the mock in place.
+        scancode.shutdown_scan_pool()
+        self.addCleanup(scancode.shutdown_scan_pool)
 
         project1 = Project.objects.create(name="Analysis")
         sha1 = "51d28a27d919ce8690a40f4f335b9d591ceb16e9"
@@ -375,12 +405,106 @@ class ScanPipePipesTest(TestCase):
         scan_results = {"copyrights": ["copy"]}
         scan_errors = ["ERROR"]
         mock_scan_resource.return_value = scan_results, scan_errors
+        scancode.shutdown_scan_pool()
         scancode.scan_for_files(project1)
         resource3.refresh_from_db()
         self.assertEqual("scanned-with-error", resource3.status)
         self.assertEqual([], resource3.license_expressions)
         self.assertEqual(["copy"], resource3.copyrights)
 
+    @mock.patch.object(scanpipe_app, "license_policies_index", license_policies_index)
+    def test_scanpipe_pipes_scancode_file_scan_results_writer(self):
+        project1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(project=project1, path="file1")
+        resource2 = CodebaseResource.objects.create(project=project1, path="file2")
+        resource3 = CodebaseResource.objects.create(project=project1, path="file3")
+
+        scan_results = {
+            "licenses": [{"key": "mpl-2.0"}],
+            "license_expressions": ["mpl-2.0"],
+        }
+        with scancode.FileScanResultsWriter(project1, batch_size=2) as writer:
+            writer.save(resource1, scan_results, [])
+            writer.save(resource2, {"copyrights": ["copy"]}, ["ERROR"])
+            # The first batch is flushed once the `batch_size` is reached
+            self.assertEqual(1, project1.codebaseresources.status("scanned").count())
+            writer.save(resource3, {}, [])
+            self.assertEqual(1, project1.codebaseresources.status("scanned").count())
+
+        resource1.refresh_from_db()
+        self.assertEqual(["mpl-2.0"], resource1.license_expressions)
+        self.assertEqual("warning", resource1.compliance_alert)
+        policy = resource1.licenses[0]["policy"]
+        self.assertEqual("Restricted License", policy["label"])
+
+        resource2.refresh_from_db()
+        self.assertEqual("scanned-with-error", resource2.status)
+        self.assertEqual(["copy"], resource2.copyrights)
+        error = project1.projecterrors.get()
+        self.assertEqual("CodebaseResource", error.model)
+        self.assertEqual("ERROR", error.message)
+        self.assertEqual("file2", error.details["path"])
+
+        resource3.refresh_from_db()
+        self.assertEqual("scanned", resource3.status)
+
+    def test_scanpipe_pipes_scancode_package_scan_results_writer(self):
+        project1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(project=project1, path="file1")
+        resource2 = CodebaseResource.objects.create(project=project1, path="file2")
+        resource3 = CodebaseResource.objects.create(project=project1, path="file3")
+
+        with scancode.PackageScanResultsWriter(project1) as writer:
+            writer.save(resource1, {"packages": [package_data1]}, [])
+            writer.save(resource2, {"packages": [{"name": "incomplete"}]}, [])
+            writer.save(resource3, {"packages": []}, [])
+
+        resource1.refresh_from_db()
+        self.assertEqual("application-package", resource1.status)
+        package = resource1.discovered_packages.get()
+        self.assertEqual("pkg:deb/debian/adduser@3.118?arch=all", package.purl)
+
+        resource2.refresh_from_db()
+        self.assertEqual("application-package", resource2.status)
+        self.assertEqual(0, resource2.discovered_packages.count())
+        error = project1.projecterrors.get()
+        self.assertEqual("DiscoveredPackage", error.model)
+
+        resource3.refresh_from_db()
+        self.assertEqual("", resource3.status)
+
+    def test_scanpipe_pipes_scancode_package_and_file_scan_results_writer(self):
+        project1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(project=project1, path="file1")
+        resource2 = CodebaseResource.objects.create(project=project1, path="file2")
+
+        scan_results = {
+            "packages": [package_data1],
+            "license_expressions": ["mit"],
+        }
+        with scancode.PackageAndFileScanResultsWriter(project1) as writer:
+            writer.save(resource1, scan_results, [])
+            writer.save(resource2, {"copyrights": ["copy"]}, [])
+
+        resource1.refresh_from_db()
+        self.assertEqual("application-package", resource1.status)
+        self.assertEqual(["mit"], resource1.license_expressions)
+        package = resource1.discovered_packages.get()
+        self.assertEqual("pkg:deb/debian/adduser@3.118?arch=all", package.purl)
+
+        resource2.refresh_from_db()
+        self.assertEqual("scanned", resource2.status)
+        self.assertEqual(["copy"], resource2.copyrights)
+
+    def test_scanpipe_pipes_scancode_scan_for_package_and_file_info(self):
+        input_location = str(self.data_location / "notice.NOTICE")
+        scan_results, scan_errors = scancode.scan_for_package_and_file_info(
+            input_location
+        )
+        self.assertEqual([], scan_results["packages"])
+        for key in ["license_expressions", "emails", "urls"]:
+            self.assertIn(key, scan_results)
+
     def test_scanpipe_pipes_scancode_scan_for_package_info_timeout(self):
         input_location = str(self.data_location / "notice.NOTICE")
 
@@ -438,6 +562,326 @@ class ScanPipePipesTest(TestCase):
         with_threading = scan_func.call_args[0][-1]
         self.assertTrue(with_threading)
 
+    def test_scanpipe_pipes_scancode_get_scan_tasks(self):
+        project1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(
+            project=project1, path="dir/file", sha1="sha1"
+        )
+        resource2 = CodebaseResource.objects.create(project=project1, path="/file2")
+
+        queryset = project1.codebaseresources.order_by("pk")
+        scan_tasks = scancode._get_scan_tasks(project1, queryset)
+        expected = [
+            (resource1.pk, resource1.location, "sha1", None),
+            (resource2.pk, resource2.location, "", None),
+        ]
+        self.assertEqual(expected, list(scan_tasks))
+
+        scan_tasks = scancode._get_scan_tasks(
+            project1, queryset, select_scanners=lambda info: [info["path"]]
+        )
+        scanner_names = [scan_task.scanner_names for scan_task in scan_tasks]
+        self.assertEqual([["dir/file"], ["/file2"]], scanner_names)
+
+    def test_scanpipe_pipes_scancode_select_file_scanners(self):
+        all_scanners = ["copyrights", "licenses", "emails", "urls"]
+        legal_scanners = ["copyrights", "licenses"]
+
+        self.assertEqual(all_scanners, scancode.select_file_scanners({}))
+        resource_info = {"is_binary": True, "is_media": True}
+        self.assertEqual([], scancode.select_file_scanners(resource_info))
+        resource_info = {"file_type": "gzip compressed data"}
+        self.assertEqual([], scancode.select_file_scanners(resource_info))
+        resource_info = {"is_binary": True, "file_type": "ELF 64-bit LSB shared object"}
+        self.assertEqual(legal_scanners, scancode.select_file_scanners(resource_info))
+        resource_info = {"programming_language": "JavaScript", "path": "dist/a.min.js"}
+        self.assertEqual(legal_scanners, scancode.select_file_scanners(resource_info))
+        resource_info = {"is_text": True, "size": 20 * 1024 * 1024}
+        self.assertEqual(legal_scanners, scancode.select_file_scanners(resource_info))
+
+    @mock.patch("scanpipe.pipes.scancode._scan_resource")
+    def test_scanpipe_pipes_scancode_scan_for_files_prefilter(self, mock_scan):
+        mock_scan.return_value = {"copyrights": ["copy"]}, []
+        project1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(
+            project=project1, path="lib.so", is_binary=True
+        )
+
+        with mock.patch.multiple(
+            scancode, SCANCODEIO_PROCESSES=-1, SCANCODEIO_SCAN_PREFILTER=True
+        ):
+            scancode.scan_for_files(project1)
+
+        scanners = mock_scan.call_args[0][1]
+        self.assertEqual(["copyrights", "licenses"], [s.name for s in scanners])
+        resource1.refresh_from_db()
+        self.assertEqual("scanned", resource1.status)
+        self.assertEqual(["copy"], resource1.copyrights)
+        self.assertEqual(["copyrights", "licenses"], resource1.extra_data["scanners"])
+
+    def test_scanpipe_pipes_scancode_scan_scheduler_bounded_window(self):
+        def scan_func(location, with_threading):
+            return {"location": location}, []
+
+        scan_tasks = (scancode.ScanTask(pk, f"location{pk}", "") for pk in range(50))
+        scheduler = scancode.ScanScheduler(
+            scan_func, scan_tasks, max_workers=0, max_in_flight=3
+        )
+
+        batch_sizes = []
+        completed_pks = []
+        for completed in scheduler:
+            batch_sizes.append(len(completed))
+            for scan_task, scan_results, _ in completed:
+                self.assertEqual(f"location{scan_task.pk}", scan_results["location"])
+                completed_pks.append(scan_task.pk)
+
+        self.assertEqual([3] * 16 + [2], batch_sizes)
+        self.assertEqual(list(range(50)), sorted(completed_pks))
+
+    @mock.patch("scanpipe.pipes.scancode.get_license_cache")
+    def test_scanpipe_pipes_scancode_scan_scheduler_supervision(self, mock_cache):
+        self.addCleanup(scancode.shutdown_scan_pool)
+        locations = ["file1", "crash", "file2", "hang", "file3", "file4"]
+        scan_tasks = [
+            scancode.ScanTask(pk, loc, "") for pk, loc in enumerate(locations)
+        ]
+        scheduler = scancode.ScanScheduler(
+            supervised_scan_func,
+            scan_tasks,
+            max_workers=2,
+            max_in_flight=4,
+            timeout=2,
+            max_tasks_per_worker=2,
+        )
+
+        results = {}
+        for completed in scheduler:
+            for scan_task, scan_results, scan_errors in completed:
+                results[scan_task.location] = scan_results, scan_errors
+
+        self.assertEqual(sorted(locations), sorted(results))
+        for location in ["file1", "file2", "file3", "file4"]:
+            self.assertEqual(({"location": location}, []), results[location])
+
+        expected = ({}, [scancode.ScanScheduler.crash_error])
+        self.assertEqual(expected, results["crash"])
+        expected_error = "ERROR: Processing interrupted: timeout after 2 seconds."
+        self.assertEqual(({}, [expected_error]), results["hang"])
+
+    @mock.patch("scanpipe.pipes.scancode.get_license_cache")
+    def test_scanpipe_pipes_scancode_scan_scheduler_timeout_queued_tasks(self, _):
+        self.addCleanup(scancode.shutdown_scan_pool)
+        # The tasks waiting for the single worker are not timed out.
+        locations = ["slow1", "slow2", "slow3"]
+        scan_tasks = [
+            scancode.ScanTask(pk, loc, "") for pk, loc in enumerate(locations)
+        ]
+        scheduler = scancode.ScanScheduler(
+            supervised_scan_func,
+            scan_tasks,
+            max_workers=1,
+            max_in_flight=3,
+            timeout=2,
+        )
+
+        results = {}
+        for completed in scheduler:
+            for scan_task, scan_results, scan_errors in completed:
+                results[scan_task.location] = scan_results, scan_errors
+
+        for location in locations:
+            self.assertEqual(({"location": location}, []), results[location])
+
+    @mock.patch("scanpipe.pipes.scancode.get_license_cache")
+    def test_scanpipe_pipes_scancode_scan_scheduler_started_tasks(self, _):
+        self.addCleanup(scancode.shutdown_scan_pool)
+        locations = ["file1", "file2", "file3", "file4", "file5"]
+        scan_tasks = [
+            scancode.ScanTask(pk, loc, "") for pk, loc in enumerate(locations)
+        ]
+        previous_scheduler = scancode.ScanScheduler(
+            supervised_scan_func, [], max_workers=1, max_in_flight=2
+        )
+        scheduler = scancode.ScanScheduler(
+            supervised_scan_func,
+            scan_tasks,
+            max_workers=1,
+            max_in_flight=2,
+            timeout=2,
+        )
+        self.assertNotEqual(previous_scheduler.scheduler_id, scheduler.scheduler_id)
+
+        # A late start message of a previous scheduler task, with a pid above the
+        # maximum pid, is not attributed to a task of this scheduler.
+        stale_task_id = (previous_scheduler.scheduler_id, 0)
+        start_queue = scancode.get_task_start_queue()
+        start_queue.put((stale_task_id, 2**22 + 1, 0))
+
+        results = {}
+        for completed in scheduler:
+            # Only the start of the pending tasks is kept.
+            pending_task_ids = [task_id for task_id, *_ in scheduler.pending.values()]
+            for task_id in scheduler.started:
+                self.assertIn(task_id, pending_task_ids)
+            for scan_task, scan_results, scan_errors in completed:
+                results[scan_task.location] = scan_results, scan_errors
+
+        for location in locations:
+            self.assertEqual(({"location": location}, []), results[location])
+
+    def test_scanpipe_pipes_cache_file_system_cache(self):
+        cache_location = Path(tempfile.mkdtemp())
+        cache = FileSystemCache(cache_location, max_size=30)
+
+        key1 = get_cache_key("sha1", "version")
+        self.assertEqual(64, len(key1))
+        self.assertEqual(key1, get_cache_key("sha1", "version"))
+        self.assertNotEqual(key1, get_cache_key("sha1", "other"))
+
+        self.assertIsNone(cache.get(key1))
+        cache.set(key1, {"copyrights": ["c"]})
+        self.assertEqual({"copyrights": ["c"]}, cache.get(key1))
+        self.assertEqual("1 hits, 1 misses (50.0% hit ratio)", cache.get_stats())
+
+        # The size of an overwritten entry is not counted twice.
+        cache.set(key1, {"copyrights": ["c"]})
+        self.assertEqual(20, cache.size)
+
+        # The oldest entries are evicted once the max_size is reached.
+        key2 = get_cache_key("sha1-2")
+        os.utime(cache.get_path(key1), (0, 0))
+        cache.set(key2, {"copyrights": ["c"]})
+        self.assertIsNone(cache.get(key1))
+        self.assertEqual({"copyrights": ["c"]}, cache.get(key2))
+        self.assertEqual(1, len(list(cache.entries())))
+        self.assertEqual(20, cache.size)
+
+        # The entries are evicted down to the eviction_ratio of the max_size.
+        cache = FileSystemCache(tempfile.mkdtemp(), max_size=100)
+        for index in range(6):
+            cache.set(get_cache_key(index), {"copyrights": ["c"]})
+        self.assertEqual(4, len(list(cache.entries())))
+        self.assertEqual(80, cache.size)
+
+    @mock.patch("scanpipe.pipes.scancode._scan_resource")
+    def test_scanpipe_pipes_scancode_scan_for_files_with_cache(self, mock_scan):
+        mock_scan.return_value = {"license_expressions": ["mit"]}, []
+        project1 = Project.objects.create(name="Analysis")
+        sha1 = "51d28a27d919ce8690a40f4f335b9d591ceb16e9"
+        CodebaseResource.objects.create(project=project1, path="file1", sha1=sha1)
+
+        cache_location = tempfile.mkdtemp()
+        progress_logger = mock.Mock()
+        with mock.patch.multiple(
+            scancode,
+            SCANCODEIO_PROCESSES=-1,
+            SCANCODEIO_SCAN_CACHE_LOCATION=cache_location,
+        ):
+            scancode.scan_for_files(project1, progress_logger)
+            progress_logger.assert_called_with(
+                "Scan results cache: 0 hits, 1 misses (0.0% hit ratio)"
+            )
+            self.assertEqual(1, mock_scan.call_count)
+
+            project2 = Project.objects.create(name="Analysis2")
+            resource2 = CodebaseResource.objects.create(
+                project=project2, path="file1", sha1=sha1
+            )
+            scancode.scan_for_files(project2, progress_logger)
+            progress_logger.assert_called_with(
+                "Scan results cache: 1 hits, 0 misses (100.0% hit ratio)"
+            )
+            self.assertEqual(1, mock_scan.call_count)
+
+        resource2.refresh_from_db()
+        self.assertEqual("scanned", resource2.status)
+        self.assertEqual(["mit"], resource2.license_expressions)
+
+    @mock.patch("scanpipe.pipes.scancode._scan_resource")
+    def test_scanpipe_pipes_scancode_scan_for_files_duplicates(self, mock_scan):
+        mock_scan.return_value = {"license_expressions": ["mit"]}, []
+        project1 = Project.objects.create(name="Analysis")
+        sha1 = "51d28a27d919ce8690a40f4f335b9d591ceb16e9"
+        resources = [
+            CodebaseResource.objects.create(
+                project=project1, path=f"dir{index}/file", sha1=sha1, size=10
+            )
+            for index in range(3)
+        ]
+        resource4 = CodebaseResource.objects.create(
+            project=project1, path="dir4/file", sha1=sha1, size=20
+        )
+
+        queryset = scancode.exclude_duplicates(project1.codebaseresources.all())
+        self.assertEqual([resources[0], resource4], list(queryset.order_by("pk")))
+
+        with mock.patch("scanpipe.pipes.scancode.SCANCODEIO_PROCESSES", -1):
+            scancode.scan_for_files(project1)
+
+        self.assertEqual(2, mock_scan.call_count)
+        for resource in [*resources, resource4]:
+            resource.refresh_from_db()
+            self.assertEqual("scanned", resource.status)
+            self.assertEqual(["mit"], resource.license_expressions)
+
+    @mock.patch("scanpipe.pipes.scancode.get_license_cache")
+    def test_scanpipe_pipes_scancode_get_scan_pool(self, mock_get_license_cache):
+        scan_pool = scancode.get_scan_pool(max_workers=2)
+        self.addCleanup(scancode.shutdown_scan_pool)
+        # The license index is loaded in the parent process before forking
+        mock_get_license_cache.assert_called_once()
+
+        self.assertIs(scan_pool, scancode.get_scan_pool(max_workers=2))
+        self.assertEqual(1, mock_get_license_cache.call_count)
+
+        other_scan_pool = scancode.get_scan_pool(max_workers=1)
+        self.assertIsNot(scan_pool, other_scan_pool)
+
+        scancode.shutdown_scan_pool()
+        self.assertIsNot(other_scan_pool, scancode.get_scan_pool(max_workers=1))
+
+    def test_scanpipe_pipes_scancode_get_pk_ranges(self):
+        project1 = Project.objects.create(name="Analysis")
+        resources = [
+            CodebaseResource.objects.create(project=project1, path=f"file{index}")
+            for index in range(5)
+        ]
+        queryset = project1.codebaseresources.all()
+
+        self.assertEqual([], scancode.get_pk_ranges(queryset.none(), 2))
+        expected = [
+            (resources[0].pk, resources[2].pk),
+            (resources[3].pk, resources[4].pk),
+        ]
+        self.assertEqual(expected, scancode.get_pk_ranges(queryset, 2))
+        self.assertEqual(5, len(scancode.get_pk_ranges(queryset, 10)))
+
+    @mock.patch("scanpipe.pipes.scancode._scan_resource")
+    def test_scanpipe_pipes_scancode_scan_for_files_in_shards(self, mock_scan):
+        mock_scan.return_value = {"license_expressions": ["mit"]}, []
+        project1 = Project.objects.create(name="Analysis")
+        for index in range(5):
+            CodebaseResource.objects.create(
+                project=project1, path=f"file{index}", sha1="sha1", size=1
+            )
+        CodebaseResource.objects.create(project=project1, path="file5")
+
+        progress_logger = mock.Mock()
+        with mock.patch.multiple(
+            scancode, SCANCODEIO_PROCESSES=-1, SCANCODEIO_SCAN_SHARDS=3
+        ):
+            # The shards are not executed in the calling task.
+            with self.assertRaises(PipelineSuspended) as cm:
+                scancode.scan_for_files(project1, progress_logger)
+            self.assertEqual(6, project1.codebaseresources.no_status().count())
+            cm.exception.canvas.apply()
+
+        progress_logger.assert_any_call("Distribute scan_for_files in 3 shards")
+        # The duplicates are coalesced within each shard
+        self.assertLess(mock_scan.call_count, 6)
+        self.assertEqual(6, project1.codebaseresources.status("scanned").count())
+
     def test_scanpipe_pipes_scancode_virtual_codebase(self):
         project = Project.objects.create(name="asgiref")
         input_location = self.data_location / "asgiref-3.3.0_scan.json"
@@ -468,6 +912,207 @@ class ScanPipePipesTest(TestCase):
         self.assertEqual(18, CodebaseResource.objects.count())
         self.assertEqual(1, DiscoveredPackage.objects.count())
 
+    def test_scanpipe_pipes_scancode_create_inventory_from_scan(self):
+        project = Project.objects.create(name="asgiref")
+        input_location = self.data_location / "asgiref-3.3.0_scan.json"
+        virtual_codebase = scancode.get_virtual_codebase(project, input_location)
+
+        with mock.patch("scanpipe.pipes.scancode.SCANCODEIO_SCAN_BATCH_SIZE", 5):
+            scancode.create_inventory_from_scan(project, virtual_codebase)
+
+        self.assertEqual(18, project.codebaseresources.count())
+        package = project.discoveredpackages.get()
+        package_resource = package.codebase_resources.get()
+        self.assertEqual("asgiref-3.3.0-py3-none-any.whl", package_resource.path)
+        self.assertEqual("application-package", package_resource.status)
+
+        # Existing objects are skipped
+        scancode.create_inventory_from_scan(project, virtual_codebase)
+        self.assertEqual(18, project.codebaseresources.count())
+        self.assertEqual(1, project.discoveredpackages.count())
+        self.assertEqual(1, package.codebase_resources.count())
+
+    def test_scanpipe_pipes_scancode_streamed_codebase(self):
+        input_location = self.data_location / "asgiref-3.3.0_scan.json"
+
+        project1 = Project.objects.create(name="virtual")
+        virtual_codebase = scancode.get_virtual_codebase(project1, input_location)
+        scancode.create_inventory_from_scan(project1, virtual_codebase)
+
+        project2 = Project.objects.create(name="streamed")
+        streamed_codebase = scancode.get_streamed_codebase(project2, input_location)
+        self.assertEqual(19, len(list(streamed_codebase.walk())))
+        # The root path is derived from the first entry of the scan.
+        self.assertEqual("codebase", streamed_codebase.root_path)
+        scancode.create_inventory_from_scan(project2, streamed_codebase)
+
+        def get_values(project):
+            resources = project.codebaseresources.order_by("path")
+            return list(resources.values_list("path", "type", "status", "sha1"))
+
+        self.assertEqual(18, project2.codebaseresources.count())
+        self.assertEqual(get_values(project1), get_values(project2))
+
+        package1 = project1.discoveredpackages.get()
+        package2 = project2.discoveredpackages.get()
+        self.assertEqual(package1.package_url, package2.package_url)
+        self.assertEqual(
+            list(package1.codebase_resources.values_list("path", flat=True)),
+            list(package2.codebase_resources.values_list("path", flat=True)),
+        )
+
+        resource = streamed_codebase.get_resource("asgiref-3.3.0-py3-none-any.whl")
+        self.assertTrue(resource.is_file)
+        self.assertEqual(streamed_codebase.root, resource.parent(streamed_codebase))
+        self.assertEqual(
+            [streamed_codebase.root, resource], resource.ancestors(streamed_codebase)
+        )
+        root_children = streamed_codebase.root.children(streamed_codebase)
+        self.assertEqual(
+            [
+                "asgiref-3.3.0-py3-none-any.whl",
+                "asgiref-3.3.0-py3-none-any.whl-extract",
+            ],
+            [child.path for child in root_children],
+        )
+        self.assertEqual(18, len(list(streamed_codebase.root.walk(streamed_codebase))))
+        self.assertIsNone(streamed_codebase.get_resource("missing"))
+
+    def test_scanpipe_pipes_scancode_streamed_codebase_root_path(self):
+        def get_paths(options, files):
+            scan_data = {"headers": [{"options": options}], "files": files}
+            with tempfile.NamedTemporaryFile(mode="w", suffix=".json") as temp_file:
+                json.dump(scan_data, temp_file)
+                temp_file.flush()
+                project = Project.objects.create(name=temp_file.name)
+                virtual_codebase = scancode.get_virtual_codebase(
+                    project, temp_file.name
+                )
+                streamed_codebase = scancode.get_streamed_codebase(
+                    project, temp_file.name
+                )
+                virtual_paths = [
+                    resource.get_path(strip_root=True)
+                    for resource in virtual_codebase.walk(skip_root=True)
+                ]
+                streamed_paths = [
+                    resource.path for resource in streamed_codebase.walk(skip_root=True)
+                ]
+                scancode.create_inventory_from_scan(project, streamed_codebase)
+            self.assertEqual(sorted(virtual_paths), sorted(streamed_paths))
+            resources = project.codebaseresources.order_by("path")
+            self.assertEqual(
+                sorted(virtual_paths), list(resources.values_list("path", flat=True))
+            )
+            return streamed_codebase.root_path, streamed_paths
+
+        files = [
+            {"path": "codebase", "type": "directory"},
+            {"path": "codebase/a.txt", "type": "file"},
+        ]
+        root_path, paths = get_paths({"input": ["codebase"]}, files)
+        self.assertEqual("codebase", root_path)
+        self.assertEqual(["a.txt"], paths)
+
+        files = [
+            {"path": "docs", "type": "directory"},
+            {"path": "docs/a.txt", "type": "file"},
+            {"path": "setup.py", "type": "file"},
+        ]
+        options = {"input": ["codebase"], "--strip-root": True}
+        root_path, paths = get_paths(options, files)
+        self.assertEqual("", root_path)
+        self.assertEqual(["docs", "docs/a.txt", "setup.py"], paths)
+
+        files = [
+            {"path": "home/u/p", "type": "directory"},
+            {"path": "home/u/p/a.txt", "type": "file"},
+        ]
+        options = {"input": ["/home/u/p"], "--full-root": True}
+        root_path, paths = get_paths(options, files)
+        self.assertEqual("home", root_path)
+        self.assertEqual(["u", "u/p", "u/p/a.txt"], paths)
+
+        files = [
+            {"path": "docs", "type": "directory"},
+            {"path": "docs/a.txt", "type": "file"},
+        ]
+        options = {"input": ["codebase"], "--strip-root": True}
+        root_path, paths = get_paths(options, files)
+        self.assertEqual("docs", root_path)
+        self.assertEqual(["a.txt"], paths)
+
+    def test_scanpipe_pipes_scancode_get_scan_root_path(self):
+        input_location = self.data_location / "asgiref-3.3.0_scan.json"
+        self.assertEqual("codebase", scancode.get_scan_root_path(input_location))
+
+        self.assertTrue(scancode.has_single_root([{"options": {"input": ["a"]}}]))
+        self.assertFalse(scancode.has_single_root([]))
+        headers = [{"options": {"input": ["a"], "--strip-root": True}}]
+        self.assertFalse(scancode.has_single_root(headers))
+        self.assertFalse(scancode.has_single_root([{"options": {"input": ["a", "b"]}}]))
+
+    def test_scanpipe_pipes_lock_project_packages(self):
+        project = Project.objects.create(name="Analysis")
+        advisory_locks = "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory'"
+
+        def get_locks_count():
+            with connection.cursor() as cursor:
+                cursor.execute(advisory_locks)
+                return cursor.fetchone()[0]
+
+        with lock_project_packages(project):
+            self.assertEqual(1, get_locks_count())
+        self.assertEqual(0, get_locks_count())
+
+    def test_scanpipe_pipes_update_or_create_packages(self):
+        project = Project.objects.create(name="Analysis")
+        existing = update_or_create_package(
+            project, {**package_data1, "homepage_url": ""}
+        )
+        purl1 = "pkg:deb/debian/adduser@3.118?arch=all"
+        self.assertEqual(purl1, get_package_purl(package_data1))
+
+        packages_data = [
+            {**package_data1, "homepage_url": "https://example.com"},
+            {"type": "npm", "name": "is-npm", "version": "1.0.0"},
+            {"type": "npm", "name": "is-npm", "version": "1.0.0", "md5": "abc"},
+            {"name": "no-type"},
+            {},
+        ]
+        # Including the lock and unlock of the project packages, and the error count
+        # update of the package without a Package URL.
+        with self.assertNumQueries(9):
+            pks_by_purl = update_or_create_packages(project, packages_data)
+
+        purl2 = "pkg:npm/is-npm@1.0.0"
+        self.assertEqual([purl1, purl2], list(pks_by_purl.keys()))
+        self.assertEqual(existing.pk, pks_by_purl[purl1])
+
+        existing.refresh_from_db()
+        self.assertEqual("https://example.com", existing.homepage_url)
+        package2 = project.discoveredpackages.get(pk=pks_by_purl[purl2])
+        self.assertEqual("abc", package2.md5)
+        self.assertEqual(2, project.discoveredpackages.count())
+
+        error = project.projecterrors.get()
+        self.assertEqual("Package without a valid Package URL", error.message)
+
+        # Existing packages are reused
+        pks_by_purl = update_or_create_packages(project, packages_data[:2])
+        self.assertEqual([existing.pk, package2.pk], list(pks_by_purl.values()))
+        self.assertEqual(2, project.discoveredpackages.count())
+
+    def test_scanpipe_pipes_scancode_get_resource_pks_by_path(self):
+        project = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(project=project, path="a")
+        resource2 = CodebaseResource.objects.create(project=project, path="b")
+
+        pks_by_path = scancode.get_resource_pks_by_path(
+            project, ["a", "b", "c"], batch_size=1
+        )
+        self.assertEqual({"a": resource1.pk, "b": resource2.pk}, pks_by_path)
+
     def test_scanpipe_pipes_scancode_create_codebase_resources_inject_policy(self):
         project = Project.objects.create(name="asgiref")
         input_location = self.data_location / "asgiref-3.3.0_scan.json"
@@ -515,6 +1160,36 @@ class ScanPipePipesTest(TestCase):
         summary = scancode.make_results_summary(project, scan_results_location)
         self.assertEqual(10, len(summary.keys()))
 
+    def test_scanpipe_pipes_jsonstream_reader(self):
+        input_location = self.data_location / "is-npm-1.0.0_scancode.json"
+        scan_data = json.loads(input_location.read_text())
+
+        with jsonstream.JSONStreamReader(input_location, chunk_size=8) as reader:
+            entries = {
+                key: list(value) if key == "files" else value
+                for key, value in reader.items(stream_keys=["files"])
+            }
+        self.assertEqual(scan_data, entries)
+
+        files = list(jsonstream.iter_array_items(input_location, "files"))
+        self.assertEqual(scan_data["files"], files)
+
+        keys = ["summary", "license_clarity_score", "missing"]
+        values = jsonstream.get_values(input_location, keys, stream_keys=["files"])
+        self.assertEqual(["summary", "license_clarity_score"], list(values.keys()))
+        self.assertEqual(scan_data["summary"], values["summary"])
+
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".json") as temp_file:
+            temp_file.write('{"number": 1234567, "files": [], "values": [1, true]}')
+            temp_file.flush()
+            with jsonstream.JSONStreamReader(temp_file.name, chunk_size=1) as reader:
+                entries = [
+                    (key, list(value) if key == "files" else value)
+                    for key, value in reader.items(stream_keys=["files"])
+                ]
+        expected = [("number", 1234567), ("files", []), ("values", [1, True])]
+        self.assertEqual(expected, entries)
+
     def test_scanpipe_pipes_codebase_get_tree(self):
         fixtures = self.data_location / "asgiref-3.3.0_fixtures.json"
         call_command("loaddata", fixtures, **{"verbosity": 0})
@@ -536,6 +1211,18 @@ class ScanPipePipesTest(TestCase):
         self.assertEqual(expected, project_tree)
         self.assertEqual(expected, virtual_tree)
 
+    def test_scanpipe_pipes_codebase_get_resource_tree(self):
+        fixtures = self.data_location / "asgiref-3.3.0_fixtures.json"
+        call_command("loaddata", fixtures, **{"verbosity": 0})
+        project = Project.objects.get(name="asgiref")
+        root = codebase.ProjectCodebase(project).root
+
+        fields = ["name", "path"]
+        with self.assertNumQueries(1):
+            resource_tree = codebase.get_resource_tree(root, fields)
+
+        self.assertEqual(codebase.get_tree(root, fields), resource_tree)
+
     def test_scanpipe_pipes_codebase_project_codebase_class_no_resources(self):
         project = Project.objects.create(name="project")
 
@@ -744,6 +1431,246 @@ class ScanPipePipesTest(TestCase):
         self.assertEqual("", resource1.status)
         self.assertEqual("ignored-not-interesting", resource2.status)
 
+    def test_scanpipe_pipes_rootfs_scan_rootfs_for_system_packages(self):
+        p1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(
+            project=p1, path="/rootfs1/bin/adduser", rootfs_path="/bin/adduser", md5="a"
+        )
+        resource2 = CodebaseResource.objects.create(
+            project=p1,
+            path="/rootfs1/etc/adduser.conf",
+            rootfs_path="/etc/adduser.conf",
+        )
+        CodebaseResource.objects.create(
+            project=p1,
+            path="/rootfs2/etc/deluser.conf",
+            rootfs_path="/etc/deluser.conf",
+        )
+
+        rfs = mock.Mock(
+            location=str(p1.codebase_path / "rootfs1"),
+            distro=mock.Mock(identifier="debian"),
+        )
+        resources_by_rootfs_path = rootfs.get_resources_by_rootfs_path(p1, rfs)
+        self.assertEqual(
+            ["/bin/adduser", "/etc/adduser.conf"], sorted(resources_by_rootfs_path)
+        )
+        self.assertEqual(resource1.pk, resources_by_rootfs_path["/bin/adduser"][0].pk)
+
+        hashes = dict(md5="", sha1="", sha256="", sha512="")
+        installed_files = [
+            mock.Mock(path="/bin/adduser", **{**hashes, "md5": "b"}),
+            mock.Mock(path="etc/adduser.conf", **hashes),
+            mock.Mock(path="/etc/deluser.conf", **hashes),
+        ]
+        package = mock.Mock(installed_files=installed_files)
+        package.to_dict.return_value = package_data1
+        rfs.get_installed_packages.side_effect = lambda getter: getter(rfs.location)
+
+        package_getter = mock.Mock(return_value=[("purl", package)])
+        license_detector = mock.Mock()
+        getters = {"debian": package_getter}
+        detectors = {"debian": license_detector}
+        with mock.patch.dict(rootfs.PACKAGE_GETTER_BY_DISTRO, getters):
+            with mock.patch.dict(rootfs.LICENSE_DETECTOR_BY_DISTRO, detectors):
+                with self.assertNumQueries(12):
+                    rootfs.scan_rootfs_for_system_packages(p1, rfs)
+
+        package_getter.assert_called_once_with(
+            rfs.location, distro="debian", detect_licenses=False
+        )
+        license_detector.assert_called_once_with([(package, rfs.location)])
+
+        discovered_package = p1.discoveredpackages.get()
+        self.assertEqual(["/etc/deluser.conf"], discovered_package.missing_resources)
+        self.assertEqual(["/bin/adduser"], discovered_package.modified_resources)
+        self.assertEqual(
+            [resource1, resource2],
+            list(discovered_package.codebase_resources.order_by("path")),
+        )
+        resource1.refresh_from_db()
+        self.assertEqual("system-package", resource1.status)
+
+        # Existing relations and missing files are kept on a second run
+        with mock.patch.dict(rootfs.PACKAGE_GETTER_BY_DISTRO, getters):
+            rootfs.scan_rootfs_for_system_packages(p1, rfs, detect_licenses=False)
+        discovered_package.refresh_from_db()
+        self.assertEqual(["/etc/deluser.conf"], discovered_package.missing_resources)
+        self.assertEqual(2, discovered_package.codebase_resources.count())
+
+    def test_scanpipe_pipes_rootfs_cached_package_getter(self):
+        root_dir = Path(tempfile.mkdtemp())
+        self.assertIsNone(rootfs.get_package_db_checksum(root_dir, "alpine"))
+
+        installed_db = root_dir / "lib/apk/db/installed"
+        installed_db.parent.mkdir(parents=True)
+        installed_db.write_text(
+            "P:musl\nV:1.2.2-r0\nA:x86_64\nL:MIT\nF:lib\nR:ld-musl-x86_64.so.1\n\n"
+        )
+        self.assertTrue(rootfs.get_package_db_checksum(root_dir, "alpine"))
+
+        cache = FileSystemCache(tempfile.mkdtemp(), max_size=1024 * 1024)
+        package_getter = rootfs.CachedPackageGetter("alpine", cache=cache)
+        installed_packages = package_getter(str(root_dir))
+        self.assertEqual(1, len(package_getter.pending))
+        package_getter.detect_licenses(installed_packages)
+        self.assertEqual([], package_getter.pending)
+        self.assertEqual((0, 1), (cache.hits, cache.misses))
+
+        package_getter = rootfs.CachedPackageGetter("alpine", cache=cache)
+        cached_packages = package_getter(str(root_dir))
+        self.assertEqual([], package_getter.pending)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+        (purl, package), (cached_purl, cached_package) = (
+            installed_packages[0],
+            cached_packages[0],
+        )
+        self.assertEqual("pkg:alpine/musl@1.2.2-r0?arch=x86_64", cached_purl)
+        self.assertEqual(purl, cached_purl)
+        self.assertEqual(type(package), type(cached_package))
+        self.assertEqual(package.to_dict(), cached_package.to_dict())
+        self.assertEqual(
+            ["lib/ld-musl-x86_64.so.1"],
+            [installed_file.path for installed_file in cached_package.installed_files],
+        )
+
+        # The cache key depends on the package database content
+        installed_db.write_text(installed_db.read_text().replace("1.2.2", "1.2.3"))
+        package_getter = rootfs.CachedPackageGetter("alpine", cache=cache)
+        package_getter(str(root_dir))
+        self.assertEqual(1, len(package_getter.pending))
+
+        # Without cache, only the installed packages are detected, by purl.
+        package_getter = rootfs.CachedPackageGetter("alpine")
+        package_getter.license_detector = mock.Mock()
+        package1, package2 = mock.Mock(), mock.Mock()
+        package_getter.package_getter = mock.Mock(
+            return_value=[("pkg:alpine/a", package1), ("pkg:alpine/b", package2)]
+        )
+        package_getter("root1")
+        package_getter.detect_licenses([("pkg:alpine/b", mock.Mock())])
+        package_getter.license_detector.assert_called_once_with([(package2, "root1")])
+
+    def test_scanpipe_pipes_rootfs_cached_package_getter_layers_duplicates(self):
+        package_getter = rootfs.CachedPackageGetter("alpine")
+        package_getter.license_detector = mock.Mock()
+        package1, package2, package3 = mock.Mock(), mock.Mock(), mock.Mock()
+        packages_by_root_dir = {
+            "layer1": [("pkg:alpine/a", package1)],
+            "layer2": [("pkg:alpine/a", package2), ("pkg:alpine/b", package3)],
+        }
+        package_getter.package_getter = packages_by_root_dir.get
+
+        # The same purl installed in two layers is only detected in the first one,
+        # the layer reported by `Image.get_installed_packages`.
+        package_getter("layer1")
+        package_getter("layer2")
+        installed_packages = [("pkg:alpine/a", package1), ("pkg:alpine/b", package3)]
+        package_getter.detect_licenses(installed_packages)
+        expected = [(package1, "layer1"), (package3, "layer2")]
+        package_getter.license_detector.assert_called_once_with(expected)
+
+    def test_scanpipe_pipes_docker_scan_image_for_system_packages(self):
+        p1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(
+            project=p1,
+            path="/image1/layer1/bin/adduser",
+            rootfs_path="/bin/adduser",
+            layer_id="layer1",
+        )
+        resource2 = CodebaseResource.objects.create(
+            project=p1,
+            path="/image2/layer1/bin/adduser",
+            rootfs_path="/bin/adduser",
+            layer_id="layer1",
+        )
+        CodebaseResource.objects.create(
+            project=p1,
+            path="/image1/layer2/bin/adduser",
+            rootfs_path="/bin/adduser",
+            layer_id="layer2",
+        )
+
+        layer1 = mock.Mock(layer_id="layer1")
+        image = mock.Mock(layers=[layer1], distro=mock.Mock(identifier="debian"))
+        resources_by_layer = docker.get_resources_by_layer(p1, image)
+        self.assertEqual(["layer1"], list(resources_by_layer.keys()))
+        self.assertEqual(2, len(resources_by_layer["layer1"]["/bin/adduser"]))
+
+        install_file = mock.Mock(path="/bin/adduser", md5="", sha1="")
+        install_file.sha256 = install_file.sha512 = ""
+        package = mock.Mock(installed_files=[install_file])
+        package.to_dict.return_value = package_data1
+        image.get_installed_packages.return_value = [("purl", package, layer1)]
+
+        docker.scan_image_for_system_packages(p1, image, detect_licenses=False)
+        discovered_package = p1.discoveredpackages.get()
+        self.assertEqual(
+            [resource1, resource2],
+            list(discovered_package.codebase_resources.order_by("path")),
+        )
+        self.assertEqual([], discovered_package.missing_resources)
+
+    def test_scanpipe_pipes_debian_detect_licenses(self):
+        root_dir = Path(tempfile.mkdtemp())
+        copyright_location = root_dir / "usr/share/doc/foo/copyright"
+        copyright_location.parent.mkdir(parents=True)
+        copyright_location.write_text(
+            "Format: https://www.debian.org/doc/packaging-manuals/copyright-format/1.0/"
+            "\n\nFiles: *\nCopyright: 2021 Foo Inc.\nLicense: Apache-2.0\n"
+        )
+        package1 = debian_packagedcode.DebianPackage(name="foo")
+        package2 = debian_packagedcode.DebianPackage(name="bar")
+
+        debian.detect_licenses([(package1, str(root_dir)), (package2, str(root_dir))])
+        self.assertEqual("apache-2.0", package1.license_expression)
+        self.assertIn("Foo Inc.", package1.copyright)
+        self.assertIsNone(package2.license_expression)
+
+    def test_scanpipe_pipes_rpm_detect_licenses(self):
+        package1 = mock.Mock(declared_license="MIT")
+        package2 = mock.Mock(declared_license=None)
+        rpm.detect_licenses([(package1, "root1"), (package2, "root1")])
+        self.assertEqual("mit", package1.license_expression)
+        self.assertIsNone(package2.license_expression)
+
+    def test_scanpipe_pipes_rootfs_match_not_analyzed(self):
+        p1 = Project.objects.create(name="Analysis")
+        package = DiscoveredPackage.create_from_data(p1, package_data1)
+        reference = CodebaseResource.objects.create(
+            project=p1, path="reference", status="system-package", md5="a", size=1
+        )
+        reference.discovered_packages.add(package)
+        CodebaseResource.objects.create(
+            project=p1, path="no-package", status="system-package", md5="b", size=1
+        )
+        resource1 = CodebaseResource.objects.create(
+            project=p1, path="1", md5="a", size=1
+        )
+        resource2 = CodebaseResource.objects.create(
+            project=p1, path="2", md5="a", size=2
+        )
+        resource3 = CodebaseResource.objects.create(
+            project=p1, path="3", md5="b", size=1
+        )
+
+        with self.assertNumQueries(2):
+            matched_count = rootfs.match_not_analyzed(
+                p1, reference_status="system-package", not_analyzed_status=""
+            )
+
+        self.assertEqual(1, matched_count)
+        resource1.refresh_from_db()
+        self.assertEqual("system-package", resource1.status)
+        self.assertEqual([package], list(resource1.discovered_packages.all()))
+        for resource in [resource2, resource3]:
+            resource.refresh_from_db()
+            self.assertEqual("", resource.status)
+            self.assertFalse(resource.discovered_packages.exists())
+
+        self.assertEqual(0, rootfs.match_not_analyzed(p1, "system-package", ""))
+
     def test_scanpipe_pipes_rootfs_has_hash_diff(self):
         install_file = mock.Mock(sha256="else", md5="md5")
         codebase_resource = CodebaseResource(sha256="sha256", md5="md5")
@@ -985,6 +1912,41 @@ class ScanPipePipesTest(TestCase):
         self.assertEqual("", resource5.status)
         self.assertEqual("", resource6.status)
 
+    def test_scanpipe_pipes_windows_tag_software_roots(self):
+        p1 = Project.objects.create(name="Analysis")
+        paths = [
+            "/Python/py.exe",
+            "/Python27/python2.exe",
+            "/Python27/Lib/site-packages/six.py",
+            "/Program Files/7Zip/7z.exe",
+            "/Program Files/Microsoft/example.exe",
+            "/jdk-11.0.1/readme.txt",
+        ]
+        for path in paths:
+            CodebaseResource.objects.create(project=p1, path=path, rootfs_path=path)
+
+        known_software = [*windows.KNOWN_SOFTWARE, windows.PROGRAM_FILES_SOFTWARE]
+        with self.assertNumQueries(12):
+            windows.tag_software_roots(p1, known_software)
+
+        packages_by_path = {
+            resource.rootfs_path: [
+                str(package) for package in resource.discovered_packages.all()
+            ]
+            for resource in p1.codebaseresources.all()
+        }
+        expected = {
+            "/Python/py.exe": ["pkg:windows-program/Python@nv"],
+            "/Python27/python2.exe": ["pkg:windows-program/Python@2.7"],
+            "/Python27/Lib/site-packages/six.py": [],
+            "/Program Files/7Zip/7z.exe": ["pkg:windows-program/7Zip@nv"],
+            "/Program Files/Microsoft/example.exe": [],
+            "/jdk-11.0.1/readme.txt": ["pkg:windows-program/OpenJDK@11.0.1"],
+        }
+        self.assertEqual(expected, packages_by_path)
+        self.assertEqual(4, p1.codebaseresources.status("installed-package").count())
+        self.assertEqual(4, p1.discoveredpackages.count())
+
     def test_scanpipe_pipes_rootfs_tag_ignorable_codebase_resources(self):
         p1 = Project.objects.create(name="Analysis")
         resource1 = CodebaseResource.objects.create(
@@ -1020,6 +1982,86 @@ class ScanPipePipesTest(TestCase):
         self.assertEqual("ignored-default-ignores", resource4.status)
         self.assertEqual("", resource5.status)
 
+    def test_scanpipe_pipes_tagging_rule_matcher(self):
+        rules = [
+            tagging.Rule("whiteout", "name", "startswith", (".wh.",)),
+            tagging.Rule("transient", "rootfs_path", "startswith", ("/tmp/", "/t")),
+            tagging.Rule("registry", "rootfs_path", "iendswith", ("NTUSER.DAT",)),
+            tagging.Rule("log", "extension", "icontains", (".log",)),
+            tagging.Rule("pyc", "rootfs_path", "iregex", (r"(?s:.*\.pyc)\Z",)),
+            tagging.Rule("media", "is_media", "exact", (True,)),
+        ]
+        matcher = tagging.RuleMatcher(rules)
+        self.assertEqual(
+            ["extension", "is_media", "name", "rootfs_path"], matcher.fields
+        )
+
+        def match(**values):
+            return matcher.match(values)
+
+        self.assertEqual("whiteout", match(name=".wh.file", rootfs_path="/tmp/x"))
+        self.assertEqual("transient", match(name="x", rootfs_path="/tmp/x"))
+        self.assertEqual("transient", match(rootfs_path="/t"))
+        self.assertEqual("registry", match(rootfs_path="/Users/a/ntuser.dat"))
+        self.assertIsNone(match(rootfs_path="/Users/a/ntuser.dat.bak"))
+        self.assertEqual("log", match(rootfs_path="/a/b.LOG", extension=".LOG"))
+        self.assertEqual("pyc", match(rootfs_path="/a/foo.PYC"))
+        self.assertEqual("media", match(rootfs_path="/a/foo.png", is_media=True))
+        self.assertIsNone(match(rootfs_path="/a/foo.txt", is_media=False))
+        self.assertIsNone(match())
+
+        with self.assertRaises(ValueError):
+            tagging.RuleMatcher([tagging.Rule("a", "name", "contains", ("b",))])
+
+    def test_scanpipe_pipes_tagging_tag_codebase_resources(self):
+        p1 = Project.objects.create(name="Analysis")
+        resource1 = CodebaseResource.objects.create(
+            project=p1,
+            path="root/var/.wh.foo",
+            rootfs_path="/var/.wh.foo",
+            name=".wh.foo",
+        )
+        resource2 = CodebaseResource.objects.create(
+            project=p1, path="root/var/foo.png", rootfs_path="/var/foo.png"
+        )
+        resource3 = CodebaseResource.objects.create(
+            project=p1,
+            path="root/usr/foo.png",
+            rootfs_path="/usr/foo.png",
+            is_media=True,
+        )
+        resource4 = CodebaseResource.objects.create(
+            project=p1, path="root/var/bar", rootfs_path="/var/bar", status="scanned"
+        )
+        resource5 = CodebaseResource.objects.create(
+            project=p1, path="root/usr/bar", rootfs_path="/usr/bar"
+        )
+
+        rules = [
+            *docker.WHITEOUT_RULES,
+            *rootfs.UNINTERESTING_RULES,
+            *rootfs.MEDIA_FILE_RULES,
+        ]
+        with self.assertNumQueries(4):
+            updated_counts = tagging.tag_codebase_resources(p1, rules)
+
+        expected = {
+            "ignored-whiteout": 1,
+            "ignored-not-interesting": 1,
+            "ignored-media-file": 1,
+        }
+        self.assertEqual(expected, updated_counts)
+        resource1.refresh_from_db()
+        resource2.refresh_from_db()
+        resource3.refresh_from_db()
+        resource4.refresh_from_db()
+        resource5.refresh_from_db()
+        self.assertEqual("ignored-whiteout", resource1.status)
+        self.assertEqual("ignored-not-interesting", resource2.status)
+        self.assertEqual("ignored-media-file", resource3.status)
+        self.assertEqual("scanned", resource4.status)
+        self.assertEqual("", resource5.status)
+
     def test_scanpipe_pipes_rootfs_tag_data_files_with_no_clues(self):
         p1 = Project.objects.create(name="Analysis")
         resource1 = CodebaseResource.objects.create(
@@ -1109,3 +2151,44 @@ class ScanPipePipesTransactionTest(TransactionTestCase):
         make_codebase_resource(p1, resource_location)
         self.assertEqual(1, p1.codebaseresources.count())
         self.assertEqual(0, p1.projecterrors.count())
+
+    @mock.patch("scanpipe.pipes.scancode.SCANCODEIO_PROCESSES", 0)
+    def test_scanpipe_pipes_make_codebase_resources(self):
+        p1 = Project.objects.create(name="Analysis")
+        resource_location = str(self.data_location / "notice.NOTICE")
+
+        with self.assertRaises(AssertionError) as cm:
+            make_codebase_resources(p1, [(resource_location, None)])
+        self.assertIn("is not under project/codebase/", str(cm.exception))
+
+        copy_inputs([resource_location], p1.codebase_path)
+        resource_location = str(p1.codebase_path / "notice.NOTICE")
+        other_location = str(p1.codebase_path / "other.NOTICE")
+        shutil.copyfile(resource_location, other_location)
+        resources = [
+            (resource_location, "/notice.NOTICE"),
+            (other_location, "/other.NOTICE"),
+        ]
+        make_codebase_resources(p1, resources, batch_size=1)
+
+        self.assertEqual(2, p1.codebaseresources.count())
+        resource = p1.codebaseresources.get(path="/notice.NOTICE")
+        self.assertEqual("/notice.NOTICE", resource.rootfs_path)
+        self.assertEqual(1178, resource.size)
+        self.assertEqual("4bd631df28995c332bf69d9d4f0f74d7ee089598", resource.sha1)
+        self.assertEqual(CodebaseResource.Type.FILE, resource.type)
+
+        # Duplicated path: skip the creation and no project error added
+        make_codebase_resources(p1, resources)
+        self.assertEqual(2, p1.codebaseresources.count())
+        self.assertEqual(0, p1.projecterrors.count())
+
+    def test_scanpipe_pipes_scancode_get_resources_info(self):
+        locations = [str(self.data_location / "notice.NOTICE")]
+        expected = [scancode.get_resource_info(locations[0])]
+        with mock.patch("scanpipe.pipes.scancode.SCANCODEIO_PROCESSES", 0):
+            self.assertEqual(expected, scancode.get_resources_info(locations))
+
+        self.addCleanup(scancode.shutdown_scan_pool)
+        with mock.patch("scanpipe.pipes.scancode.SCANCODEIO_PROCESSES", 1):
+            self.assertEqual(expected, scancode.get_resources_info(locations))
@@ -28,6 +28,8 @@ from celery.exceptions import SoftTimeLimitExceeded
 
 from scanpipe import tasks
 from scanpipe.models import Project
+from scanpipe.pipelines import PipelineSuspended
+from scanpipe.tests.pipelines.do_nothing import DoNothing
 
 
 class ScanPipeTasksTest(TestCase):
@@ -59,3 +61,34 @@ class ScanPipeTasksTest(TestCase):
         self.assertTrue(run.task_end_date)
         self.assertEqual(1, run.task_exitcode)
         self.assertEqual("SoftTimeLimitExceeded", run.task_output)
+
+    def test_scanpipe_tasks_execute_pipeline_task_suspended(self):
+        project = Project.objects.create(name="my_project")
+        run = project.add_pipeline("do_nothing")
+
+        # The Celery tasks are executed eagerly in the tests, the pipeline is
+        # resumed once the canvas is completed.
+        canvas = tasks.complete_shards_task.si(str(project.pk), "scan_for_files")
+        suspended = PipelineSuspended(canvas)
+        with mock.patch.object(
+            DoNothing, "step1", autospec=True, side_effect=suspended
+        ):
+            tasks.execute_pipeline_task(run.pk)
+
+        run.refresh_from_db()
+        self.assertEqual(0, run.task_exitcode)
+        self.assertTrue(run.task_end_date)
+        self.assertIn("Step [step1] suspended", run.log)
+        self.assertIn("Pipeline [do_nothing] resuming", run.log)
+        self.assertNotIn("Step [step1] completed", run.log)
+        self.assertIn("Step [step2] completed", run.log)
+        self.assertIn("Pipeline completed", run.log)
+
+    def test_scanpipe_tasks_fail_pipeline_task(self):
+        project = Project.objects.create(name="my_project")
+        run = project.add_pipeline("do_nothing")
+
+        tasks.fail_pipeline_task(run.pk)
+        run.refresh_from_db()
+        self.assertEqual(1, run.task_exitcode)
+        self.assertTrue(run.task_end_date)
@@ -25,6 +25,7 @@ from unittest import mock
 
 from django.apps import apps
 from django.test import TestCase
+from django.urls import reverse
 
 from scanpipe.models import CodebaseResource
 from scanpipe.models import Project
@@ -109,5 +110,74 @@ class ScanPipeViewsTest(TestCase):
             compliance_alert="error",
             type=CodebaseResource.Type.FILE,
         )
+        self.project1.update_stats()
         response = self.client.get(url)
         self.assertContains(response, expected)
+
+    def test_scanpipe_views_project_details_license_summaries(self):
+        url = self.project1.get_absolute_url()
+
+        CodebaseResource.objects.create(
+            project=self.project1,
+            path="1",
+            type=CodebaseResource.Type.FILE,
+            licenses=[{"key": "mit", "category": "Permissive"}],
+            license_expressions=["mit"],
+        )
+        CodebaseResource.objects.create(
+            project=self.project1,
+            path="2",
+            type=CodebaseResource.Type.FILE,
+            licenses=[
+                {"key": "mit", "category": "Permissive"},
+                {"key": "gpl-2.0", "category": "Copyleft"},
+            ],
+            license_expressions=["mit OR gpl-2.0"],
+        )
+        CodebaseResource.objects.create(
+            project=self.project1, path="3", type=CodebaseResource.Type.FILE
+        )
+        # Each detection is counted, including the repeated detections of a key.
+        CodebaseResource.objects.create(
+            project=self.project1,
+            path="4",
+            type=CodebaseResource.Type.FILE,
+            licenses=[
+                {"key": "gpl-2.0", "category": "Copyleft"},
+                {"key": "gpl-2.0", "category": "Copyleft"},
+            ],
+            license_expressions=["gpl-2.0", "gpl-2.0"],
+        )
+
+        response = self.client.get(url)
+        expected = {"gpl-2.0": 3, "mit": 2, "(No value detected)": 1}
+        self.assertEqual(expected, response.context["file_license_keys"])
+        expected = {"Copyleft": 3, "Permissive": 2, "(No value detected)": 1}
+        self.assertEqual(expected, response.context["file_license_categories"])
+
+    @mock.patch("scanpipe.views.LOG_ENTRIES_LIMIT", 3)
+    def test_scanpipe_views_run_detail_view_log_entries(self):
+        run = self.project1.add_pipeline("docker")
+        self.project1.update_stats()
+        url = reverse("run_detail", args=[run.uuid])
+
+        run.log = "Legacy log\n"
+        run.save()
+        for index in range(10):
+            run.append_to_log(f"Entry {index}")
+        run.save_log_entries()
+
+        # The number of queries does not depend on the number of log entries:
+        # the run, project, stats, and first log entries page, in a savepoint.
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+
+        self.assertContains(response, "Legacy log\nEntry 0\nEntry 1\nEntry 2\n")
+        self.assertNotContains(response, "Entry 3")
+        log_entries = response.context["log_entries"]
+        self.assertEqual(
+            ["Entry 0", "Entry 1", "Entry 2"], [e.message for e in log_entries]
+        )
+        self.assertEqual(log_entries[-1].id, response.context["log_offset"])
+        next_url = reverse("run-log-entries", args=[run.uuid])
+        self.assertContains(response, f"{next_url}?offset={log_entries[-1].id}")
@@ -51,11 +51,13 @@ from scanpipe.models import Project
 from scanpipe.models import ProjectError
 from scanpipe.models import Run
 from scanpipe.pipes import codebase
-from scanpipe.pipes import count_group_by
 from scanpipe.pipes import output
 
 scanpipe_app = apps.get_app_config("scanpipe")
 
+# Maximum number of log entries loaded at once, in the run modal and the REST API.
+LOG_ENTRIES_LIMIT = 1000
+
 
 class PrefetchRelatedViewMixin:
     prefetch_related = None
@@ -90,7 +92,7 @@ class ProjectListView(PrefetchRelatedViewMixin, PaginatedFilterView):
     model = Project
     filterset_class = ProjectFilterSet
     template_name = "scanpipe/project_list.html"
-    prefetch_related = ["runs"]
+    prefetch_related = ["runs", "stats"]
     paginate_by = 10
 
 
@@ -133,11 +135,26 @@ class ProjectCreateView(generic.CreateView):
 class ProjectDetailView(ProjectViewMixin, generic.DetailView):
     template_name = "scanpipe/project_detail.html"
 
+    @classmethod
+    def get_summary(cls, values_list, limit=7):
+        return cls.get_counter_summary(Counter(values_list), limit)
+
+    @classmethod
+    def get_json_list_summary(cls, queryset, field_name, limit=7):
+        """
+        Returns the summary of the values of the JSONField `field_name` that stores
+        a list of strings, counted in the database.
+        The resources without any value are counted as an empty string value.
+        """
+        counter = Counter(queryset.json_list_values_count(field_name))
+        counter[""] = queryset.filter(**{field_name: []}).count()
+        return cls.get_counter_summary(+counter, limit)
+
     @staticmethod
-    def get_summary(values_list, limit=7):
-        most_common = dict(Counter(values_list).most_common(limit))
+    def get_counter_summary(counter, limit=7):
+        most_common = dict(counter.most_common(limit))
 
-        other = len(values_list) - sum(most_common.values())
+        other = sum(counter.values()) - sum(most_common.values())
         if other > 0:
             most_common["Other"] = other
 
@@ -185,9 +202,9 @@ class ProjectDetailView(ProjectViewMixin, generic.DetailView):
         file_mime_types = files.values_list("mime_type", flat=True)
         file_holders = self.data_from_model_field(files, "holders", "value")
         file_copyrights = self.data_from_model_field(files, "copyrights", "value")
-        file_license_keys = self.data_from_model_field(files, "licenses", "key")
-        file_license_categories = self.data_from_model_field(
-            files, "licenses", "category"
+        file_license_keys = self.get_json_list_summary(files_qs, "license_keys")
+        file_license_categories = self.get_json_list_summary(
+            files_qs, "license_categories"
         )
 
         file_compliance_alert = []
@@ -212,8 +229,8 @@ class ProjectDetailView(ProjectViewMixin, generic.DetailView):
                 "mime_types": self.get_summary(file_mime_types),
                 "holders": self.get_summary(file_holders),
                 "copyrights": self.get_summary(file_copyrights),
-                "file_license_keys": self.get_summary(file_license_keys),
-                "file_license_categories": self.get_summary(file_license_categories),
+                "file_license_keys": file_license_keys,
+                "file_license_categories": file_license_categories,
                 "file_compliance_alert": self.get_summary(file_compliance_alert),
                 "package_licenses": self.get_summary(package_licenses),
                 "package_types": self.get_summary(package_types),
@@ -282,7 +299,9 @@ class ProjectTreeView(ProjectViewMixin, generic.DetailView):
 
         fields = ["name", "path"]
         project_codebase = codebase.ProjectCodebase(self.object)
-        context["tree_data"] = [codebase.get_tree(project_codebase.root, fields)]
+        context["tree_data"] = [
+            codebase.get_resource_tree(project_codebase.root, fields)
+        ]
 
         return context
 
@@ -444,11 +463,21 @@ class CodebaseResourceDetailsView(ProjectRelatedViewMixin, generic.DetailView):
 def run_detail_view(request, uuid):
     template = "scanpipe/includes/run_modal_content.html"
     run = get_object_or_404(Run, uuid=uuid)
-    status_summary = count_group_by(run.project.codebaseresources, "status")
+    status_summary = run.project.get_stats().codebase_resources_summary
+
+    # Only the first page of the log entries is loaded, the following ones are
+    # available from the `log_entries` REST API action, starting at `log_offset`.
+    log_entries = list(run.get_log_entries(limit=LOG_ENTRIES_LIMIT + 1))
+    log_offset = None
+    if len(log_entries) > LOG_ENTRIES_LIMIT:
+        log_entries = log_entries[:LOG_ENTRIES_LIMIT]
+        log_offset = log_entries[-1].id
 
     context = {
         "run": run,
         "status_summary": status_summary,
+        "log_entries": log_entries,
+        "log_offset": log_offset,
     }
 
     return render(request, template, context)